@@ -0,0 +1,75 @@
+import sys
+import time
+import jmespath
+import tabulate
+import nessus_file_reader as nfr
+from nessus_file_reader.__main__ import scan_root_data
+
+# Compare nfr scan --plugin-severity --filter with and without filter pushdown.
+# Without pushdown all columns of every report item are read and JMESPath filter is applied to all rows,
+# with pushdown report items which don't pass filter are dropped after reading only columns used by filter.
+# File is parsed once, so only building and filtering of rows is measured.
+# Usage: python nfr-filter-pushdown-benchmark.py ./your_nessus_file.nessus "[?S=='4']" "[?VPR > '7.0'].PID"
+
+nessus_scan_file = sys.argv[1] if len(sys.argv) > 1 else "./your_nessus_file.nessus"
+filters = sys.argv[2:] or [
+    "[?S=='4']",
+    "[?S>='3' && RF=='High']",
+    "[?EPSS > '0.5'].{PID:PID,EPSS:EPSS}",
+    "[?@.S=='4']",
+]
+
+
+def plugin_severity_rows(root, filter_expression, pushdown):
+    data = scan_root_data(
+        root,
+        nessus_scan_file=nessus_scan_file,
+        scan_summary=False,
+        plugin_severity=True,
+        scan_file_source=False,
+        policy_summary=False,
+        plugin_severity_filter=filter_expression if pushdown else None,
+    )
+    return jmespath.search(filter_expression, list(data["plugin_severity"].records()))
+
+
+if __name__ == "__main__":
+    root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+    rows = []
+    for filter_expression in filters:
+        times = {}
+        results = {}
+        for pushdown in [False, True]:
+            start_time = time.perf_counter()
+            results[pushdown] = plugin_severity_rows(root, filter_expression, pushdown)
+            times[pushdown] = time.perf_counter() - start_time
+        rows.append(
+            [
+                filter_expression,
+                nfr.table.plugin_severity_predicate(filter_expression) is not None,
+                len(results[True]),
+                results[False] == results[True],
+                times[False],
+                times[True],
+                times[False] / times[True],
+            ]
+        )
+
+    print(
+        f"File: {nessus_scan_file} ({nfr.file.nessus_scan_file_size_human(nessus_scan_file)})"
+    )
+    print(
+        tabulate.tabulate(
+            rows,
+            [
+                "Filter",
+                "Pushdown",
+                "Rows",
+                "Same result",
+                "Without [s]",
+                "With [s]",
+                "Speedup",
+            ],
+            floatfmt=".2f",
+        )
+    )
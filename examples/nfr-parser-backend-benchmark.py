@@ -0,0 +1,80 @@
+import multiprocessing
+import resource
+import sys
+import time
+import tabulate
+import nessus_file_reader as nfr
+from nessus_file_reader import xml_backend
+
+# Compare XML parser backends (lxml and xml.etree.ElementTree) on parse time and peak RSS.
+# Every measurement runs in separate process, so peak RSS of one run does not affect the other.
+# Usage: python nfr-parser-backend-benchmark.py ./your_nessus_file.nessus
+
+nessus_scan_file = sys.argv[1] if len(sys.argv) > 1 else "./your_nessus_file.nessus"
+
+
+def peak_rss_mib():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        peak_rss /= 1024
+    return peak_rss / 1024
+
+
+def parse_whole_file(backend, results):
+    xml_backend.set_backend(backend)
+    start_time = time.perf_counter()
+    root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+    report_items = sum(
+        nfr.host.number_of_plugins(report_host)
+        for report_host in nfr.scan.report_hosts(root)
+    )
+    results.put(
+        (
+            backend,
+            "parse",
+            time.perf_counter() - start_time,
+            peak_rss_mib(),
+            report_items,
+        )
+    )
+
+
+def parse_host_by_host(backend, results):
+    xml_backend.set_backend(backend)
+    start_time = time.perf_counter()
+    report_items = sum(
+        nfr.host.number_of_plugins(report_host)
+        for report_host in nfr.file.iter_report_hosts(nessus_scan_file)
+    )
+    results.put(
+        (
+            backend,
+            "iterparse",
+            time.perf_counter() - start_time,
+            peak_rss_mib(),
+            report_items,
+        )
+    )
+
+
+if __name__ == "__main__":
+    rows = []
+    results = multiprocessing.Queue()
+    for backend in xml_backend.available_backends():
+        for benchmark in [parse_whole_file, parse_host_by_host]:
+            process = multiprocessing.Process(target=benchmark, args=(backend, results))
+            process.start()
+            rows.append(results.get())
+            process.join()
+
+    print(
+        f"File: {nessus_scan_file} ({nfr.file.nessus_scan_file_size_human(nessus_scan_file)})"
+    )
+    print(
+        tabulate.tabulate(
+            rows,
+            ["Backend", "Method", "Time [s]", "Peak RSS [MiB]", "Report items"],
+            floatfmt=".2f",
+        )
+    )
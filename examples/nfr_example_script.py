@@ -68,12 +68,15 @@ def nfr_example_simple():
 
                 # Use *scan* functions to get details about provided scan e.g. report name,
                 # number of target/scanned/credentialed hosts, scan time start/end/elapsed and more.
+                # NessusScan computes data of scan on first use and keeps it, so it's not computed again
+                # by next properties and *scan* functions called for the same root.
+                scan = nfr.scan.NessusScan(root)
                 scan_file_source = nfr.scan.scan_file_source(root)
                 print(f" Source of file: {scan_file_source}")
-                report_hosts = nfr.scan.report_hosts(root)
+                report_hosts = scan.report_hosts
                 print(f" Report hosts: {report_hosts}")
-                report_name = nfr.scan.report_name(root)
-                policy_name = nfr.scan.policy_name(root)
+                report_name = scan.report_name
+                policy_name = scan.policy_name
                 print(f" Report name: {report_name}")
                 print(f" Policy name: {policy_name}")
                 number_of_target_hosts = nfr.scan.number_of_target_hosts(root)
@@ -87,9 +90,9 @@ def nfr_example_simple():
                     f" Number of credentialed hosts: {number_of_scanned_hosts_with_credentialed_checks_yes}"
                 )
 
-                scan_time_start = nfr.scan.scan_time_start(root)
-                scan_time_end = nfr.scan.scan_time_end(root)
-                scan_time_elapsed = nfr.scan.scan_time_elapsed(root)
+                scan_time_start = scan.times["scan_time_start"]
+                scan_time_end = scan.times["scan_time_end"]
+                scan_time_elapsed = scan.times["scan_time_elapsed"]
                 print(
                     f" Scan time START - END (ELAPSED): {scan_time_start} - {scan_time_end} ({scan_time_elapsed})"
                 )
@@ -98,7 +101,7 @@ def nfr_example_simple():
                 # Use *host* functions to get details about hosts from provided scan e.g. report hosts names,
                 # operating system, hosts scan time start/end/elapsed, number of Critical/High/Medium/Low/None findings
                 # and more.
-                for report_host in nfr.scan.report_hosts(root):
+                for report_host in scan.report_hosts:
                     report_host_name = nfr.host.report_host_name(report_host)
                     report_host_os = nfr.host.detected_os(report_host)
                     report_host_scan_time_start = nfr.host.host_time_start(report_host)
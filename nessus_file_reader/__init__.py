@@ -30,5 +30,8 @@ from .file import file
 from .host import host
 from .plugin import plugin
 from .scan import scan
+from .cache import cache
+from .table import table
+from .export import export
 
 name = "nessus_file_reader"
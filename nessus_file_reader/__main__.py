@@ -3,7 +3,17 @@ import click
 import nessus_file_reader as nfr
 from nessus_file_reader import utilities, __about__
 import os
+import io
+import sys
 import glob
+import functools
+import contextlib
+import heapq
+import itertools
+import math
+import csv
+import json
+import sqlite3
 import tabulate
 import jmespath
 
@@ -23,6 +33,17 @@ _file_arguments = [
     )
 ]
 
+_jobs_options = [
+    click.option(
+        "--jobs",
+        "-j",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="number of nessus files processed in parallel",
+    )
+]
+
 
 def add_options(options):
     def _add_options(func):
@@ -76,79 +97,572 @@ def cli(ctx, update_check):
         utilities.check_for_update()
 
 
+def list_of_source_files(file):
+    """
+    Function returns list of nessus files for given path. If path is a directory, all nessus files from this
+    directory and its subdirectories are returned, including compressed ones e.g. *.nessus.gz. Nessus files inside
+    zip and tar archives, given directly or found in directory, are returned as archive::member paths.
+    :param file: path to nessus file, archive or directory
+    :return: list of nessus files
+    """
+    if os.path.isdir(file):
+        os_separator = os.path.sep
+        source_files = []
+        for source_file in glob.glob(
+            file + os_separator + "**" + os_separator + "*", recursive=True
+        ):
+            if source_file.endswith(utilities.NESSUS_FILE_EXTENSIONS):
+                source_files.append(source_file)
+            elif source_file.endswith(utilities.ARCHIVE_EXTENSIONS) and os.path.isfile(
+                source_file
+            ):
+                source_files.extend(utilities.nessus_archive_members(source_file))
+    elif file.endswith(utilities.ARCHIVE_EXTENSIONS) and os.path.isfile(file):
+        source_files = utilities.nessus_archive_members(file)
+    else:
+        source_files = [file]
+    return source_files
+
+
+def file_structure_output(nessus_scan_file):
+    """
+    Function returns structure of given nessus file as text ready to print.
+    :param nessus_scan_file: given nessus file
+    :return: file name and file structure
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print(nessus_scan_file)
+        utilities.nessus_scan_file_structure(nessus_scan_file)
+    return output.getvalue()
+
+
+def file_split_output(nessus_scan_file, split):
+    """
+    Function splits given nessus file and returns names of created files as text ready to print.
+    :param nessus_scan_file: given nessus file
+    :param split: number of ReportHost per file
+    :return: file name and names of created files
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print(nessus_scan_file)
+        utilities.nessus_scan_file_split(nessus_scan_file, split)
+    return output.getvalue()
+
+
 @cli.command()
 @add_arguments(_file_arguments)
 @click.option("--size", is_flag=True, help="file size")
 @click.option("--structure", is_flag=True, help="file structure")
 @click.option(
-    "--split", type=int, help="file split into batches per number of ReportHost"
+    "--split",
+    type=click.IntRange(min=1),
+    help="file split into batches per number of ReportHost",
+)
+@click.option(
+    "--index",
+    is_flag=True,
+    help="write sidecar index with byte offsets of every ReportHost next to file",
 )
-def file(files, size, structure, split):
+@add_options(_jobs_options)
+def file(files, size, structure, split, index, jobs):
     """Options related to nessus file."""
 
     for file in files:
 
         if size:
             try:
-                if os.path.isdir(file):
-                    os_separator = os.path.sep
-                    extension = "*.nessus"
-                    list_of_source_files = glob.glob(
-                        file + os_separator + "**" + os_separator + extension,
-                        recursive=True,
-                    )
-                else:
-                    list_of_source_files = [file]
                 # print('')
-                for row_index, nessus_scan_file in enumerate(list_of_source_files):
+                for row_index, nessus_scan_file in enumerate(
+                    list_of_source_files(file)
+                ):
                     file_name_with_path = nfr.file.nessus_scan_file_name_with_path(
                         nessus_scan_file
                     )
                     file_size = nfr.file.nessus_scan_file_size_human(
                         file_name_with_path
                     )
-                    print(nessus_scan_file, file_size)
+                    if nfr.file.nessus_scan_file_compression(file_name_with_path):
+                        file_size_uncompressed = (
+                            nfr.file.nessus_scan_file_size_uncompressed_human(
+                                file_name_with_path
+                            )
+                        )
+                        print(
+                            nessus_scan_file,
+                            file_size,
+                            f"({file_size_uncompressed} uncompressed)",
+                        )
+                    else:
+                        print(nessus_scan_file, file_size)
             except FileNotFoundError as e:
                 print(e.strerror)
 
         elif structure:
             try:
-                if os.path.isdir(file):
-                    os_separator = os.path.sep
-                    extension = "*.nessus"
-                    list_of_source_files = glob.glob(
-                        file + os_separator + "**" + os_separator + extension,
-                        recursive=True,
-                    )
-                else:
-                    list_of_source_files = [file]
-                for row_index, nessus_scan_file in enumerate(list_of_source_files):
-
-                    print(nessus_scan_file)
-                    utilities.nessus_scan_file_structure(nessus_scan_file)
+                for output in utilities.ordered_parallel_map(
+                    file_structure_output, list_of_source_files(file), jobs
+                ):
+                    print(output, end="")
             except FileNotFoundError as e:
                 print(e.strerror)
         elif split:
             try:
-                if os.path.isdir(file):
-                    os_separator = os.path.sep
-                    extension = "*.nessus"
-                    list_of_source_files = glob.glob(
-                        file + os_separator + "**" + os_separator + extension,
-                        recursive=True,
+                for output in utilities.ordered_parallel_map(
+                    functools.partial(file_split_output, split=split),
+                    list_of_source_files(file),
+                    jobs,
+                ):
+                    print(output, end="")
+            except FileNotFoundError as e:
+                print(e.strerror)
+        elif index:
+            try:
+                for row_index, nessus_scan_file in enumerate(
+                    list_of_source_files(file)
+                ):
+                    try:
+                        report_hosts_index = nfr.file.report_hosts_index(
+                            nessus_scan_file, rebuild=True
+                        )
+                    except ValueError as e:
+                        print(e)
+                        continue
+                    print(
+                        nfr.file.report_hosts_index_file(nessus_scan_file),
+                        len(report_hosts_index["report_hosts"]),
                     )
-                else:
-                    list_of_source_files = [file]
-                for row_index, nessus_scan_file in enumerate(list_of_source_files):
-
-                    print(nessus_scan_file)
-                    utilities.nessus_scan_file_split(nessus_scan_file, split)
             except FileNotFoundError as e:
                 print(e.strerror)
         else:
             print("No parameters specified")
 
 
+def scan_root_data(
+    root,
+    nessus_scan_file,
+    scan_summary,
+    plugin_severity,
+    scan_file_source,
+    policy_summary,
+    plugin_severity_filter=None,
+):
+    """
+    Function returns data about given root element of nessus file for requested scan options. Only rows of data are
+    returned, so it can be safely called in separate process.
+    :param root: root element of scan file tree, whole file or chunk of report hosts
+    :param nessus_scan_file: given nessus file
+    :param scan_summary: if True scan summary row is returned
+    :param plugin_severity: if True plugin severity rows are returned
+    :param scan_file_source: if True scan file source row is returned
+    :param policy_summary: if True policy summary row is returned
+    :param plugin_severity_filter: JMESPath filter, plugin severity rows which don't pass it are dropped early
+        if it is supported by nfr.table.plugin_severity_predicate, search with it is still required
+    :return: dictionary with 'summary', 'scan_file_source', 'policy_summary' rows and 'plugin_severity' ScanTable
+    """
+    data = {
+        "summary": None,
+        "scan_file_source": None,
+        "policy_summary": None,
+        "plugin_severity": nfr.table.ScanTable(),
+    }
+
+    if policy_summary:
+        policy_name = nfr.scan.policy_name(root)
+        policy_max_hosts = nfr.scan.policy_max_hosts(root)
+        policy_max_checks = nfr.scan.policy_max_checks(root)
+        policy_checks_read_timeout = nfr.scan.policy_checks_read_timeout(root)
+        plugin_set_number = nfr.scan.plugin_set_number(root)
+        data["policy_summary"] = {
+            "File name": nessus_scan_file,
+            "Policy name": policy_name,
+            "Max hosts": policy_max_hosts,
+            "Max checks": policy_max_checks,
+            "Checks timeout": policy_checks_read_timeout,
+            "Plugins number": plugin_set_number,
+        }
+
+    if scan_file_source:
+        scan_file_source_info = nfr.scan.scan_file_source(root)
+        data["scan_file_source"] = {
+            "File name": nessus_scan_file,
+            "Source": scan_file_source_info,
+        }
+
+    if scan_summary:
+
+        report_name = nfr.scan.report_name(root)
+        number_of_target_hosts = nfr.scan.number_of_target_hosts(root)
+        number_of_scanned_hosts = nfr.scan.number_of_scanned_hosts(root)
+        number_of_scanned_hosts_with_credentialed_checks_yes = (
+            nfr.scan.number_of_scanned_hosts_with_credentialed_checks_yes(root)
+        )
+
+        report_host_critical = 0
+        report_host_high = 0
+        report_host_medium = 0
+        report_host_low = 0
+        report_host_none = 0
+
+        for report_host in nfr.scan.report_hosts(root):
+            risk_factors = nfr.host.risk_factor_histogram(report_host)
+            report_host_critical += risk_factors["Critical"]
+            report_host_high += risk_factors["High"]
+            report_host_medium += risk_factors["Medium"]
+            report_host_low += risk_factors["Low"]
+            report_host_none += risk_factors["None"]
+
+        data["summary"] = {
+            "File name": nessus_scan_file,
+            "Report name": report_name,
+            "TH": number_of_target_hosts,
+            "SH": number_of_scanned_hosts,
+            "CC": number_of_scanned_hosts_with_credentialed_checks_yes,
+            "C": report_host_critical,
+            "H": report_host_high,
+            "M": report_host_medium,
+            "L": report_host_low,
+            "N": report_host_none,
+        }
+
+    if plugin_severity:
+
+        predicate = None
+        if plugin_severity_filter:
+            predicate = nfr.table.plugin_severity_predicate(plugin_severity_filter)
+        for report_host in nfr.scan.report_hosts(root):
+            report_host_name = nfr.host.report_host_name(report_host)
+            for report_item in nfr.host.report_items(report_host):
+                if predicate is None or predicate(
+                    nessus_scan_file, report_host_name, report_item
+                ):
+                    data["plugin_severity"].append_report_item(
+                        nessus_scan_file, report_host_name, report_item
+                    )
+
+    return data
+
+
+def scan_root_data_merge(data, data_part):
+    """
+    Function merges data returned for chunk of report hosts into data of whole nessus file.
+    :param data: data of whole nessus file, updated in place
+    :param data_part: data of chunk of report hosts
+    :return: merged data
+    """
+    if data["summary"] is not None and data_part["summary"] is not None:
+        summary = data["summary"]
+        summary_part = data_part["summary"]
+        for key in ["SH", "C", "H", "M", "L", "N"]:
+            summary[key] += summary_part[key]
+        if summary["CC"] is None or summary_part["CC"] is None:
+            summary["CC"] = None
+        else:
+            summary["CC"] += summary_part["CC"]
+    data["plugin_severity"].extend(data_part["plugin_severity"])
+    return data
+
+
+def scan_file_data(
+    nessus_scan_file,
+    scan_summary,
+    plugin_severity,
+    scan_file_source,
+    policy_summary,
+    parallel_hosts_jobs=1,
+    use_cache=False,
+    plugin_severity_filter=None,
+):
+    """
+    Function returns data about given nessus file for requested scan options. Only rows of data are returned,
+    so it can be safely called in separate process.
+    :param nessus_scan_file: given nessus file
+    :param scan_summary: if True scan summary row is returned
+    :param plugin_severity: if True plugin severity rows are returned
+    :param scan_file_source: if True scan file source row is returned
+    :param policy_summary: if True policy summary row is returned
+    :param parallel_hosts_jobs: number of processes used to parse chunks of report hosts of given file in parallel
+    :param use_cache: if True root element is read from on-disk cache of parsed scans, see nfr.cache
+    :param plugin_severity_filter: JMESPath filter pushed down to report items, see scan_root_data
+    :return: dictionary with 'summary', 'scan_file_source', 'policy_summary' rows and 'plugin_severity' ScanTable
+    """
+    file_name_with_path = nfr.file.nessus_scan_file_name_with_path(nessus_scan_file)
+    root_data = functools.partial(
+        scan_root_data,
+        nessus_scan_file=nessus_scan_file,
+        scan_summary=scan_summary,
+        plugin_severity=plugin_severity,
+        scan_file_source=scan_file_source,
+        policy_summary=policy_summary,
+        plugin_severity_filter=plugin_severity_filter,
+    )
+
+    if not scan_summary and not plugin_severity:
+        # policy summary and scan file source need Policy section only
+        root = nfr.file.nessus_scan_file_policy_root_element(file_name_with_path)
+        data = root_data(root)
+        return data
+
+    if use_cache:
+        root = nfr.cache.cached_root_element(file_name_with_path)
+        data = root_data(root)
+        return data
+
+    if parallel_hosts_jobs > 1:
+        data = None
+        for data_part in nfr.file.parallel_map_report_hosts(
+            file_name_with_path, root_data, parallel_hosts_jobs
+        ):
+            if data is None:
+                data = data_part
+            else:
+                scan_root_data_merge(data, data_part)
+        if data is not None:
+            return data
+
+    root = nfr.file.nessus_scan_file_root_element(file_name_with_path)
+    data = root_data(root)
+    return data
+
+
+def plugin_severity_tables(
+    source_files,
+    jobs=1,
+    parallel_hosts=False,
+    use_cache=False,
+    plugin_severity_filter=None,
+):
+    """
+    Function yields plugin severity rows of given nessus files in parts, as soon as they are ready, in order of
+    files and report hosts. With one job files are read report host by report host, so every part contains rows
+    of one report host.
+    :param source_files: iterable of nessus files
+    :param jobs: number of processes
+    :param parallel_hosts: if True chunks of report hosts of every file are processed in parallel by jobs processes
+    :param use_cache: if True root elements are read from on-disk cache of parsed scans, see nfr.cache
+    :param plugin_severity_filter: JMESPath filter pushed down to report items, see scan_root_data
+    :return: generator of ScanTable
+    """
+    if jobs > 1 and not parallel_hosts:
+        for data in utilities.ordered_parallel_map(
+            functools.partial(
+                scan_file_data,
+                scan_summary=False,
+                plugin_severity=True,
+                scan_file_source=False,
+                policy_summary=False,
+                use_cache=use_cache,
+                plugin_severity_filter=plugin_severity_filter,
+            ),
+            source_files,
+            jobs,
+        ):
+            yield data["plugin_severity"]
+        return
+
+    predicate = None
+    if plugin_severity_filter:
+        predicate = nfr.table.plugin_severity_predicate(plugin_severity_filter)
+
+    for nessus_scan_file in source_files:
+        file_name_with_path = nfr.file.nessus_scan_file_name_with_path(nessus_scan_file)
+        if use_cache or parallel_hosts and jobs > 1:
+            data = scan_file_data(
+                nessus_scan_file,
+                scan_summary=False,
+                plugin_severity=True,
+                scan_file_source=False,
+                policy_summary=False,
+                parallel_hosts_jobs=jobs,
+                use_cache=use_cache,
+                plugin_severity_filter=plugin_severity_filter,
+            )
+            yield data["plugin_severity"]
+            continue
+        for report_host in nfr.file.iter_report_hosts(file_name_with_path):
+            report_host_name = nfr.host.report_host_name(report_host)
+            plugin_severity_table = nfr.table.ScanTable()
+            for report_item in nfr.host.report_items(report_host):
+                if predicate is None or predicate(
+                    nessus_scan_file, report_host_name, report_item
+                ):
+                    plugin_severity_table.append_report_item(
+                        nessus_scan_file, report_host_name, report_item
+                    )
+            yield plugin_severity_table
+
+
+def plugin_severity_sort_key(record):
+    """
+    Function returns sort key of plugin severity row: report host name, descending severity and plugin id.
+    Missing values, e.g. in rows projected by --filter, are sorted as empty name and zero.
+    :param record: plugin severity row
+    :return: sort key
+    """
+    if not isinstance(record, dict):
+        return "", 0, 0
+    return (
+        record.get("Report host name") or "",
+        -int(record.get("S") or 0),
+        int(record.get("PID") or 0),
+    )
+
+
+def plugin_severity_search(expression, records):
+    """
+    Function searches given plugin severity rows with given JMESPath expression and returns result as list of rows.
+    :param expression: compiled JMESPath expression
+    :param records: list of rows
+    :return: list of rows, e.g. dictionaries or values projected by expression, empty if nothing matches
+    """
+    records = expression.search(records)
+    if records is None:
+        return []
+    if not isinstance(records, list):
+        return [records]
+    return records
+
+
+def plugin_severity_print(records):
+    """
+    Function prints given plugin severity rows as table with columns of the first row. Rows which are not
+    dictionaries, e.g. result of JMESPath projection like [?S=='4'].PID, are printed one per line.
+    :param records: list of rows
+    """
+    if not records:
+        print("No results")
+    elif isinstance(records[0], dict):
+        header = list(records[0])
+        rows = [
+            (
+                [record.get(column) for column in header]
+                if isinstance(record, dict)
+                else [record]
+            )
+            for record in records
+        ]
+        print(tabulate.tabulate(rows, header))
+    else:
+        for record in records:
+            print(record)
+
+
+def plugin_severity_records(tables, filter_expression=None):
+    """
+    Function yields plugin severity rows of given parts as soon as every part is ready. Filter which selects or
+    reshapes rows one by one is applied to every part separately, other filters, e.g. sort_by(@, &S)[:10], are
+    applied to rows of all parts when all parts are ready, so result is the same as in table. When generator is
+    closed, e.g. after --limit rows, given parts are closed too, so files are not read any further.
+    :param tables: iterable of ScanTable
+    :param filter_expression: JMESPath expression
+    :return: generator of rows
+    """
+    try:
+        if filter_expression is None:
+            for table in tables:
+                yield from table.records()
+        elif nfr.table.plugin_severity_filter_is_row_wise(filter_expression):
+            expression = jmespath.compile(filter_expression)
+            for table in tables:
+                yield from plugin_severity_search(expression, list(table.records()))
+        else:
+            records = [record for table in tables for record in table.records()]
+            yield from plugin_severity_search(
+                jmespath.compile(filter_expression), records
+            )
+    finally:
+        if hasattr(tables, "close"):
+            tables.close()
+
+
+def plugin_severity_value_key(column):
+    """
+    Function returns function which returns numeric value of given column of plugin severity row, used by --top.
+    Missing and not numeric values, e.g. in rows projected by --filter, are lower than any number.
+    :param column: column name
+    :return: function
+    """
+
+    def value_key(record):
+        value = record.get(column) if isinstance(record, dict) else None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return -math.inf
+
+    return value_key
+
+
+def plugin_severity_top(records, number, column):
+    """
+    Function returns given number of plugin severity rows with the highest value of given column, in descending
+    order of that column. Rows are kept in bounded heap, so at most given number of rows is kept in memory.
+    Rows with equal value are returned in order of given rows.
+    :param records: iterable of rows
+    :param number: number of rows
+    :param column: column name
+    :return: list of rows
+    """
+    return heapq.nlargest(number, records, key=plugin_severity_value_key(column))
+
+
+def plugin_severity_limit(records, number):
+    """
+    Function yields first given number of plugin severity rows and closes given generator of rows, so files are
+    not read any further.
+    :param records: generator of rows, e.g. from plugin_severity_records
+    :param number: number of rows
+    :return: generator of rows
+    """
+    try:
+        yield from itertools.islice(records, number)
+    finally:
+        records.close()
+
+
+def plugin_severity_stream(records, output, output_file, sort=False):
+    """
+    Function writes given plugin severity rows to given file in csv or jsonl format as soon as they are ready.
+    If sort is True rows are sorted with external merge sort, so memory usage stays bounded, but rows are written
+    after all rows are ready.
+    :param records: iterable of rows, e.g. from plugin_severity_records
+    :param output: 'csv' or 'jsonl'
+    :param output_file: text file object
+    :param sort: if True rows are sorted by report host name, descending severity and plugin id
+    """
+    if sort:
+        records = utilities.external_sort(records, key=plugin_severity_sort_key)
+    _RecordWriter(output, output_file).write(records)
+
+
+class _RecordWriter:
+    """
+    Writer of rows in csv or jsonl format. Columns of csv are taken from the first row, rows which are not
+    dictionaries, e.g. result of JMESPath projection, are written as one value.
+    """
+
+    def __init__(self, output, output_file):
+        self.output = output
+        self.output_file = output_file
+        self.csv_writer = None
+
+    def write(self, records):
+        for record in records:
+            if self.output == "jsonl":
+                self.output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                continue
+            if not isinstance(record, dict):
+                record = {"value": record}
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(
+                    self.output_file, fieldnames=list(record), extrasaction="ignore"
+                )
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow(record)
+        self.output_file.flush()
+
+
 @cli.command()
 @add_arguments(_file_arguments)
 @click.option("--scan-summary", is_flag=True, help="Scan summary")
@@ -169,6 +683,69 @@ def file(files, size, structure, split):
     help="filter data with JMESPath. See https://jmespath.org/ for more information and examples. "
     "Works with --plugin-severity only. ",
 )
+@add_options(_jobs_options)
+@click.option(
+    "--parallel-hosts",
+    is_flag=True,
+    help="split every file into chunks of ReportHost processed in parallel by --jobs processes, "
+    "files are processed one by one. Useful for single big files.",
+)
+@click.option(
+    "--cache",
+    "use_cache",
+    is_flag=True,
+    help="read scans from on-disk cache of parsed scans, scans not cached yet are parsed and saved in cache. "
+    "See nfr cache --help.",
+)
+@click.option(
+    "--output",
+    type=click.Choice(["table", "csv", "jsonl"]),
+    default="table",
+    show_default=True,
+    help="format of plugin severity rows. csv and jsonl rows are written as soon as report hosts are parsed, "
+    "--filter selecting rows, e.g. [?S=='4'].PID, is applied to rows of every report host separately, "
+    "other filters, e.g. sort_by(@, &S)[:10], when all files are parsed.",
+)
+@click.option(
+    "--output-file",
+    type=click.File("w", encoding="utf-8", lazy=True),
+    default="-",
+    help="file for csv and jsonl plugin severity rows, standard output by default",
+)
+@click.option(
+    "--sort",
+    is_flag=True,
+    help="sort csv and jsonl plugin severity rows by report host name, severity and plugin id, "
+    "using external merge sort. Rows are written when all files are parsed. Table is always sorted, "
+    "rows shown with --top are in order of --by column.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    help="show only given number of plugin severity rows with the highest value of --by column, "
+    "in descending order of that column. Rows are kept in bounded heap, --filter selecting rows is applied "
+    "to rows of every report host separately.",
+)
+@click.option(
+    "--by",
+    type=click.Choice(
+        [
+            column
+            for column in nfr.table.PLUGIN_SEVERITY_COLUMNS
+            if nfr.table.COLUMNS[column] != "str"
+        ]
+    ),
+    default="S",
+    show_default=True,
+    help="column used by --top",
+)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    help="show only given number of first plugin severity rows, files are not read any further "
+    "as soon as enough rows are found. Filters other than selecting rows, e.g. sort_by(@, &S)[:10], "
+    "need all files to be read first.",
+)
 def scan(
     files,
     scan_summary,
@@ -178,194 +755,80 @@ def scan(
     scan_file_source,
     policy_summary,
     filter,
+    jobs,
+    parallel_hosts,
+    use_cache,
+    output,
+    output_file,
+    sort,
+    top,
+    by,
+    limit,
 ):
     """Options related to content of nessus file on scan level."""
 
+    if top and limit:
+        raise click.UsageError("--top and --limit can't be used together")
+
     if files:
         try:
             summary_data = []
             scan_file_source_data = []
             policy_summary_data = []
-            plugin_severity_data = []
-            for file in files:
-                if os.path.isdir(file):
-                    os_separator = os.path.sep
-                    extension = "*.nessus"
-                    list_of_source_files = glob.glob(
-                        file + os_separator + "**" + os_separator + extension,
-                        recursive=True,
-                    )
-                else:
-                    list_of_source_files = [file]
-
-                for row_index, nessus_scan_file in enumerate(list_of_source_files):
-
-                    file_name_with_path = nfr.file.nessus_scan_file_name_with_path(
-                        nessus_scan_file
-                    )
-                    file_size = nfr.file.nessus_scan_file_size_human(nessus_scan_file)
-                    # print(nessus_scan_file, file_size)
-                    root = nfr.file.nessus_scan_file_root_element(file_name_with_path)
-                    if policy_summary:
-                        policy_name = nfr.scan.policy_name(root)
-                        policy_max_hosts = nfr.scan.policy_max_hosts(root)
-                        policy_max_checks = nfr.scan.policy_max_checks(root)
-                        policy_checks_read_timeout = (
-                            nfr.scan.policy_checks_read_timeout(root)
-                        )
-                        plugin_set_number = nfr.scan.plugin_set_number(root)
-                        policy_summary_data.append(
-                            {
-                                "File name": nessus_scan_file,
-                                "Policy name": policy_name,
-                                "Max hosts": policy_max_hosts,
-                                "Max checks": policy_max_checks,
-                                "Checks timeout": policy_checks_read_timeout,
-                                "Plugins number": plugin_set_number,
-                            }
-                        )
-
-                    if scan_file_source:
-                        scan_file_source_info = nfr.scan.scan_file_source(root)
-                        scan_file_source_data.append(
-                            {
-                                "File name": nessus_scan_file,
-                                "Source": scan_file_source_info,
-                            }
-                        )
-
-                    if scan_summary:
+            plugin_severity_data = nfr.table.ScanTable()
 
-                        report_name = nfr.scan.report_name(root)
-                        number_of_target_hosts = nfr.scan.number_of_target_hosts(root)
-                        number_of_scanned_hosts = nfr.scan.number_of_scanned_hosts(root)
-                        number_of_scanned_hosts_with_credentialed_checks_yes = nfr.scan.number_of_scanned_hosts_with_credentialed_checks_yes(
-                            root
-                        )
+            source_files = [
+                nessus_scan_file
+                for file in files
+                for nessus_scan_file in list_of_source_files(file)
+            ]
 
-                        report_host_critical = 0
-                        report_host_high = 0
-                        report_host_medium = 0
-                        report_host_low = 0
-                        report_host_none = 0
-
-                        for report_host in nfr.scan.report_hosts(root):
-                            report_host_critical += (
-                                nfr.host.number_of_plugins_per_risk_factor(
-                                    report_host, "Critical"
-                                )
-                            )
-                            report_host_high += (
-                                nfr.host.number_of_plugins_per_risk_factor(
-                                    report_host, "High"
-                                )
-                            )
-                            report_host_medium += (
-                                nfr.host.number_of_plugins_per_risk_factor(
-                                    report_host, "Medium"
-                                )
-                            )
-                            report_host_low += (
-                                nfr.host.number_of_plugins_per_risk_factor(
-                                    report_host, "Low"
-                                )
-                            )
-                            report_host_none += (
-                                nfr.host.number_of_plugins_per_risk_factor(
-                                    report_host, "None"
-                                )
-                            )
+            if plugin_severity and (output != "table" or top or limit):
+                records = plugin_severity_records(
+                    plugin_severity_tables(
+                        source_files, jobs, parallel_hosts, use_cache, filter
+                    ),
+                    filter,
+                )
+                if top:
+                    records = plugin_severity_top(records, top, by)
+                elif limit:
+                    records = plugin_severity_limit(records, limit)
+                    if output == "table":
+                        records = sorted(records, key=plugin_severity_sort_key)
 
-                        summary_data.append(
-                            {
-                                "File name": nessus_scan_file,
-                                "Report name": report_name,
-                                "TH": number_of_target_hosts,
-                                "SH": number_of_scanned_hosts,
-                                "CC": number_of_scanned_hosts_with_credentialed_checks_yes,
-                                "C": report_host_critical,
-                                "H": report_host_high,
-                                "M": report_host_medium,
-                                "L": report_host_low,
-                                "N": report_host_none,
-                            }
-                        )
+                if output == "table":
+                    plugin_severity_print(list(records))
+                else:
+                    plugin_severity_stream(
+                        records, output, output_file, sort and not top
+                    )
+                # rows have been already written
+                plugin_severity = False
+                if not (scan_summary or scan_file_source or policy_summary):
+                    source_files = []
 
-                    if plugin_severity:
-
-                        for report_host in nfr.scan.report_hosts(root):
-                            report_host_name = nfr.host.report_host_name(report_host)
-                            report_items_per_host = nfr.host.report_items(report_host)
-                            for report_item in report_items_per_host:
-                                plugin_id = nfr.plugin.report_item_value(
-                                    report_item, "pluginID"
-                                )
-                                severity = nfr.plugin.report_item_value(
-                                    report_item, "severity"
-                                )
-                                severity_label = nfr.plugin.severity_number_to_label(
-                                    severity
-                                )
-                                risk_factor = nfr.plugin.report_item_value(
-                                    report_item, "risk_factor"
-                                )
-                                cvssv2_base_score = nfr.plugin.report_item_value(
-                                    report_item, "cvss_base_score"
-                                )
-                                cvssv2_base_score_label = (
-                                    nfr.plugin.cvssv2_score_to_severity(
-                                        cvssv2_base_score
-                                    )
-                                )
-                                cvssv3_base_score = nfr.plugin.report_item_value(
-                                    report_item, "cvss3_base_score"
-                                )
-                                cvssv3_base_score_label = (
-                                    nfr.plugin.cvssv3_score_to_severity(
-                                        cvssv3_base_score
-                                    )
-                                )
-                                cvssv4_base_score = nfr.plugin.report_item_value(
-                                    report_item, "cvss4_base_score"
-                                )
-                                cvssv4_base_score_label = (
-                                    nfr.plugin.cvssv4_score_to_severity(
-                                        cvssv4_base_score
-                                    )
-                                )
-                                vpr_score = nfr.plugin.report_item_value(
-                                    report_item, "vpr_score"
-                                )
-                                vpr_score_label = nfr.plugin.vpr_score_to_severity(
-                                    vpr_score
-                                )
-                                epss_score = nfr.plugin.report_item_value(
-                                    report_item, "epss_score"
-                                )
-                                epss_score_label = (
-                                    nfr.plugin.epss_score_decimal_to_percent(epss_score)
-                                )
-
-                                plugin_severity_data.append(
-                                    {
-                                        "File name": nessus_scan_file,
-                                        "Report host name": report_host_name,
-                                        "PID": plugin_id,
-                                        "S": severity,
-                                        "SL": severity_label,
-                                        "RF": risk_factor,
-                                        "CVSSv2": cvssv2_base_score,
-                                        "CVSSv2L": cvssv2_base_score_label,
-                                        "CVSSv3": cvssv3_base_score,
-                                        "CVSSv3L": cvssv3_base_score_label,
-                                        "CVSSv4": cvssv4_base_score,
-                                        "CVSSv4L": cvssv4_base_score_label,
-                                        "VPR": vpr_score,
-                                        "VPRL": vpr_score_label,
-                                        "EPSS": epss_score,
-                                        "EPSS%": epss_score_label,
-                                    }
-                                )
+            for data in utilities.ordered_parallel_map(
+                functools.partial(
+                    scan_file_data,
+                    scan_summary=scan_summary,
+                    plugin_severity=plugin_severity,
+                    scan_file_source=scan_file_source,
+                    policy_summary=policy_summary,
+                    parallel_hosts_jobs=jobs if parallel_hosts else 1,
+                    use_cache=use_cache,
+                    plugin_severity_filter=filter if plugin_severity else None,
+                ),
+                source_files,
+                1 if parallel_hosts else jobs,
+            ):
+                if data["summary"] is not None:
+                    summary_data.append(data["summary"])
+                if data["scan_file_source"] is not None:
+                    scan_file_source_data.append(data["scan_file_source"])
+                if data["policy_summary"] is not None:
+                    policy_summary_data.append(data["policy_summary"])
+                plugin_severity_data.extend(data["plugin_severity"])
 
             if scan_summary:
                 header = summary_data[0].keys()
@@ -374,23 +837,22 @@ def scan(
 
             if plugin_severity:
 
-                default_filter = "@"
-
                 if filter:
-                    expression = jmespath.compile(filter)
+                    records = plugin_severity_search(
+                        jmespath.compile(filter), list(plugin_severity_data.records())
+                    )
+                    plugin_severity_print(sorted(records, key=plugin_severity_sort_key))
                 else:
-                    expression = jmespath.compile(default_filter)
-
-                plugin_severity_data = expression.search(plugin_severity_data)
-
-                plugin_severity_data.sort(
-                    key=lambda x: (x["Report host name"], -int(x["S"]), int(x["PID"]))
-                )
-
-                header = plugin_severity_data[0].keys()
-                rows = [x.values() for x in plugin_severity_data]
-
-                print(tabulate.tabulate(rows, header))
+                    # without filter rows are sorted and printed straight from columns
+                    header = nfr.table.PLUGIN_SEVERITY_COLUMNS
+                    rows = list(
+                        plugin_severity_data.rows(
+                            indices=plugin_severity_data.sorted_indices(
+                                ["Report host name", "-S", "PID"]
+                            )
+                        )
+                    )
+                    print(tabulate.tabulate(rows, header))
 
             if scan_file_source:
                 header = scan_file_source_data[0].keys()
@@ -440,9 +902,133 @@ def scan(
         print("EPSS% - Exploit Prediction Scoring System score of plugin in percentage")
 
 
+@cli.command()
+@add_arguments(_file_arguments)
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(["parquet", "sqlite"]),
+    required=True,
+    help="parquet - hosts.parquet, findings.parquet and plugins.parquet files in --output directory, "
+    "requires pyarrow: pip install nessus-file-reader[parquet]; "
+    "sqlite - database file --output with files, hosts, host_properties, report_items, plugins and cves tables, "
+    "see nfr query --help",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(),
+    required=True,
+    help="output directory for parquet, database file for sqlite",
+)
+@click.option(
+    "--row-group-size",
+    type=click.IntRange(min=1),
+    default=nfr.export.ROW_GROUP_SIZE,
+    show_default=True,
+    help="number of rows kept in memory and written as one row group, for parquet",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=nfr.export.BATCH_SIZE,
+    show_default=True,
+    help="number of rows inserted in one transaction, for sqlite",
+)
+def export(files, export_format, output, row_group_size, batch_size):
+    """Export report hosts, findings and plugins of nessus files for analytics tools."""
+
+    if files:
+        source_files = (
+            nessus_scan_file
+            for file in files
+            for nessus_scan_file in list_of_source_files(file)
+        )
+        try:
+            if export_format == "sqlite":
+                rows = nfr.export.export_sqlite(source_files, output, batch_size)
+            else:
+                rows = nfr.export.export_parquet(source_files, output, row_group_size)
+        except FileNotFoundError as e:
+            print(e.strerror)
+        except ImportError as e:
+            print(e)
+        else:
+            print(tabulate.tabulate(rows.items(), ["Table", "Rows"]))
+
+
+@cli.command()
+@click.argument("database", type=click.Path())
+@click.argument("sql")
+def query(database, sql):
+    """Run SQL query against sqlite database created by nfr export --format sqlite."""
+
+    try:
+        header, rows = nfr.export.query_sqlite(database, sql)
+    except FileNotFoundError as e:
+        print(e.strerror)
+    except sqlite3.Error as e:
+        print(e)
+    else:
+        print(tabulate.tabulate(rows, header))
+
+
+@cli.group()
+def cache():
+    """Options related to on-disk cache of parsed scans used by nfr scan --cache."""
+
+
+@cache.command()
+def stats():
+    """Show location, number of entries and size of cache."""
+    cache_stats = nfr.cache.cache_stats()
+    rows = [
+        ["Directory", cache_stats["directory"]],
+        ["Entries", cache_stats["entries"]],
+        ["Paths", cache_stats["paths"]],
+        [
+            "Size",
+            f"{nfr.file._size_human(cache_stats['size'])} ({cache_stats['size']} B)",
+        ],
+        [
+            "Max size",
+            f"{nfr.file._size_human(cache_stats['max_size'])} ({cache_stats['max_size']} B)",
+        ],
+    ]
+    print(tabulate.tabulate(rows))
+
+
+@cache.command()
+def clear():
+    """Remove all entries from cache."""
+    removed = nfr.cache.cache_clear()
+    print(f"Removed {removed} cache entries from {nfr.cache.cache_directory()}")
+
+
+def banner_file(arguments):
+    """
+    Function returns file for nfr banner for given command line arguments. Banner goes to standard error if output
+    is csv, jsonl or parquet or if --output-file is given, so output contains only data, otherwise to standard output.
+    :param arguments: command line arguments without program name
+    :return: sys.stdout or sys.stderr
+    """
+    for position, argument in enumerate(arguments):
+        option, equals_sign, value = argument.partition("=")
+        if option == "--output-file":
+            return sys.stderr
+        if option in ("--output", "--format"):
+            if not equals_sign:
+                value = (
+                    arguments[position + 1] if position + 1 < len(arguments) else None
+                )
+            if value in ("csv", "jsonl", "parquet"):
+                return sys.stderr
+    return sys.stdout
+
+
 def main():
     name = "nessus file reader (NFR) by LimberDuck"
-    print("{} {}".format(name, __version__))
+    print("{} {}".format(name, __version__), file=banner_file(sys.argv[1:]))
     cli()
 
 
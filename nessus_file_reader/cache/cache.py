@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+"""
+nessus file reader (NFR) by LimberDuck (pronounced *ˈlɪm.bɚ dʌk*) is a python module
+created to quickly parse nessus files containing the results of scans
+performed by using Nessus by (C) Tenable, Inc.
+Copyright (C) 2019 Damian Krawczyk
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import io
+import json
+import hashlib
+import tempfile
+import threading
+import collections
+from xml.sax.saxutils import escape, quoteattr
+from nessus_file_reader import utilities
+from nessus_file_reader.file import file as nfr_file
+from nessus_file_reader.plugin import plugin
+from nessus_file_reader.xml_backend import fromstring, parse
+
+# default upper bound of total size of cached scans in bytes
+CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# version of compact copy of scan kept in cache, it has to be increased whenever content of compact copy changes,
+# e.g. _REPORT_ITEM_FIELDS, so entries written by previous versions are not used
+CACHE_FORMAT_VERSION = 2
+
+# default upper bound of estimated memory size of root elements kept in memory in bytes
+ROOT_ELEMENTS_MAX_SIZE = 512 * 1024 * 1024
+
+# children of ReportItem kept in cached scan, other ones e.g. description, solution, see_also are dropped
+_REPORT_ITEM_FIELDS = frozenset(
+    [
+        "risk_factor",
+        "plugin_name",
+        "plugin_type",
+        "cvss_base_score",
+        "cvss3_base_score",
+        "cvss4_base_score",
+        "vpr_score",
+        "epss_score",
+        "cve",
+        "compliance",
+    ]
+)
+
+_CACHE_ENTRY_EXTENSION = ".nessus"
+_CACHE_PATH_EXTENSION = ".json"
+
+
+def cache_directory():
+    """
+    Function returns directory of on-disk cache of parsed scans. It is taken from NFR_CACHE_DIR environment variable,
+    otherwise nfr directory in XDG_CACHE_HOME or ~/.cache is used.
+    :return: path to cache directory
+    """
+    directory = os.environ.get("NFR_CACHE_DIR")
+    if not directory:
+        directory = os.path.join(
+            os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"),
+            "nfr",
+        )
+    return directory
+
+
+def cache_max_size():
+    """
+    Function returns upper bound of total size of cached scans in bytes, taken from NFR_CACHE_MAX_SIZE environment
+    variable or CACHE_MAX_SIZE by default.
+    :return: size in bytes
+    """
+    try:
+        return int(os.environ["NFR_CACHE_MAX_SIZE"])
+    except (KeyError, ValueError):
+        return CACHE_MAX_SIZE
+
+
+def _entries_directory():
+    return os.path.join(cache_directory(), "entries")
+
+
+def _paths_directory():
+    return os.path.join(cache_directory(), "paths")
+
+
+def _file_stat(file):
+    """
+    Function returns stat of given nessus file, for file inside archive stat of archive.
+    :param file: given nessus file
+    :return: os.stat_result
+    """
+    member = utilities.archive_member(file)
+    if member is not None:
+        return os.stat(member[0])
+    return os.stat(file)
+
+
+def nessus_scan_file_content_hash(file):
+    """
+    Function returns hash of content of given nessus file. Compressed file and file inside archive are hashed
+    after decompression, so the same scan has the same hash regardless of the way it is stored.
+    :param file: given nessus file
+    :return: hexadecimal blake2b digest
+    """
+    content_hash = hashlib.blake2b(digest_size=20)
+    with utilities.open_nessus_file(file) as nessus_file:
+        chunk = nessus_file.read(1024 * 1024)
+        while chunk:
+            content_hash.update(chunk)
+            chunk = nessus_file.read(1024 * 1024)
+    return content_hash.hexdigest()
+
+
+def _start_tag(element):
+    """
+    Function returns start tag of given element with escaped attributes. Namespaced tag e.g.
+    {http://www.nessus.org/cm}compliance-result gets prefix declared in this tag.
+    :param element: element from any XML backend
+    :return: tuple of start tag and end tag
+    """
+    tag = element.tag
+    namespace = ""
+    if tag.startswith("{"):
+        namespace_uri, tag = tag[1:].split("}", 1)
+        tag = "ns:" + tag
+        namespace = " xmlns:ns=" + quoteattr(namespace_uri)
+    attributes = "".join(
+        f" {name}={quoteattr(value)}" for name, value in element.attrib.items()
+    )
+    return f"<{tag}{namespace}{attributes}>", f"</{tag}>"
+
+
+def _serialize_element(element, output):
+    """
+    Function appends given element with all its descendants serialized to XML to given list.
+    :param element: element from any XML backend
+    :param output: list of strings
+    """
+    start_tag, end_tag = _start_tag(element)
+    output.append(start_tag)
+    if element.text:
+        output.append(escape(element.text))
+    for child in element:
+        _serialize_element(child, output)
+    output.append(end_tag)
+
+
+def write_compact_root_element(root, compact_file):
+    """
+    Function writes compact copy of given root element with scan results, which contains whole Policy section,
+    host properties, attributes of report items and only those children of report items which are used by nfr
+    functions, e.g. risk_factor, CVSS, VPR and EPSS scores, CVE numbers and compliance results.
+    :param root: root element of nessus file
+    :param compact_file: binary file object
+    """
+    compact_file.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
+    root_start_tag, root_end_tag = _start_tag(root)
+    compact_file.write(root_start_tag.encode("utf-8"))
+    for element in root:
+        output = []
+        if element.tag != "Report":
+            _serialize_element(element, output)
+            compact_file.write("".join(output).encode("utf-8"))
+            continue
+        report_start_tag, report_end_tag = _start_tag(element)
+        compact_file.write(report_start_tag.encode("utf-8"))
+        for report_host in element:
+            output = []
+            report_host_start_tag, report_host_end_tag = _start_tag(report_host)
+            output.append(report_host_start_tag)
+            for child in report_host:
+                if child.tag != "ReportItem":
+                    _serialize_element(child, output)
+                    continue
+                report_item_start_tag, report_item_end_tag = _start_tag(child)
+                output.append(report_item_start_tag)
+                # output is kept only for plugins parsed by nfr.plugin.plugin_output_record
+                keep_plugin_output = (
+                    child.get("pluginID") in plugin.PLUGIN_OUTPUT_PARSERS
+                )
+                for field in child:
+                    tag = field.tag
+                    if (
+                        tag in _REPORT_ITEM_FIELDS
+                        or tag.startswith("{")
+                        or (keep_plugin_output and tag == "plugin_output")
+                    ):
+                        _serialize_element(field, output)
+                output.append(report_item_end_tag)
+            output.append(report_host_end_tag)
+            compact_file.write("".join(output).encode("utf-8"))
+        compact_file.write(report_end_tag.encode("utf-8"))
+    compact_file.write(root_end_tag.encode("utf-8"))
+
+
+def _write_atomically(path, write):
+    """
+    Function writes file by given write function to temporary file and moves it to given path, so other processes
+    never see partially written file.
+    :param path: destination path
+    :param write: function called with binary file object
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as temporary_file:
+            write(temporary_file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def _path_record_file(file):
+    path_key = hashlib.blake2b(
+        os.path.abspath(file).encode("utf-8"), digest_size=20
+    ).hexdigest()
+    return os.path.join(_paths_directory(), path_key + _CACHE_PATH_EXTENSION)
+
+
+def _entry_file(content_hash):
+    """
+    Function returns path to cache entry of scan with given content hash. Name of entry contains CACHE_FORMAT_VERSION
+    and hash of ids of plugins with kept output, which can be extended by nfr.plugin.plugin_output_parser, so entries
+    with different content of compact copy are never used.
+    :param content_hash: hash of content of nessus file
+    :return: path to cache entry
+    """
+    plugin_ids_hash = hashlib.blake2b(
+        ",".join(sorted(plugin.PLUGIN_OUTPUT_PARSERS)).encode("utf-8"), digest_size=4
+    ).hexdigest()
+    return os.path.join(
+        _entries_directory(),
+        f"{content_hash}.v{CACHE_FORMAT_VERSION}.{plugin_ids_hash}{_CACHE_ENTRY_EXTENSION}",
+    )
+
+
+def _read_nessus_file(file):
+    """
+    Function reads whole content of given nessus file, decompressed or extracted from archive, and computes its hash
+    on the way, so content which has been read to compute hash can be parsed without reading file again.
+    :param file: given nessus file
+    :return: tuple of hexadecimal blake2b digest and content
+    """
+    content_hash = hashlib.blake2b(digest_size=20)
+    content = io.BytesIO()
+    with utilities.open_nessus_file(file) as nessus_file:
+        chunk = nessus_file.read(1024 * 1024)
+        while chunk:
+            content_hash.update(chunk)
+            content.write(chunk)
+            chunk = nessus_file.read(1024 * 1024)
+    return content_hash.hexdigest(), content.getvalue()
+
+
+def _cached_entry_file(file, file_stat):
+    """
+    Function returns cache entry of given nessus file, looked up by path, size and modification time first and by
+    content hash if file has been changed or copied.
+    :param file: given nessus file
+    :param file_stat: stat of given nessus file
+    :return: tuple of content hash, path to cache entry or None if scan is not cached and content of file if it has
+        been read to compute content hash, otherwise None
+    """
+    path_record_file = _path_record_file(file)
+    try:
+        with open(path_record_file, "r", encoding="utf-8") as path_record_content:
+            path_record = json.load(path_record_content)
+    except (OSError, ValueError):
+        path_record = None
+    if (
+        path_record is not None
+        and path_record.get("size") == file_stat.st_size
+        and path_record.get("mtime_ns") == file_stat.st_mtime_ns
+    ):
+        content_hash = path_record.get("content_hash")
+        content = None
+    else:
+        content_hash, content = _read_nessus_file(file)
+
+    entry_file = _entry_file(content_hash)
+    if not os.path.isfile(entry_file):
+        return content_hash, None, content
+    if path_record is None or path_record.get("content_hash") != content_hash:
+        _save_path_record(file, file_stat, content_hash)
+    return content_hash, entry_file, content
+
+
+def _save_path_record(file, file_stat, content_hash):
+    path_record = {
+        "path": os.path.abspath(file),
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "content_hash": content_hash,
+    }
+    _write_atomically(
+        _path_record_file(file),
+        lambda path_record_content: path_record_content.write(
+            json.dumps(path_record).encode("utf-8")
+        ),
+    )
+
+
+def _evict(max_size):
+    """
+    Function removes least recently used cache entries until total size of cache entries is not greater than
+    given size. Path records of removed entries are removed too.
+    :param max_size: size in bytes
+    :return: number of removed cache entries
+    """
+    entries = []
+    for entry in os.scandir(_entries_directory()):
+        if entry.name.endswith(_CACHE_ENTRY_EXTENSION):
+            entry_stat = entry.stat()
+            entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry.path))
+    entries.sort()
+    total_size = sum(entry_size for _, entry_size, _ in entries)
+    removed = 0
+    for _, entry_size, entry_path in entries:
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(entry_path)
+        except OSError:
+            continue
+        total_size -= entry_size
+        removed += 1
+    if removed:
+        _evict_path_records()
+    return removed
+
+
+def _evict_path_records():
+    """
+    Function removes path records which point to cache entries which don't exist any more.
+    """
+    for entry in os.scandir(_paths_directory()):
+        if not entry.name.endswith(_CACHE_PATH_EXTENSION):
+            continue
+        try:
+            with open(entry.path, "r", encoding="utf-8") as path_record_content:
+                content_hash = json.load(path_record_content).get("content_hash")
+        except (OSError, ValueError):
+            content_hash = None
+        if content_hash is None or not os.path.isfile(_entry_file(content_hash)):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def cached_root_element(file, max_size=None):
+    """
+    Function returns root element of given nessus file, read from on-disk cache of parsed scans if this scan has been
+    cached before. Otherwise file is parsed and its compact copy, see write_compact_root_element, is saved in cache.
+    Cache entry is found by path, size and modification time of file, or by hash of its content if file has been
+    changed or copied, and least recently used entries are removed when total size of cache exceeds max_size.
+    Root element read from cache contains only data used by nfr functions, e.g. descriptions and outputs of most
+    plugins are not available. Compact copy is kept as XML, so every hit parses it again, which is cheaper than parsing
+    nessus file as it's smaller, but it's still parsing of the whole scan. Use load_root_element to keep root element
+    in memory between calls. File which is not cached yet is read once, content read to compute its hash is parsed.
+    :param file: given nessus file
+    :param max_size: upper bound of total size of cache in bytes, cache_max_size() by default
+    :return: root element
+    """
+    if max_size is None:
+        max_size = cache_max_size()
+    file_stat = _file_stat(file)
+    content_hash, entry_file, content = _cached_entry_file(file, file_stat)
+    if entry_file is not None:
+        try:
+            root = parse(entry_file).getroot()
+        except (OSError, SyntaxError):
+            # entry removed by other process or damaged, scan is parsed again
+            pass
+        else:
+            # modification time of entry marks its last use
+            os.utime(entry_file)
+            return root
+
+    if content is not None:
+        root = fromstring(content)
+        del content
+    else:
+        root = nfr_file.nessus_scan_file_root_element(file)
+    _write_atomically(
+        _entry_file(content_hash),
+        lambda entry_content: write_compact_root_element(root, entry_content),
+    )
+    _save_path_record(file, file_stat, content_hash)
+    _evict(max_size)
+    return root
+
+
+def cache_stats():
+    """
+    Function returns statistics of on-disk cache of parsed scans.
+    :return: dictionary with cache directory, number of entries, number of known paths, total size and max size
+    """
+    entries = 0
+    size = 0
+    paths = 0
+    if os.path.isdir(_entries_directory()):
+        for entry in os.scandir(_entries_directory()):
+            if entry.name.endswith(_CACHE_ENTRY_EXTENSION):
+                entries += 1
+                size += entry.stat().st_size
+    if os.path.isdir(_paths_directory()):
+        for entry in os.scandir(_paths_directory()):
+            if entry.name.endswith(_CACHE_PATH_EXTENSION):
+                paths += 1
+    return {
+        "directory": cache_directory(),
+        "entries": entries,
+        "paths": paths,
+        "size": size,
+        "max_size": cache_max_size(),
+    }
+
+
+def cache_clear():
+    """
+    Function removes all entries from on-disk cache of parsed scans.
+    :return: number of removed entries
+    """
+    removed = 0
+    for directory, extension in [
+        (_entries_directory(), _CACHE_ENTRY_EXTENSION),
+        (_paths_directory(), _CACHE_PATH_EXTENSION),
+    ]:
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.name.endswith((extension, ".tmp")):
+                os.remove(entry.path)
+                if extension == _CACHE_ENTRY_EXTENSION:
+                    removed += 1
+    return removed
+
+
+# root elements kept in memory, from least to most recently used, path: (size, mtime_ns, estimated size, root)
+_root_elements = collections.OrderedDict()
+_root_elements_lock = threading.Lock()
+_root_elements_max_size = ROOT_ELEMENTS_MAX_SIZE
+_root_elements_stats = {"hits": 0, "misses": 0, "evictions": 0, "size": 0}
+
+
+def root_element_size_estimate(root):
+    """
+    Function returns estimated memory size of tree of given root element, counted from number of elements,
+    number of attributes and length of texts.
+    :param root: root element
+    :return: estimated size in bytes
+    """
+    size = 0
+    for element in root.iter():
+        size += 150 + 60 * len(element.attrib) + len(element.text or "")
+    return size
+
+
+def set_root_elements_max_size(max_size):
+    """
+    Function sets upper bound of estimated memory size of root elements kept in memory by load_root_element,
+    least recently used root elements are removed if they exceed it.
+    :param max_size: size in bytes, 0 disables keeping root elements in memory
+    """
+    global _root_elements_max_size
+    with _root_elements_lock:
+        _root_elements_max_size = max_size
+        _root_elements_evict()
+
+
+def _root_elements_evict():
+    while _root_elements and _root_elements_stats["size"] > _root_elements_max_size:
+        _, (_, _, root_size, _) = _root_elements.popitem(last=False)
+        _root_elements_stats["size"] -= root_size
+        _root_elements_stats["evictions"] += 1
+
+
+def load_root_element(file):
+    """
+    Function returns root element of given nessus file, kept in memory for next calls with the same file as long as
+    file is not modified. Root elements are removed from memory, least recently used first, if their estimated size
+    exceeds limit set by set_root_elements_max_size, ROOT_ELEMENTS_MAX_SIZE by default. Returned root element is
+    shared between calls, so it should not be modified.
+    :param file: given nessus file
+    :return: root element
+    """
+    path = os.path.abspath(file)
+    file_stat = _file_stat(file)
+    with _root_elements_lock:
+        root_element = _root_elements.get(path)
+        if root_element is not None:
+            root_file_size, root_mtime_ns, root_size, root = root_element
+            if (
+                root_file_size == file_stat.st_size
+                and root_mtime_ns == file_stat.st_mtime_ns
+            ):
+                _root_elements.move_to_end(path)
+                _root_elements_stats["hits"] += 1
+                return root
+            # file has been modified since it was parsed
+            del _root_elements[path]
+            _root_elements_stats["size"] -= root_size
+        _root_elements_stats["misses"] += 1
+
+    root = nfr_file.nessus_scan_file_root_element(file)
+    root_size = root_element_size_estimate(root)
+    with _root_elements_lock:
+        if root_size <= _root_elements_max_size:
+            previous_root_element = _root_elements.pop(path, None)
+            if previous_root_element is not None:
+                _root_elements_stats["size"] -= previous_root_element[2]
+            _root_elements[path] = (
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+                root_size,
+                root,
+            )
+            _root_elements_stats["size"] += root_size
+            _root_elements_evict()
+    return root
+
+
+def root_elements_stats():
+    """
+    Function returns statistics of root elements kept in memory by load_root_element.
+    :return: dictionary with number of hits, misses, evictions, number of root elements, their estimated size
+        and max size
+    """
+    with _root_elements_lock:
+        stats = dict(_root_elements_stats)
+        stats["entries"] = len(_root_elements)
+        stats["max_size"] = _root_elements_max_size
+    return stats
+
+
+def root_elements_clear():
+    """
+    Function removes all root elements kept in memory by load_root_element and resets statistics.
+    """
+    with _root_elements_lock:
+        _root_elements.clear()
+        for key in _root_elements_stats:
+            _root_elements_stats[key] = 0
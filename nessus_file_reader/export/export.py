@@ -0,0 +1,651 @@
+# -*- coding: utf-8 -*-
+"""
+nessus file reader (NFR) by LimberDuck (pronounced *ˈlɪm.bɚ dʌk*) is a python module
+created to quickly parse nessus files containing the results of scans
+performed by using Nessus by (C) Tenable, Inc.
+Copyright (C) 2019 Damian Krawczyk
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import errno
+import pathlib
+import sqlite3
+from nessus_file_reader.file import file as nfr_file
+from nessus_file_reader.host import host
+from nessus_file_reader.plugin import plugin
+from nessus_file_reader.scan import scan
+
+# default number of rows in one row group of parquet file, memory usage of export depends on it
+ROW_GROUP_SIZE = 100000
+
+# default number of rows inserted to sqlite database in one transaction
+BATCH_SIZE = 10000
+
+# columns of exported tables with their types: 'str', 'int', 'float', 'datetime' or 'list'
+HOSTS_COLUMNS = {
+    "file": "str",
+    "report_host_name": "str",
+    "host_ip": "str",
+    "host_fqdn": "str",
+    "netbios_name": "str",
+    "operating_system": "str",
+    "mac_address": "str",
+    "host_start": "datetime",
+    "host_end": "datetime",
+    "credentialed_checks": "str",
+    "number_of_plugins": "int",
+    "critical": "int",
+    "high": "int",
+    "medium": "int",
+    "low": "int",
+    "none": "int",
+}
+
+FINDINGS_COLUMNS = {
+    "file": "str",
+    "report_host_name": "str",
+    "plugin_id": "int",
+    "port": "int",
+    "protocol": "str",
+    "svc_name": "str",
+    "severity": "int",
+    "risk_factor": "str",
+    "cvss_base_score": "float",
+    "cvss3_base_score": "float",
+    "cvss4_base_score": "float",
+    "vpr_score": "float",
+    "epss_score": "float",
+    "cve": "list",
+    "plugin_output": "str",
+}
+
+PLUGINS_COLUMNS = {
+    "plugin_id": "int",
+    "plugin_name": "str",
+    "plugin_family": "str",
+    "plugin_type": "str",
+    "synopsis": "str",
+    "description": "str",
+    "solution": "str",
+    "see_also": "str",
+    "cvss_vector": "str",
+    "cvss3_vector": "str",
+    "cvss4_vector": "str",
+    "plugin_publication_date": "str",
+    "plugin_modification_date": "str",
+}
+
+# text columns with few distinct values, dictionary encoded in parquet files
+_DICTIONARY_COLUMNS = {
+    "file",
+    "report_host_name",
+    "protocol",
+    "svc_name",
+    "risk_factor",
+    "operating_system",
+    "credentialed_checks",
+    "plugin_family",
+    "plugin_type",
+}
+
+
+def _int_value(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_value(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def host_record(root, report_host, nessus_scan_file):
+    """
+    Function returns data of given report host for export.
+    :param root: root element of scan file tree
+    :param report_host: report host element
+    :param nessus_scan_file: given nessus file name
+    :return: dictionary with values for HOSTS_COLUMNS
+    """
+    risk_factors = host.risk_factor_histogram(report_host)
+    return {
+        "file": nessus_scan_file,
+        "report_host_name": host.report_host_name(report_host),
+        "host_ip": host.resolved_ip(report_host),
+        "host_fqdn": host.resolved_fqdn(report_host),
+        "netbios_name": host.host_property_value(report_host, "netbios-name"),
+        "operating_system": host.detected_os(report_host) or None,
+        "mac_address": host.host_property_value(report_host, "mac-address"),
+        "host_start": host.host_time_start(report_host),
+        "host_end": host.host_time_end(report_host),
+        "credentialed_checks": host.credentialed_checks(root, report_host),
+        "number_of_plugins": host.number_of_plugins(report_host),
+        "critical": risk_factors["Critical"],
+        "high": risk_factors["High"],
+        "medium": risk_factors["Medium"],
+        "low": risk_factors["Low"],
+        "none": risk_factors["None"],
+    }
+
+
+def finding_record(report_item, report_host_name, nessus_scan_file):
+    """
+    Function returns data of given report item for export.
+    :param report_item: report item element
+    :param report_host_name: name of report host of given report item
+    :param nessus_scan_file: given nessus file name
+    :return: dictionary with values for FINDINGS_COLUMNS
+    """
+    return {
+        "file": nessus_scan_file,
+        "report_host_name": report_host_name,
+        "plugin_id": _int_value(report_item.get("pluginID")),
+        "port": _int_value(report_item.get("port")),
+        "protocol": report_item.get("protocol"),
+        "svc_name": report_item.get("svc_name"),
+        "severity": _int_value(report_item.get("severity")),
+        "risk_factor": plugin.report_item_value(report_item, "risk_factor"),
+        "cvss_base_score": _float_value(
+            plugin.report_item_value(report_item, "cvss_base_score")
+        ),
+        "cvss3_base_score": _float_value(
+            plugin.report_item_value(report_item, "cvss3_base_score")
+        ),
+        "cvss4_base_score": _float_value(
+            plugin.report_item_value(report_item, "cvss4_base_score")
+        ),
+        "vpr_score": _float_value(plugin.report_item_value(report_item, "vpr_score")),
+        "epss_score": _float_value(plugin.report_item_value(report_item, "epss_score")),
+        "cve": plugin.report_item_values(report_item, "cve"),
+        "plugin_output": plugin.report_item_value(report_item, "plugin_output"),
+    }
+
+
+def plugin_record(report_item):
+    """
+    Function returns metadata of plugin of given report item for export.
+    :param report_item: report item element
+    :return: dictionary with values for PLUGINS_COLUMNS
+    """
+    plugin_record_data = {
+        "plugin_id": _int_value(report_item.get("pluginID")),
+        "plugin_name": report_item.get("pluginName"),
+        "plugin_family": report_item.get("pluginFamily"),
+    }
+    for column in list(PLUGINS_COLUMNS)[3:]:
+        plugin_record_data[column] = plugin.report_item_value(report_item, column)
+    return plugin_record_data
+
+
+def iter_records(files):
+    """
+    Function yields data of report hosts, report items and plugins of given nessus files for export. Files are read
+    report host by report host, so memory usage does not depend on the size of files. Metadata of every plugin
+    is yielded once, when plugin is found for the first time.
+    :param files: list of nessus files
+    :return: generator of tuples with table name 'hosts', 'findings' or 'plugins' and record
+    """
+    plugin_ids = set()
+    for nessus_scan_file in files:
+        for root, report_host in nfr_file.iter_report_hosts(
+            nessus_scan_file, with_root=True
+        ):
+            report_host_name = host.report_host_name(report_host)
+            yield "hosts", host_record(root, report_host, nessus_scan_file)
+            for report_item in host.report_items(report_host):
+                yield "findings", finding_record(
+                    report_item, report_host_name, nessus_scan_file
+                )
+                plugin_id = report_item.get("pluginID")
+                if plugin_id not in plugin_ids:
+                    plugin_ids.add(plugin_id)
+                    yield "plugins", plugin_record(report_item)
+
+
+def _import_pyarrow():
+    """
+    Function imports optional dependency pyarrow with its parquet module. It's imported only when parquet is
+    exported, so it's not loaded by every import of nessus_file_reader and by every worker process.
+    :return: pyarrow module
+    :raises ImportError: if pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "pyarrow is required to export to parquet, "
+            "install it with: pip install nessus-file-reader[parquet]"
+        ) from None
+    return pyarrow
+
+
+def _parquet_schema(columns):
+    """
+    Function returns pyarrow schema for given columns.
+    :param columns: dictionary with column names and types
+    :return: pyarrow.Schema
+    """
+    pyarrow = _import_pyarrow()
+    types = {
+        "str": pyarrow.string(),
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "datetime": pyarrow.timestamp("s"),
+        "list": pyarrow.list_(pyarrow.string()),
+    }
+    return pyarrow.schema([(column, types[kind]) for column, kind in columns.items()])
+
+
+class _ParquetTableWriter:
+    """
+    Writer of one parquet file, which keeps up to row_group_size rows in memory and writes them as one row group.
+    """
+
+    def __init__(self, path, columns, row_group_size):
+        self.pyarrow = _import_pyarrow()
+        self.columns = list(columns)
+        self.schema = _parquet_schema(columns)
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.buffer = {column: [] for column in self.columns}
+        self.buffer_rows = 0
+        self.writer = self.pyarrow.parquet.ParquetWriter(
+            path,
+            self.schema,
+            use_dictionary=[
+                column for column in self.columns if column in _DICTIONARY_COLUMNS
+            ],
+            compression="zstd",
+        )
+
+    def append(self, record):
+        for column in self.columns:
+            self.buffer[column].append(record[column])
+        self.buffer_rows += 1
+        if self.buffer_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer_rows:
+            return
+        self.writer.write_table(
+            self.pyarrow.Table.from_pydict(self.buffer, schema=self.schema),
+            row_group_size=self.row_group_size,
+        )
+        self.rows += self.buffer_rows
+        self.buffer = {column: [] for column in self.columns}
+        self.buffer_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_parquet(files, output_directory, row_group_size=ROW_GROUP_SIZE):
+    """
+    Function exports report hosts, findings and plugins metadata of given nessus files to hosts.parquet,
+    findings.parquet and plugins.parquet files in given directory. Files are read report host by report host and
+    rows are written in row groups, so memory usage depends on row_group_size, not on the size of files.
+    Requires optional dependency pyarrow.
+    :param files: list of nessus files
+    :param output_directory: directory for parquet files, created if it doesn't exist
+    :param row_group_size: number of rows in one row group
+    :return: dictionary with number of rows written to every file
+    """
+    _import_pyarrow()
+    os.makedirs(output_directory, exist_ok=True)
+    writers = {}
+    try:
+        for table, columns in [
+            ("hosts", HOSTS_COLUMNS),
+            ("findings", FINDINGS_COLUMNS),
+            ("plugins", PLUGINS_COLUMNS),
+        ]:
+            writers[table] = _ParquetTableWriter(
+                os.path.join(output_directory, table + ".parquet"),
+                columns,
+                row_group_size,
+            )
+        for table, record in iter_records(files):
+            writers[table].append(record)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {table: writer.rows for table, writer in writers.items()}
+
+
+_SQLITE_TYPES = {
+    "str": "TEXT",
+    "int": "INTEGER",
+    "float": "REAL",
+    "datetime": "TEXT",
+}
+
+_SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS files (
+        id INTEGER PRIMARY KEY,
+        path TEXT UNIQUE NOT NULL,
+        report_name TEXT,
+        policy_name TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS hosts (
+        id INTEGER PRIMARY KEY,
+        file_id INTEGER NOT NULL REFERENCES files(id),
+        {hosts_columns}
+    )""",
+    """CREATE TABLE IF NOT EXISTS host_properties (
+        host_id INTEGER NOT NULL REFERENCES hosts(id),
+        name TEXT NOT NULL,
+        value TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS plugins (
+        plugin_id INTEGER PRIMARY KEY,
+        {plugins_columns}
+    )""",
+    """CREATE TABLE IF NOT EXISTS report_items (
+        id INTEGER PRIMARY KEY,
+        host_id INTEGER NOT NULL REFERENCES hosts(id),
+        plugin_id INTEGER REFERENCES plugins(plugin_id),
+        {report_items_columns}
+    )""",
+    """CREATE TABLE IF NOT EXISTS cves (
+        report_item_id INTEGER NOT NULL REFERENCES report_items(id),
+        cve TEXT NOT NULL
+    )""",
+]
+
+# indexes with their tables and columns, they are dropped before rows are inserted and built again after all rows
+# are inserted, which is faster than updating them on every insert
+_SQLITE_INDEXES = {
+    "hosts_file_id": "hosts(file_id)",
+    "hosts_report_host_name": "hosts(report_host_name)",
+    "hosts_host_ip": "hosts(host_ip)",
+    "host_properties_host_id": "host_properties(host_id)",
+    "host_properties_name_value": "host_properties(name, value)",
+    "report_items_host_id": "report_items(host_id)",
+    "report_items_plugin_id": "report_items(plugin_id)",
+    "report_items_severity": "report_items(severity)",
+    "cves_report_item_id": "cves(report_item_id)",
+    "cves_cve": "cves(cve)",
+}
+
+# columns of hosts and report_items tables, file and report host are referenced by id
+_SQLITE_HOSTS_COLUMNS = [column for column in HOSTS_COLUMNS if column != "file"]
+_SQLITE_REPORT_ITEMS_COLUMNS = [
+    column
+    for column in FINDINGS_COLUMNS
+    if column not in ("file", "report_host_name", "plugin_id", "cve")
+]
+_SQLITE_PLUGINS_COLUMNS = [
+    column for column in PLUGINS_COLUMNS if column != "plugin_id"
+]
+
+
+def _sqlite_columns_definition(columns, column_types):
+    return ",\n        ".join(
+        f"{column} {_SQLITE_TYPES[column_types[column]]}" for column in columns
+    )
+
+
+def _sqlite_insert(table, columns):
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+
+def _sqlite_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def export_sqlite(files, database, batch_size=BATCH_SIZE):
+    """
+    Function exports given nessus files to sqlite database with normalized tables files, hosts, host_properties,
+    report_items, plugins and cves. Rows are inserted with executemany in transactions of batch_size rows, indexes
+    are dropped before rows are inserted and built again at the end. File exported before, also by other relative
+    path, is replaced with its new content. Report items without plugin id are skipped.
+    :param files: list of nessus files
+    :param database: path to sqlite database, created if it doesn't exist
+    :param batch_size: number of rows inserted in one transaction
+    :return: dictionary with number of rows inserted to every table
+    """
+    connection = sqlite3.connect(database)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        # with WAL database stays consistent after crash, only last transactions may be lost
+        connection.execute("PRAGMA synchronous = NORMAL")
+        for statement in _SQLITE_SCHEMA:
+            connection.execute(
+                statement.format(
+                    hosts_columns=_sqlite_columns_definition(
+                        _SQLITE_HOSTS_COLUMNS, HOSTS_COLUMNS
+                    ),
+                    plugins_columns=_sqlite_columns_definition(
+                        _SQLITE_PLUGINS_COLUMNS, PLUGINS_COLUMNS
+                    ),
+                    report_items_columns=_sqlite_columns_definition(
+                        _SQLITE_REPORT_ITEMS_COLUMNS, FINDINGS_COLUMNS
+                    ),
+                )
+            )
+        connection.commit()
+
+        # the same file given by other relative path replaces rows exported before, rows are removed while indexes
+        # still exist, file given more than once is exported once
+        nessus_scan_files = {}
+        for nessus_scan_file in files:
+            nessus_scan_files.setdefault(
+                nfr_file.nessus_scan_file_name_with_path(nessus_scan_file),
+                nessus_scan_file,
+            )
+        cursor = connection.cursor()
+        for path in nessus_scan_files:
+            _sqlite_delete_file(cursor, path)
+        for index in _SQLITE_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        connection.commit()
+
+        statements = {
+            "plugins": _sqlite_insert(
+                "plugins", ["plugin_id"] + _SQLITE_PLUGINS_COLUMNS
+            ).replace("INSERT", "INSERT OR IGNORE", 1),
+            "hosts": _sqlite_insert("hosts", ["id", "file_id"] + _SQLITE_HOSTS_COLUMNS),
+            "host_properties": _sqlite_insert(
+                "host_properties", ["host_id", "name", "value"]
+            ),
+            "report_items": _sqlite_insert(
+                "report_items",
+                ["id", "host_id", "plugin_id"] + _SQLITE_REPORT_ITEMS_COLUMNS,
+            ),
+            "cves": _sqlite_insert("cves", ["report_item_id", "cve"]),
+        }
+        # rows waiting for executemany, in order of tables in statements
+        batch = {table: [] for table in statements}
+        rows = {
+            "files": 0,
+            "hosts": 0,
+            "host_properties": 0,
+            "report_items": 0,
+            "plugins": 0,
+            "cves": 0,
+        }
+        plugin_ids = {
+            plugin_id
+            for (plugin_id,) in connection.execute("SELECT plugin_id FROM plugins")
+        }
+        # ids of hosts and report items are given in inserted rows, so rows referencing them can be batched too
+        (host_id,) = connection.execute("SELECT MAX(id) FROM hosts").fetchone()
+        host_id = host_id or 0
+        (report_item_id,) = connection.execute(
+            "SELECT MAX(id) FROM report_items"
+        ).fetchone()
+        report_item_id = report_item_id or 0
+        batch_rows = 0
+
+        for path, nessus_scan_file in nessus_scan_files.items():
+            file_id = None
+            for root, report_host in nfr_file.iter_report_hosts(
+                nessus_scan_file, with_root=True
+            ):
+                if file_id is None:
+                    file_id = _sqlite_insert_file(cursor, path, root)
+                    rows["files"] += 1
+                record = host_record(root, report_host, nessus_scan_file)
+                host_id += 1
+                batch["hosts"].append(
+                    [host_id, file_id]
+                    + [
+                        _sqlite_value(record[column])
+                        for column in _SQLITE_HOSTS_COLUMNS
+                    ]
+                )
+                host_properties = [
+                    (host_id, tag.get("name"), tag.text)
+                    for tag in report_host[0].iter("tag")
+                ]
+                batch["host_properties"].extend(host_properties)
+                rows["hosts"] += 1
+                rows["host_properties"] += len(host_properties)
+                batch_rows += 1 + len(host_properties)
+
+                report_host_name = record["report_host_name"]
+                for report_item in host.report_items(report_host):
+                    record = finding_record(
+                        report_item, report_host_name, nessus_scan_file
+                    )
+                    if record["plugin_id"] is None:
+                        # report item without plugin id can't reference plugins table
+                        continue
+                    if record["plugin_id"] not in plugin_ids:
+                        plugin_ids.add(record["plugin_id"])
+                        plugin_record_data = plugin_record(report_item)
+                        batch["plugins"].append(
+                            [plugin_record_data["plugin_id"]]
+                            + [
+                                plugin_record_data[column]
+                                for column in _SQLITE_PLUGINS_COLUMNS
+                            ]
+                        )
+                        rows["plugins"] += 1
+                    report_item_id += 1
+                    batch["report_items"].append(
+                        [report_item_id, host_id, record["plugin_id"]]
+                        + [record[column] for column in _SQLITE_REPORT_ITEMS_COLUMNS]
+                    )
+                    batch["cves"].extend((report_item_id, cve) for cve in record["cve"])
+                    rows["report_items"] += 1
+                    rows["cves"] += len(record["cve"])
+                    batch_rows += 1 + len(record["cve"])
+
+                if batch_rows >= batch_size:
+                    _sqlite_insert_batch(cursor, statements, batch)
+                    connection.commit()
+                    batch_rows = 0
+
+            if file_id is None:
+                # file without report hosts
+                _sqlite_insert_file(cursor, path, None)
+                rows["files"] += 1
+        _sqlite_insert_batch(cursor, statements, batch)
+        connection.commit()
+
+        for index, columns in _SQLITE_INDEXES.items():
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {columns}")
+        connection.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+    return rows
+
+
+def _sqlite_insert_batch(cursor, statements, batch):
+    """
+    Function inserts rows of given batch with one executemany per table and empties batch.
+    :param cursor: sqlite cursor
+    :param statements: dictionary with table name and its insert statement
+    :param batch: dictionary with table name and list of its rows
+    """
+    for table, statement in statements.items():
+        if batch[table]:
+            cursor.executemany(statement, batch[table])
+            batch[table].clear()
+
+
+def _sqlite_insert_file(cursor, nessus_scan_file, root):
+    """
+    Function inserts row of given nessus file to files table.
+    :param cursor: sqlite cursor
+    :param nessus_scan_file: given nessus file name with absolute path
+    :param root: root element of scan file tree or None if file has no report hosts
+    :return: id of inserted row
+    """
+    cursor.execute(
+        "INSERT INTO files (path, report_name, policy_name) VALUES (?, ?, ?)",
+        (
+            nessus_scan_file,
+            scan.report_name(root) if root is not None else None,
+            scan.policy_name(root) if root is not None else None,
+        ),
+    )
+    return cursor.lastrowid
+
+
+def _sqlite_delete_file(cursor, nessus_scan_file):
+    """
+    Function removes all rows of given nessus file exported before.
+    :param cursor: sqlite cursor
+    :param nessus_scan_file: given nessus file name with absolute path
+    """
+    file_ids = "SELECT id FROM files WHERE path = ?"
+    host_ids = f"SELECT id FROM hosts WHERE file_id IN ({file_ids})"
+    report_item_ids = f"SELECT id FROM report_items WHERE host_id IN ({host_ids})"
+    for statement in [
+        f"DELETE FROM cves WHERE report_item_id IN ({report_item_ids})",
+        f"DELETE FROM report_items WHERE host_id IN ({host_ids})",
+        f"DELETE FROM host_properties WHERE host_id IN ({host_ids})",
+        f"DELETE FROM hosts WHERE file_id IN ({file_ids})",
+        "DELETE FROM files WHERE path = ?",
+    ]:
+        cursor.execute(statement, (nessus_scan_file,))
+
+
+def query_sqlite(database, sql, parameters=()):
+    """
+    Function runs given SQL query against sqlite database created by export_sqlite. Database is opened read-only.
+    :param database: path to sqlite database
+    :param sql: SQL query
+    :param parameters: parameters of query
+    :return: tuple of list of column names and list of rows
+    """
+    if not os.path.isfile(database):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), database)
+    connection = sqlite3.connect(
+        pathlib.Path(os.path.abspath(database)).as_uri() + "?mode=ro", uri=True
+    )
+    try:
+        cursor = connection.execute(sql, parameters)
+        rows = cursor.fetchall()
+        columns = [column[0] for column in cursor.description or []]
+    finally:
+        connection.close()
+    return columns, rows
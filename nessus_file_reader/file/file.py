@@ -20,7 +20,11 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import os
-from xml.etree.ElementTree import parse
+import json
+import mmap
+import functools
+from nessus_file_reader import utilities
+from nessus_file_reader.xml_backend import parse, iterparse, fromstring
 
 
 def nessus_scan_file_name_with_path(file):
@@ -36,20 +40,22 @@ def nessus_scan_file_name_with_path(file):
 def nessus_scan_file_size(file):
     """
     Function returns the size in bytes of path.
-    :param file: given nessus file
+    :param file: given nessus file, for file inside archive e.g. scans.zip::scan.nessus size of archive member
     :return: size in bytes of path.
     """
+    member = utilities.archive_member(file)
+    if member is not None:
+        return utilities.nessus_archive_member_size(*member)
     file_size = os.path.getsize(file)
     return file_size
 
 
-def nessus_scan_file_size_human(file):
+def _size_human(size):
     """
-    Function convert nessus file size from bytes to size more convenient to read by human.
-    :param file: given nessus file
+    Function convert size from bytes to size more convenient to read by human.
+    :param size: size in bytes
     :return: size in human readable form
     """
-    size = nessus_scan_file_size(file)
     suffix = "B"
     for unit in [" b", " Ki", " Mi", " Gi", " Ti", " Pi", " Ei", " Zi"]:
         if abs(size) < 1024.0:
@@ -58,13 +64,415 @@ def nessus_scan_file_size_human(file):
     return "%.1f%s%s" % (size, "Yi", suffix)
 
 
+def nessus_scan_file_size_human(file):
+    """
+    Function convert nessus file size from bytes to size more convenient to read by human.
+    :param file: given nessus file
+    :return: size in human readable form
+    """
+    size = nessus_scan_file_size(file)
+    return _size_human(size)
+
+
+def nessus_scan_file_compression(file):
+    """
+    Function returns compression format of given nessus file detected by magic bytes.
+    :param file: given nessus file
+    :return: 'gzip', 'bz2', 'xz', 'zstd' or None if file is not compressed
+    """
+    compression = utilities.nessus_scan_file_compression(file)
+    return compression
+
+
+def _byte_offsets_available(file):
+    """
+    Function checks if given nessus file can be read by byte offsets, i.e. it is plain file on disk,
+    neither compressed nor inside archive.
+    :param file: given nessus file
+    :return: True if byte offsets can be used
+    """
+    return (
+        utilities.archive_member(file) is None
+        and nessus_scan_file_compression(file) is None
+    )
+
+
+def nessus_scan_file_size_uncompressed(file):
+    """
+    Function returns the size in bytes of content of given nessus file. Compressed file is decompressed on the fly
+    to count its size, nothing is written to disk.
+    :param file: given nessus file
+    :return: size in bytes of uncompressed content.
+    """
+    if nessus_scan_file_compression(file) is None:
+        return nessus_scan_file_size(file)
+
+    file_size = 0
+    with utilities.open_nessus_file(file) as nessus_file:
+        chunk = nessus_file.read(1024 * 1024)
+        while chunk:
+            file_size += len(chunk)
+            chunk = nessus_file.read(1024 * 1024)
+    return file_size
+
+
+def nessus_scan_file_size_uncompressed_human(file):
+    """
+    Function convert size of content of given nessus file from bytes to size more convenient to read by human.
+    :param file: given nessus file
+    :return: size of uncompressed content in human readable form
+    """
+    size = nessus_scan_file_size_uncompressed(file)
+    return _size_human(size)
+
+
 def nessus_scan_file_root_element(file):
     """
     Function returns the root element for tree of given nessus file with scan results.
+    Compressed files (gzip, bz2, xz, zstd) are decompressed on the fly.
     :param file: given nessus file
     :return: root element for this tree.
     """
 
-    nessus_scan_file_parsed = parse(file)
+    with utilities.open_nessus_file(file) as nessus_file:
+        nessus_scan_file_parsed = parse(nessus_file)
     root = nessus_scan_file_parsed.getroot()
     return root
+
+
+def nessus_scan_file_policy_root_element(file):
+    """
+    Function returns the root element containing only Policy section of given nessus file with scan results.
+    File is read only up to the end of Policy section, report hosts are not parsed at all.
+    :param file: given nessus file
+    :return: root element with Policy section only.
+    """
+    root = None
+    with utilities.open_nessus_file(file) as nessus_file:
+        for event, element in iterparse(nessus_file, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                elif element.tag == "Report":
+                    break
+            elif element.tag == "Policy":
+                break
+
+    # elements read ahead together with Policy section are incomplete
+    if root is not None:
+        for child in list(root):
+            if child.tag != "Policy":
+                root.remove(child)
+    return root
+
+
+def iter_report_hosts(file, with_root=False):
+    """
+    Function yields report hosts of given nessus file one by one without loading whole file into memory.
+    Every report host is fully built when yielded and it is cleared as soon as the next one is requested,
+    so memory usage depends on the size of one report host, not on the size of the file.
+    :param file: given nessus file
+    :param with_root: if True tuples (root, report_host) are yielded, where root contains complete Policy
+        section but no other report hosts, so it can be passed to functions which require root element
+        e.g. nfr.plugin.plugin_output. Data derived from report hosts of such root, e.g. nfr.scan.report_hosts,
+        is not cached, so it always reflects report host being yielded
+    :return: report host element or tuple (root, report_host)
+    """
+    root = None
+    report = None
+    try:
+        with utilities.open_nessus_file(file) as nessus_file:
+            for event, element in iterparse(nessus_file, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = element
+                        # data derived from report hosts of root is not cached, because they change
+                        utilities._streamed_root_ids.add(id(root))
+                    elif element.tag == "Report":
+                        report = element
+                elif element.tag == "ReportHost":
+                    if with_root:
+                        yield root, element
+                    else:
+                        yield element
+                    if report is not None:
+                        report.remove(element)
+                    element.clear()
+    finally:
+        if root is not None:
+            utilities._streamed_root_ids.discard(id(root))
+
+
+def _report_hosts_layout(file):
+    """
+    Function finds byte offsets of Report section and all ReportHost elements in given nessus file without parsing it.
+    :param file: given nessus file
+    :return: tuple of Report start offset, Report start tag and list of (start, end) offsets of ReportHost elements
+    """
+    if not _byte_offsets_available(file):
+        raise ValueError(
+            f"Byte offsets are not available for compressed or archived file {file}"
+        )
+    with open(file, "rb") as nessus_file:
+        if os.fstat(nessus_file.fileno()).st_size == 0:
+            return -1, b"", []
+        with mmap.mmap(nessus_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            report_start = content.find(b"<Report ")
+            if report_start == -1:
+                return -1, b"", []
+            report_start_tag = content[
+                report_start : content.find(b">", report_start) + 1
+            ]
+
+            report_hosts_ranges = []
+            report_host_start = content.find(b"<ReportHost ", report_start)
+            while report_host_start != -1:
+                report_host_end = content.find(b"</ReportHost>", report_host_start)
+                if report_host_end == -1:
+                    break
+                report_host_end += len(b"</ReportHost>")
+                report_hosts_ranges.append((report_host_start, report_host_end))
+                report_host_start = content.find(b"<ReportHost ", report_host_end)
+    return report_start, report_start_tag, report_hosts_ranges
+
+
+def report_hosts_byte_ranges(file):
+    """
+    Function returns byte offsets of all report hosts in given nessus file, found without parsing the file.
+    :param file: given nessus file, not compressed
+    :return: list of (start, end) offsets, where end is offset of first byte after </ReportHost>
+    """
+    _, _, report_hosts_ranges = _report_hosts_layout(file)
+    return report_hosts_ranges
+
+
+def _report_hosts_chunk_root(file, report_start, report_start_tag, start, end):
+    """
+    Function returns root element built from Policy section and given byte range of report hosts of nessus file.
+    :param file: given nessus file
+    :param report_start: offset of Report section, everything before it is used as is
+    :param report_start_tag: Report start tag with namespace declarations
+    :param start: offset of first report host in chunk
+    :param end: offset of first byte after last report host in chunk
+    :return: root element containing Policy section and report hosts from given range
+    """
+    with open(file, "rb") as nessus_file:
+        header = nessus_file.read(report_start)
+        nessus_file.seek(start)
+        report_hosts = nessus_file.read(end - start)
+    root = fromstring(
+        header + report_start_tag + report_hosts + b"</Report></NessusClientData_v2>"
+    )
+    return root
+
+
+def _report_hosts_chunk_map(chunk, file, report_start, report_start_tag, function):
+    """
+    Function calls given function for root element built from given chunk of report hosts.
+    :param chunk: tuple of start and end offset of report hosts
+    :param file: given nessus file
+    :param report_start: offset of Report section
+    :param report_start_tag: Report start tag with namespace declarations
+    :param function: function called with root element
+    :return: result of function
+    """
+    start, end = chunk
+    root = _report_hosts_chunk_root(file, report_start, report_start_tag, start, end)
+    return function(root)
+
+
+def parallel_map_report_hosts(file, function, jobs=1, chunk_size=32 * 1024 * 1024):
+    """
+    Function splits given nessus file into chunks of report hosts by their byte offsets and calls given function
+    for every chunk in pool of processes. Function is called with root element which contains whole Policy section
+    and only report hosts from given chunk, so all nfr.scan, nfr.host and nfr.plugin functions can be used on it.
+    Results should be compact, e.g. rows of data, and have to be merged by caller.
+    :param file: given nessus file
+    :param function: picklable function called with root element of every chunk
+    :param jobs: number of processes
+    :param chunk_size: approximate size in bytes of report hosts in one chunk
+    :return: results of function for every chunk, in order of report hosts in file
+    """
+    if not _byte_offsets_available(file):
+        # compressed or archived file can't be split by byte offsets, it is processed as one chunk
+        yield function(nessus_scan_file_root_element(file))
+        return
+
+    report_start, report_start_tag, report_hosts_ranges = _report_hosts_layout(file)
+    if report_start == -1:
+        return
+
+    chunks = []
+    for start, end in report_hosts_ranges:
+        if chunks and end - chunks[-1][0] <= chunk_size:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    if not chunks:
+        # file without report hosts still has Policy section to process
+        chunks.append((report_start, report_start))
+
+    yield from utilities.ordered_parallel_map(
+        functools.partial(
+            _report_hosts_chunk_map,
+            file=file,
+            report_start=report_start,
+            report_start_tag=report_start_tag,
+            function=function,
+        ),
+        chunks,
+        jobs,
+    )
+
+
+def report_hosts_index_file(file):
+    """
+    Function returns path of sidecar index file with offsets of report hosts for given nessus file.
+    :param file: given nessus file
+    :return: path of index file
+    """
+    index_file = file + ".nfrindex"
+    return index_file
+
+
+def _report_hosts_index_build(file):
+    """
+    Function builds index with offsets of report hosts for given nessus file. Only HostProperties of every report host
+    are parsed.
+    :param file: given nessus file
+    :return: index dictionary
+    """
+    file_stat = os.stat(file)
+    report_start, report_start_tag, report_hosts_ranges = _report_hosts_layout(file)
+    report_hosts_entries = []
+    if report_hosts_ranges:
+        with open(file, "rb") as nessus_file:
+            with mmap.mmap(nessus_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                for start, end in report_hosts_ranges:
+                    host_properties_end = content.find(b"</HostProperties>", start, end)
+                    if host_properties_end != -1:
+                        report_host_head = (
+                            content[start:host_properties_end]
+                            + b"</HostProperties></ReportHost>"
+                        )
+                    else:
+                        report_host_head = content[start:end]
+                    report_host = fromstring(report_host_head)
+                    host_properties = dict()
+                    for tag in report_host.iter("tag"):
+                        host_properties[tag.get("name")] = tag.text
+                    report_hosts_entries.append(
+                        [
+                            start,
+                            end,
+                            report_host.get("name"),
+                            host_properties.get("host-ip"),
+                            host_properties.get("host-fqdn"),
+                        ]
+                    )
+    index = {
+        "version": 1,
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "report_start_tag": report_start_tag.decode("utf-8"),
+        "report_hosts": report_hosts_entries,
+    }
+    return index
+
+
+def report_hosts_index(file, rebuild=False):
+    """
+    Function returns index with offsets of report hosts for given nessus file. Index is read from sidecar index file
+    if it matches size and modification time of nessus file, otherwise it is built and saved next to nessus file.
+    :param file: given nessus file, neither compressed nor inside archive
+    :param rebuild: if True index is always built from scratch
+    :return: index dictionary with 'report_hosts' list of [start, end, name, host-ip, host-fqdn] entries
+    """
+    if not _byte_offsets_available(file):
+        raise ValueError(
+            f"Byte offsets are not available for compressed or archived file {file}"
+        )
+    index_file = report_hosts_index_file(file)
+    file_stat = os.stat(file)
+    index = None
+
+    if not rebuild:
+        try:
+            with open(index_file, "r", encoding="utf-8") as index_content:
+                index = json.load(index_content)
+        except (OSError, ValueError):
+            index = None
+        if index is not None and (
+            index.get("version") != 1
+            or index.get("size") != file_stat.st_size
+            or index.get("mtime_ns") != file_stat.st_mtime_ns
+        ):
+            index = None
+
+    if index is None:
+        index = _report_hosts_index_build(file)
+        try:
+            with open(index_file, "w", encoding="utf-8") as index_content:
+                json.dump(index, index_content, separators=(",", ":"))
+        except OSError:
+            # index is still usable in memory if directory is read-only
+            pass
+    return index
+
+
+def _host_property(report_host, property_name):
+    """
+    Function returns value of given property of report host.
+    :param report_host: report host element
+    :param property_name: exact property name
+    :return: property value or None
+    """
+    for tag in report_host.iter("tag"):
+        if tag.get("name") == property_name:
+            return tag.text
+    return None
+
+
+def load_host(file, name):
+    """
+    Function returns report host for given name, host-ip or host-fqdn, parsing only this report host. Offsets of
+    report hosts are taken from sidecar index file, which is built on first use. Compressed or archived file can't be
+    indexed, so its report hosts are read one by one until given one is found.
+    :param file: given nessus file
+    :param name: report host name, host-ip or host-fqdn
+    :return: report host element or None if report host has not been found
+    """
+    name = name.lower()
+    if not _byte_offsets_available(file):
+        # compressed or archived file can't be indexed by byte offsets, report hosts are read one by one
+        for report_host in iter_report_hosts(file):
+            if name in [
+                value.lower()
+                for value in (
+                    report_host.get("name"),
+                    _host_property(report_host, "host-ip"),
+                    _host_property(report_host, "host-fqdn"),
+                )
+                if value is not None
+            ]:
+                return report_host
+        return None
+
+    index = report_hosts_index(file)
+    for start, end, report_host_name, host_ip, host_fqdn in index["report_hosts"]:
+        if name in [
+            value.lower()
+            for value in (report_host_name, host_ip, host_fqdn)
+            if value is not None
+        ]:
+            with open(file, "rb") as nessus_file:
+                with mmap.mmap(
+                    nessus_file.fileno(), 0, access=mmap.ACCESS_READ
+                ) as content:
+                    report = fromstring(
+                        index["report_start_tag"].encode("utf-8")
+                        + content[start:end]
+                        + b"</Report>"
+                    )
+            return report[0]
+    return None
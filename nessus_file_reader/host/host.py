@@ -20,8 +20,8 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import re
-import datetime
 from nessus_file_reader.plugin import plugin
+from nessus_file_reader import utilities
 
 
 def report_host_name(report_host):
@@ -93,23 +93,11 @@ def netbios_network_name(root, report_host):
     :param report_host: report host element
     :return: os for given target
     """
-    pido_10150 = plugin.plugin_output(root, report_host, "10150")
-    pido_10150_split = pido_10150.split("\n")
-
-    netbios_computer_name = ""
-    netbios_domain_name = ""
-    for netbios_data_split_entry in pido_10150_split:
-        if "Computer name" in netbios_data_split_entry:
-            netbios_computer_name = (
-                netbios_data_split_entry.split("=")[0].strip().lower()
-            )
-
-        if "Workgroup / Domain name" in netbios_data_split_entry:
-            netbios_domain_name = netbios_data_split_entry.split("=")[0].strip().lower()
+    record_10150 = plugin.plugin_output_record(root, report_host, "10150")
 
     return {
-        "netbios_computer_name": netbios_computer_name,
-        "netbios_domain_name": netbios_domain_name,
+        "netbios_computer_name": record_10150["netbios_computer_name"],
+        "netbios_domain_name": record_10150["netbios_domain_name"],
     }
 
 
@@ -137,11 +125,7 @@ def scanner_ip(root, report_host):
     :param report_host: report host element
     :return: ip address of scanner
     """
-    ip = None
-    pido_19506 = plugin.plugin_output(root, report_host, "19506")
-    for line in pido_19506.split("\n"):
-        if re.findall("Scanner IP :", line):
-            ip = re.sub("Scanner IP : ", "", line)
+    ip = plugin.plugin_output_record(root, report_host, "19506")["scanner_ip"]
     return ip
 
 
@@ -171,20 +155,9 @@ def credentialed_checks(root, report_host):
         'yes' + login used - if credentialed checks have been enabled
         'no' - if credentialed checks have not been enabled
     """
-    credentialed = None
-    pido_19506 = plugin.plugin_output(root, report_host, "19506")
-    if (
-        "No output recorded." in pido_19506
-        or "Check Audit Trail" in pido_19506
-        or "19506 not enabled." in pido_19506
-    ):
-        credentialed = "no"
-    else:
-        for line in pido_19506.split("\n"):
-            if re.findall("Credentialed checks :", line):
-                credentialed = re.sub("Credentialed checks : ", "", line)
-                credentialed = re.sub("&apos;", "", credentialed)
-
+    credentialed = plugin.plugin_output_record(root, report_host, "19506")[
+        "credentialed_checks"
+    ]
     return credentialed
 
 
@@ -199,31 +172,12 @@ def credentialed_checks_db(root, report_host):
         'no' - if credentialed checks have not been enabled
     """
     credentialed = None
-    # "91825: Oracle DB Login Possible"
-    pido_91825 = plugin.plugin_output(root, report_host, "91825")
-    if (
-        "No output recorded." in pido_91825
-        or "Check Audit Trail" in pido_91825
-        or "91825 not enabled." in pido_91825
-    ):
-        credentialed = "no"
-    elif re.findall(
-        "Credentialed checks have been enabled for Oracle RDBMS server", pido_91825
-    ):
-        credentialed = "yes, based on plugin id 91825"
-
-    # "91827: Microsoft SQL Server Login Possible"
-    pido_91827 = plugin.plugin_output(root, report_host, "91827")
-    if (
-        "No output recorded." in pido_91827
-        or "Check Audit Trail" in pido_91827
-        or "91827 not enabled." in pido_91827
-    ):
-        credentialed = "no"
-    elif re.findall(
-        "Credentialed checks have been enabled for MSSQL server", pido_91827
-    ):
-        credentialed = "yes, based on plugin id 91827"
+    for plugin_id in ["91825", "91827"]:
+        record = plugin.plugin_output_record(root, report_host, plugin_id)
+        if record["credentialed_checks"] == "no":
+            credentialed = "no"
+        elif record["credentialed_checks"] == "yes":
+            credentialed = f"yes, based on plugin id {plugin_id}"
 
     return credentialed
 
@@ -238,6 +192,54 @@ def number_of_plugins(report_host):
     return number_of_plugins_counter
 
 
+# number of plugins per risk factor and per severity, counted once per report host
+_risk_factor_histogram_cache = utilities.ElementCache()
+_severity_histogram_cache = utilities.ElementCache()
+
+
+def risk_factor_histogram(report_host):
+    """
+    Function returns number of plugins reported during scan for every risk factor for given target, counted in one
+    pass over report items. Result is cached as long as report host element exists.
+    :param report_host: report host element
+    :return: dictionary with risk factor as key and number of plugins as value, always contains keys
+        'Critical', 'High', 'Medium', 'Low', 'None'
+    """
+    histogram = _risk_factor_histogram_cache.get(report_host)
+    if histogram is None:
+        histogram = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0, "None": 0}
+        for report_item in report_host.findall("ReportItem"):
+            risk_factor = report_item.findtext("risk_factor")
+            if risk_factor is not None:
+                histogram[risk_factor] = histogram.get(risk_factor, 0) + 1
+        _risk_factor_histogram_cache[report_host] = histogram
+    return dict(histogram)
+
+
+def severity_histogram(report_host):
+    """
+    Function returns number of plugins reported during scan for every severity for given target, counted in one
+    pass over report items. Result is cached as long as report host element exists.
+    :param report_host: report host element
+    :return: dictionary with severity number as key and number of plugins as value, always contains keys
+        4 - Critical
+        3 - High
+        2 - Medium
+        1 - Low
+        0 - Info
+    """
+    histogram = _severity_histogram_cache.get(report_host)
+    if histogram is None:
+        histogram = {4: 0, 3: 0, 2: 0, 1: 0, 0: 0}
+        for report_item in report_host.findall("ReportItem"):
+            severity = report_item.get("severity")
+            if severity is not None:
+                severity = int(severity)
+                histogram[severity] = histogram.get(severity, 0) + 1
+        _severity_histogram_cache[report_host] = histogram
+    return dict(histogram)
+
+
 def number_of_plugins_per_risk_factor(report_host, risk_factor_level):
     """
     Function returns number of all plugins reported during scan for given risk factor for given target.
@@ -250,12 +252,7 @@ def number_of_plugins_per_risk_factor(report_host, risk_factor_level):
         'None'
     :return: number of plugins for given risk factor
     """
-    risk_factor_counter = 0
-    for report_item in report_host.findall("ReportItem"):
-        risk_factor = report_item.find("risk_factor")
-        if risk_factor is not None:
-            if risk_factor.text == risk_factor_level:
-                risk_factor_counter += 1
+    risk_factor_counter = risk_factor_histogram(report_host).get(risk_factor_level, 0)
     return risk_factor_counter
 
 
@@ -313,9 +310,7 @@ def host_time_start(report_host):
     """
     host_start_time = host_property_value(report_host, "HOST_START")
     if host_start_time is not None:
-        host_start_time_formatted = datetime.datetime.strptime(
-            host_start_time, "%a %b %d %H:%M:%S %Y"
-        )
+        host_start_time_formatted = utilities.host_time_parse(host_start_time)
     else:
         host_start_time_formatted = None
     return host_start_time_formatted
@@ -329,9 +324,7 @@ def host_time_end(report_host):
     """
     host_end_time = host_property_value(report_host, "HOST_END")
     if host_end_time is not None:
-        host_end_time_formatted = datetime.datetime.strptime(
-            host_end_time, "%a %b %d %H:%M:%S %Y"
-        )
+        host_end_time_formatted = utilities.host_time_parse(host_end_time)
     else:
         host_end_time_formatted = None
 
@@ -20,8 +20,31 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import re
+import types
 import datetime
 from nessus_file_reader.scan import scan
+from nessus_file_reader import utilities
+
+# report items of given report host grouped by plugin id, built on first access
+_report_items_per_plugin_id_cache = utilities.ElementCache()
+
+
+def report_items_per_plugin_id(report_host):
+    """
+    Function returns report items of given report host grouped by plugin id. Index is built once per report host,
+    on first access, and cached as long as report host element exists.
+    :param report_host: scanned host
+    :return: dictionary with plugin id as key and list of report items, in order of occurrence, as value
+    """
+    report_items_index = _report_items_per_plugin_id_cache.get(report_host)
+    if report_items_index is None:
+        report_items_index = dict()
+        for report_item in report_host.findall("ReportItem"):
+            report_items_index.setdefault(report_item.get("pluginID"), []).append(
+                report_item
+            )
+        _report_items_per_plugin_id_cache[report_host] = report_items_index
+    return report_items_index
 
 
 def plugin_output(root, report_host, plugin_id):
@@ -41,25 +64,23 @@ def plugin_output(root, report_host, plugin_id):
     """
     plugin_id = str(plugin_id)
     plugin_output_content = list()
-    plugin_set = scan.plugin_set(root)
     status = 0
 
-    for report_item in report_host.findall("ReportItem"):
-        plugin_id_from_report = report_item.get("pluginID")
-        if plugin_id_from_report == plugin_id:
-            plugin_output_item = report_item.find("plugin_output")
-            if plugin_output_item is None:
-                plugin_output_content = f"{plugin_id} - no output recorded"
-            else:
-                plugin_output_content = plugin_output_item.text
-            status = 1
+    for report_item in report_items_per_plugin_id(report_host).get(plugin_id, []):
+        plugin_output_item = report_item.find("plugin_output")
+        if plugin_output_item is None:
+            plugin_output_content = f"{plugin_id} - no output recorded"
+        else:
+            plugin_output_content = plugin_output_item.text
+        status = 1
     if status == 0:
         plugin_output_content = f"{plugin_id} - check Audit Trail"
 
     if "check Audit Trail" in plugin_output_content:
-
+        # plugin set is needed only for plugins not found in report
+        plugin_set = scan.plugin_set_frozenset(root)
         if plugin_set is not None:
-            if plugin_id not in scan.plugin_set(root):
+            if plugin_id not in plugin_set:
                 plugin_output_content = f"{plugin_id} - not enabled"
         else:
             plugin_output_content = (
@@ -85,25 +106,23 @@ def plugin_outputs(root, report_host, plugin_id):
     """
     plugin_id = str(plugin_id)
     plugin_output_content = list()
-    plugin_set = scan.plugin_set(root)
     status = 0
 
-    for report_item in report_host.findall("ReportItem"):
-        plugin_id_from_report = report_item.get("pluginID")
-        if plugin_id_from_report == plugin_id:
-            plugin_output_item = report_item.find("plugin_output")
-            if plugin_output_item is None:
-                plugin_output_content.append(f"{plugin_id} - no output recorded")
-            else:
-                plugin_output_content.append(plugin_output_item.text)
-            status = 1
+    for report_item in report_items_per_plugin_id(report_host).get(plugin_id, []):
+        plugin_output_item = report_item.find("plugin_output")
+        if plugin_output_item is None:
+            plugin_output_content.append(f"{plugin_id} - no output recorded")
+        else:
+            plugin_output_content.append(plugin_output_item.text)
+        status = 1
     if status == 0:
         plugin_output_content.append(f"{plugin_id} - check Audit Trail")
 
     if f"{plugin_id} - check Audit Trail" in plugin_output_content:
-
+        # plugin set is needed only for plugins not found in report
+        plugin_set = scan.plugin_set_frozenset(root)
         if plugin_set is not None:
-            if plugin_id not in scan.plugin_set(root):
+            if plugin_id not in plugin_set:
                 plugin_output_content = [f"{plugin_id} - not enabled"]
         else:
             plugin_output_content = [
@@ -118,6 +137,245 @@ def plugin_outputs(root, report_host, plugin_id):
     return plugin_output_content
 
 
+# parsers of well-known plugin outputs with plugin id as key, registered with plugin_output_parser
+PLUGIN_OUTPUT_PARSERS = dict()
+
+# records parsed from plugin outputs of report host, with plugin id as key, parsed once per report host
+_plugin_output_records_cache = utilities.ElementCache()
+
+_PLUGIN_OUTPUT_STATUSES = (
+    "no output recorded",
+    "check Audit Trail",
+    "not enabled",
+    "info about used plugins not available",
+)
+
+# 'name : value' lines, e.g. 'Scanner IP : 192.168.1.1'
+_FIELD_LINE_PATTERN = re.compile(
+    r"^[ \t]*(?P<name>[^:\n]+?) : (?P<value>[^\n]*)$", re.MULTILINE
+)
+
+# 'NAME = description' lines, e.g. 'WORKSTATION1 = Computer name'
+_NETBIOS_NAME_LINE_PATTERN = re.compile(
+    r"^(?P<name>[^=\n]*)=(?P<description>[^\n]*)$", re.MULTILINE
+)
+
+# texts of database plugins confirming that credentialed checks have been enabled
+_CREDENTIALED_CHECKS_DB_TEXTS = {
+    # "91825: Oracle DB Login Possible"
+    "91825": "Credentialed checks have been enabled for Oracle RDBMS server",
+    # "91827: Microsoft SQL Server Login Possible"
+    "91827": "Credentialed checks have been enabled for MSSQL server",
+}
+
+
+def plugin_output_parser(*plugin_ids):
+    """
+    Decorator which registers given function as parser of outputs of given plugin ids. Parser is called with plugin
+    output, as returned by plugin_output, and plugin id, and returns dictionary with data found in plugin output.
+    :param plugin_ids: plugin ids
+    :return: decorator
+    """
+
+    def register(function):
+        for plugin_id in plugin_ids:
+            PLUGIN_OUTPUT_PARSERS[str(plugin_id)] = function
+        return function
+
+    return register
+
+
+def plugin_output_status(plugin_output_content, plugin_id):
+    """
+    Function returns status of given plugin output.
+    :param plugin_output_content: plugin output, as returned by plugin_output
+    :param plugin_id: plugin id
+    :return:
+        'output' - if plugin occurs in report and has an output
+        'no output recorded', 'check Audit Trail', 'not enabled' or 'info about used plugins not available' -
+        otherwise, see plugin_output
+    """
+    for status in _PLUGIN_OUTPUT_STATUSES:
+        if plugin_output_content == f"{plugin_id} - {status}":
+            return status
+    return "output"
+
+
+def _fields(plugin_output_content):
+    """
+    Function returns values of all 'name : value' lines of given plugin output, found in one pass.
+    :param plugin_output_content: plugin output
+    :return: dictionary with name as key and value as value, if name occurs more than once, last value is used
+    """
+    return {
+        match.group("name"): match.group("value")
+        for match in _FIELD_LINE_PATTERN.finditer(plugin_output_content)
+    }
+
+
+@plugin_output_parser(19506)
+def _nessus_scan_information(plugin_output_content, plugin_id):
+    """
+    Function parses output of Plugin ID 19506 Nessus Scan Information.
+    :param plugin_output_content: plugin output
+    :param plugin_id: plugin id
+    :return: dictionary with keys:
+        'fields' - values of all 'name : value' lines, e.g. 'Nessus version', 'Scanner IP'
+        'scanner_ip' - ip address of scanner or None
+        'credentialed_checks' - value of 'Credentialed checks' line, e.g. 'yes, as 'root' via ssh', 'no' if plugin
+        output says that there is no output, or None
+        'credentialed_checks_yes' - True if 'Credentialed checks' line contains 'yes', False if it doesn't,
+        None if plugin output is not available
+    """
+    fields = _fields(plugin_output_content)
+
+    if (
+        "No output recorded." in plugin_output_content
+        or "Check Audit Trail" in plugin_output_content
+        or "19506 not enabled." in plugin_output_content
+    ):
+        credentialed_checks = "no"
+    elif "Credentialed checks" in fields:
+        credentialed_checks = fields["Credentialed checks"].replace("&apos;", "")
+    else:
+        credentialed_checks = None
+
+    if (
+        "no output recorded" in plugin_output_content
+        or "check Audit Trail" in plugin_output_content
+        or "not enabled." in plugin_output_content
+        or "info about used plugins not available" in plugin_output_content
+    ):
+        credentialed_checks_yes = None
+    else:
+        credentialed_checks_yes = "yes" in fields.get("Credentialed checks", "")
+
+    return {
+        "fields": types.MappingProxyType(fields),
+        "scanner_ip": fields.get("Scanner IP"),
+        "credentialed_checks": credentialed_checks,
+        "credentialed_checks_yes": credentialed_checks_yes,
+    }
+
+
+@plugin_output_parser(10150)
+def _netbios_information(plugin_output_content, plugin_id):
+    """
+    Function parses output of Plugin ID 10150 Windows NetBIOS / SMB Remote Host Information Disclosure.
+    :param plugin_output_content: plugin output
+    :param plugin_id: plugin id
+    :return: dictionary with keys:
+        'names' - tuple of (name, description) of all gathered NetBIOS names
+        'netbios_computer_name' - lowercase computer name or empty string
+        'netbios_domain_name' - lowercase workgroup / domain name or empty string
+    """
+    names = []
+    netbios_computer_name = ""
+    netbios_domain_name = ""
+    for match in _NETBIOS_NAME_LINE_PATTERN.finditer(plugin_output_content):
+        name = match.group("name").strip()
+        description = match.group("description").strip()
+        names.append((name, description))
+        if "Computer name" in description:
+            netbios_computer_name = name.lower()
+        if "Workgroup / Domain name" in description:
+            netbios_domain_name = name.lower()
+
+    return {
+        "names": tuple(names),
+        "netbios_computer_name": netbios_computer_name,
+        "netbios_domain_name": netbios_domain_name,
+    }
+
+
+@plugin_output_parser(91825, 91827)
+def _database_login_possible(plugin_output_content, plugin_id):
+    """
+    Function parses output of Plugin IDs 91825 Oracle DB Login Possible and 91827 Microsoft SQL Server Login Possible.
+    :param plugin_output_content: plugin output
+    :param plugin_id: plugin id
+    :return: dictionary with keys:
+        'credentialed_checks_enabled' - True if plugin output confirms that credentialed checks have been enabled
+        'credentialed_checks' - 'no' if plugin output says that there is no output, 'yes' if credentialed checks
+        have been enabled, otherwise None
+    """
+    credentialed_checks_enabled = (
+        _CREDENTIALED_CHECKS_DB_TEXTS[plugin_id] in plugin_output_content
+    )
+    if (
+        "No output recorded." in plugin_output_content
+        or "Check Audit Trail" in plugin_output_content
+        or f"{plugin_id} not enabled." in plugin_output_content
+    ):
+        credentialed_checks = "no"
+    elif credentialed_checks_enabled:
+        credentialed_checks = "yes"
+    else:
+        credentialed_checks = None
+
+    return {
+        "credentialed_checks_enabled": credentialed_checks_enabled,
+        "credentialed_checks": credentialed_checks,
+    }
+
+
+@plugin_output_parser(11936)
+def _os_identification(plugin_output_content, plugin_id):
+    """
+    Function parses output of Plugin ID 11936 OS Identification.
+    :param plugin_output_content: plugin output
+    :param plugin_id: plugin id
+    :return: dictionary with keys:
+        'fields' - values of all 'name : value' lines
+        'remote_operating_system' - operating system or None
+        'confidence_level' - confidence level as integer or None
+        'method' - method of identification, e.g. 'SSH', or None
+    """
+    fields = _fields(plugin_output_content)
+    confidence_level = fields.get("Confidence level")
+    if confidence_level is not None and confidence_level.strip().isdigit():
+        confidence_level = int(confidence_level)
+    else:
+        confidence_level = None
+
+    return {
+        "fields": types.MappingProxyType(fields),
+        "remote_operating_system": fields.get("Remote operating system"),
+        "confidence_level": confidence_level,
+        "method": fields.get("Method"),
+    }
+
+
+def plugin_output_record(root, report_host, plugin_id):
+    """
+    Function returns data parsed from plugin output for given plugin id by parser registered for this plugin id,
+    see PLUGIN_OUTPUT_PARSERS. Plugin output is parsed once per report host and plugin id and cached as long as
+    report host element exists.
+    :param root: root element of scan file tree
+    :param report_host: scanned host
+    :param plugin_id: plugin id
+    :return: read-only dictionary with 'status' key, see plugin_output_status, and keys specific for plugin id
+    """
+    plugin_id = str(plugin_id)
+    if plugin_id not in PLUGIN_OUTPUT_PARSERS:
+        raise ValueError(f"There is no parser for plugin id {plugin_id}")
+
+    records = _plugin_output_records_cache.get(report_host)
+    if records is None:
+        records = dict()
+        _plugin_output_records_cache[report_host] = records
+    record = records.get(plugin_id)
+    if record is None:
+        plugin_output_content = plugin_output(root, report_host, plugin_id)
+        record = {"status": plugin_output_status(plugin_output_content, plugin_id)}
+        record.update(
+            PLUGIN_OUTPUT_PARSERS[plugin_id](plugin_output_content, plugin_id)
+        )
+        record = types.MappingProxyType(record)
+        records[plugin_id] = record
+    return record
+
+
 def compliance_plugin(report_item):
     """
     Function checks if given report item is compliance plugin.
@@ -20,10 +20,368 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import re
-import datetime
+import types
 from nessus_file_reader.plugin import plugin
 from nessus_file_reader import utilities
 
+# properties of scan computed by NessusScan, kept once per root element
+_nessus_scan_cache = utilities.ElementCache()
+
+
+def _scan_property(function):
+    """
+    Decorator which turns given method of NessusScan into property computed on first use and kept in properties
+    shared by all NessusScan objects of the same root element.
+    :param function: method computing value of property
+    :return: property
+    """
+    name = function.__name__
+
+    def getter(self):
+        try:
+            return self._properties[name]
+        except KeyError:
+            value = function(self)
+            self._properties[name] = value
+            return value
+
+    getter.__doc__ = function.__doc__
+    return property(getter)
+
+
+def _report_hosts_property(function):
+    """
+    Decorator which turns given method of NessusScan into property derived from report hosts, computed on first use
+    and kept like _scan_property, except for root elements yielded by nfr.file.iter_report_hosts, which report hosts
+    change, so property is computed on every use.
+    :param function: method computing value of property
+    :return: property
+    """
+    cached_getter = _scan_property(function).fget
+
+    def getter(self):
+        if utilities.streamed_root(self.root):
+            return function(self)
+        return cached_getter(self)
+
+    getter.__doc__ = function.__doc__
+    return property(getter)
+
+
+class NessusScan:
+    """
+    Scan file tree with data derived from it computed on first use and cached, e.g. preferences, plugin set,
+    targets, report hosts, timings and per-host facts. Computed data is shared by all NessusScan objects of the same
+    root element and kept as long as root element exists, so free functions of this module, which are thin wrappers
+    of NessusScan, don't compute the same data again. Data derived from report hosts, e.g. report_hosts, times or
+    hosts_facts, is not cached for root elements yielded by nfr.file.iter_report_hosts, which report hosts change.
+    """
+
+    def __init__(self, root):
+        """
+        :param root: root element of scan file tree
+        """
+        self.root = root
+        properties = _nessus_scan_cache.get(root)
+        if properties is None:
+            properties = dict()
+            _nessus_scan_cache[root] = properties
+        self._properties = properties
+
+    @_scan_property
+    def report_name(self):
+        """scan report name"""
+        return self.root.find("Report").get("name")
+
+    @_scan_property
+    def policy_name(self):
+        """policy name used during scan or None"""
+        policy = self.root.find("Policy")
+        if policy is not None and len(policy):
+            return policy.findtext("policyName")
+        return None
+
+    @_scan_property
+    def server_preferences(self):
+        """read-only dictionary with server preference name as key and preference value as value"""
+        preferences_dict = dict()
+        server_preferences_element = self.root.find(
+            "Policy/Preferences/ServerPreferences"
+        )
+        if server_preferences_element is not None:
+            for preference in server_preferences_element.findall("preference"):
+                # if preference occurs more than once, value of last occurrence is used
+                preferences_dict[preference.findtext("name")] = preference.findtext(
+                    "value"
+                )
+        return types.MappingProxyType(preferences_dict)
+
+    @_scan_property
+    def plugins_preferences(self):
+        """read-only dictionary with full plugin preference name as key and selected value as value"""
+        preferences_dict = dict()
+        for item in self.root.findall("Policy/Preferences/PluginsPreferences/item"):
+            selected_value = item.find("selectedValue")
+            if selected_value is not None:
+                for full_name in item.findall("fullName"):
+                    # if preference occurs more than once, value of first occurrence is used
+                    preferences_dict.setdefault(full_name.text, selected_value.text)
+        return types.MappingProxyType(preferences_dict)
+
+    @_scan_property
+    def plugin_set(self):
+        """tuple of plugins selected in policy or None"""
+        plugin_set_value = self.server_preferences.get("plugin_set")
+        if plugin_set_value:
+            return tuple(plugin_set_value[:-1].split(";"))
+        return None
+
+    @_scan_property
+    def plugin_set_frozenset(self):
+        """frozenset of plugins selected in policy or None"""
+        if self.plugin_set is not None:
+            return frozenset(self.plugin_set)
+        return None
+
+    @_scan_property
+    def target(self):
+        """value of TARGET server preference or None"""
+        target_hosts = self.root.find(
+            "Policy/Preferences/ServerPreferences/preference/[name='TARGET']/value"
+        )
+        if target_hosts is not None:
+            return target_hosts.text
+        return None
+
+    @_scan_property
+    def target_hosts_raw(self):
+        """tuple of lowercase targets specified in scan or None"""
+        if self.target is None:
+            return None
+        return tuple(element.lower() for element in self.target.split(","))
+
+    @_scan_property
+    def targets(self):
+        """
+        tuple of targets specified in scan, in order of TARGET server preference, or None. IPs and IP ranges are
+        tuples (first, last) of integers, other targets are lowercase names. If nessus file comes from Tenable.sc
+        '[ip]' is removed from target.
+        """
+        if self.target_hosts_raw is None:
+            return None
+        targets = []
+        for target in (element.split("[", 1)[0] for element in self.target_hosts_raw):
+            address = utilities.ip_address_integer(target)
+            if address is not None:
+                targets.append((address, address))
+                continue
+            interval = utilities.ip_range_interval(target)
+            if interval is not None:
+                targets.append(interval)
+            elif not re.match(
+                r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}-\d{1,3}.\d{1,3}.\d{1,3}.\d{1,3}",
+                target,
+            ):
+                # empty IP range has no targets
+                targets.append(target)
+        return tuple(targets)
+
+    @_scan_property
+    def target_intervals(self):
+        """sorted tuple of disjoint tuples (first, last) of integers of target IPs"""
+        if self.targets is None:
+            return ()
+        return tuple(
+            utilities.ip_intervals_merge(
+                target for target in self.targets if isinstance(target, tuple)
+            )
+        )
+
+    @_scan_property
+    def target_hostnames(self):
+        """frozenset of targets which are not IPs"""
+        if self.targets is None:
+            return frozenset()
+        return frozenset(target for target in self.targets if isinstance(target, str))
+
+    @_scan_property
+    def number_of_target_hosts(self):
+        """number of target hosts, with duplicated entries, or None if there are no targets"""
+        if self.targets is None:
+            return None
+        return utilities.ip_intervals_size(
+            target for target in self.targets if isinstance(target, tuple)
+        ) + sum(1 for target in self.targets if isinstance(target, str))
+
+    @_scan_property
+    def number_of_target_hosts_without_duplicates(self):
+        """number of target hosts without duplicated entries"""
+        return utilities.ip_intervals_size(self.target_intervals) + len(
+            self.target_hostnames
+        )
+
+    def iter_target_hosts(self):
+        """
+        Method yields target hosts specified in scan one by one, in order of TARGET server preference, with IP ranges
+        resolved to particular IP addresses.
+        :return: generator of targets
+        """
+        for target in self.targets or ():
+            if isinstance(target, tuple):
+                for address in utilities.ip_intervals_addresses([target]):
+                    yield str(address)
+            else:
+                yield target
+
+    @_scan_property
+    def target_hosts_sc_fqdn_ip(self):
+        """tuple of dictionaries with fqdn and ip of targets, if nessus file comes from Tenable.sc, or None"""
+        if self.target is None:
+            return None
+        target_list = []
+        for target in self.target.split(","):
+            target_splitted = target[:-1].split("[")
+            if len(target_splitted) == 2:
+                target_list.append(
+                    {"target_fqdn": target_splitted[0], "target_ip": target_splitted[1]}
+                )
+        return tuple(target_list)
+
+    @_report_hosts_property
+    def report_hosts(self):
+        """tuple of report hosts"""
+        return tuple(self.root.find("Report").findall("ReportHost"))
+
+    @_report_hosts_property
+    def scanned_hosts(self):
+        """tuple of names of scanned hosts"""
+        return tuple(report_host.get("name") for report_host in self.report_hosts)
+
+    @_report_hosts_property
+    def not_scanned_intervals(self):
+        """sorted tuple of disjoint tuples (first, last) of integers of target IPs which are not scanned hosts"""
+        scanned_addresses = (
+            utilities.ip_address_integer(report_host_name)
+            for report_host_name in self.scanned_hosts
+        )
+        return tuple(
+            utilities.ip_intervals_subtract(
+                self.target_intervals,
+                (address for address in scanned_addresses if address is not None),
+            )
+        )
+
+    @_report_hosts_property
+    def not_scanned_hostnames(self):
+        """frozenset of targets which are not IPs and are not scanned hosts"""
+        return self.target_hostnames - set(self.scanned_hosts)
+
+    @_report_hosts_property
+    def number_of_not_scanned_hosts(self):
+        """number of targets which are not scanned hosts"""
+        return utilities.ip_intervals_size(self.not_scanned_intervals) + len(
+            self.not_scanned_hostnames
+        )
+
+    def iter_not_scanned_hosts(self):
+        """
+        Method yields targets which are not scanned hosts one by one, IPs in ascending order first.
+        :return: generator of targets
+        """
+        for address in utilities.ip_intervals_addresses(self.not_scanned_intervals):
+            yield str(address)
+        yield from sorted(self.not_scanned_hostnames)
+
+    @_report_hosts_property
+    def times(self):
+        """
+        dictionary with scan time start, end, elapsed and list of times of every report host, see scan_times
+        """
+        min_date_start_parsed = None
+        max_date_end_parsed = None
+        hosts_times = []
+
+        for report_host in self.report_hosts:
+            host_start_time_parsed = None
+            host_end_time_parsed = None
+            for tag in report_host[0].findall("tag"):
+                tag_name = tag.get("name")
+                if tag_name == "HOST_START":
+                    host_start_time_parsed = utilities.host_time_parse(tag.text)
+                elif tag_name == "HOST_END":
+                    host_end_time_parsed = utilities.host_time_parse(tag.text)
+
+            if host_start_time_parsed is not None:
+                if min_date_start_parsed is None or (
+                    min_date_start_parsed > host_start_time_parsed
+                ):
+                    min_date_start_parsed = host_start_time_parsed
+            if host_end_time_parsed is not None:
+                if max_date_end_parsed is None or (
+                    max_date_end_parsed < host_end_time_parsed
+                ):
+                    max_date_end_parsed = host_end_time_parsed
+
+            if host_start_time_parsed is not None and host_end_time_parsed is not None:
+                host_time_elapsed = str(host_end_time_parsed - host_start_time_parsed)
+            else:
+                host_time_elapsed = None
+            hosts_times.append(
+                {
+                    "report_host_name": report_host.get("name"),
+                    "host_time_start": host_start_time_parsed,
+                    "host_time_end": host_end_time_parsed,
+                    "host_time_elapsed": host_time_elapsed,
+                }
+            )
+
+        if min_date_start_parsed is not None and max_date_end_parsed is not None:
+            whole_scan_duration_parsed = str(
+                max_date_end_parsed - min_date_start_parsed
+            )
+        else:
+            whole_scan_duration_parsed = None
+
+        return {
+            "scan_time_start": min_date_start_parsed,
+            "scan_time_end": max_date_end_parsed,
+            "scan_time_elapsed": whole_scan_duration_parsed,
+            "hosts": hosts_times,
+        }
+
+    @_report_hosts_property
+    def hosts_facts(self):
+        """
+        tuple of read-only dictionaries with facts about every report host, in order of report hosts:
+            'report_host_name' - name of report host
+            'credentialed_checks' - True or False if Plugin ID 19506 says that credentialed checks have been enabled,
+            None if Plugin ID 19506 output is not available
+            'credentialed_checks_db' - number of databases with credentialed checks enabled based on Plugin IDs
+            91825 and 91827
+        """
+        hosts_facts = []
+        for report_host in self.report_hosts:
+            credentialed_checks = plugin.plugin_output_record(
+                self.root, report_host, "19506"
+            )["credentialed_checks_yes"]
+            credentialed_checks_db = sum(
+                plugin.plugin_output_record(self.root, report_host, plugin_id)[
+                    "credentialed_checks_enabled"
+                ]
+                for plugin_id in ["91825", "91827"]
+            )
+
+            hosts_facts.append(
+                types.MappingProxyType(
+                    {
+                        "report_host_name": report_host.get("name"),
+                        "credentialed_checks": credentialed_checks,
+                        "credentialed_checks_db": credentialed_checks_db,
+                    }
+                )
+            )
+        return tuple(hosts_facts)
+
 
 def report_name(root):
     """
@@ -31,7 +389,7 @@ def report_name(root):
     :param root: root element of scan file tree
     :return: scan report name
     """
-    name = root.find("Report").get("name")
+    name = NessusScan(root).report_name
     return name
 
 
@@ -41,17 +399,21 @@ def policy_name(root):
     :param root: root element of scan file tree
     :return: policy name
     """
-    if root.find("Policy"):
-        name = root.find("Policy").find("policyName")
-        if name is not None:
-            name = name.text
-        else:
-            name = None
-    else:
-        name = None
+    name = NessusScan(root).policy_name
     return name
 
 
+def server_preferences(root):
+    """
+    Function returns all server preferences from policy used during scan. Preferences are read once per root element
+    and cached as long as root element exists.
+    :param root: root element of scan file tree
+    :return: read-only dictionary with preference name as key and preference value as value
+    """
+    preferences = NessusScan(root).server_preferences
+    return preferences
+
+
 def server_preference_value(root, preference_name):
     """
     Function returns value for given server preference.
@@ -62,18 +424,9 @@ def server_preference_value(root, preference_name):
         None - if preference does not exist
     """
 
-    if root.find("Policy"):
-        status = 0
-        preference_value = None
-        for preference in root.find("Policy/Preferences/ServerPreferences").findall(
-            "preference"
-        ):
-            preference_name_in_report = preference.findtext("name")
-            if preference_name_in_report == preference_name:
-                preference_value = preference.findtext("value")
-                status = 1
-        if status == 0:
-            preference_value = None
+    policy = root.find("Policy")
+    if policy is not None and len(policy):
+        preference_value = server_preferences(root).get(preference_name)
     else:
         preference_value = None
 
@@ -150,28 +503,50 @@ def plugin_set(root):
     :param root: root element of scan file tree
     :return: list of plugins selected in policy or None
     """
-    plugin_set_list = server_preference_value(root, "plugin_set")
-    if plugin_set_list:
-        plugin_set_list = plugin_set_list[:-1].split(";")
+    plugin_set_parsed = NessusScan(root).plugin_set
+    if plugin_set_parsed is not None:
+        plugin_set_list = list(plugin_set_parsed)
     else:
         plugin_set_list = None
     return plugin_set_list
 
 
+def plugin_set_frozenset(root):
+    """
+    Function returns set of plugins selected in policy used during scan, suitable for fast membership checks.
+    Plugin set is parsed once per root element and cached.
+    :param root: root element of scan file tree
+    :return: frozenset of plugins selected in policy or None
+    """
+    plugin_set_parsed = NessusScan(root).plugin_set_frozenset
+    return plugin_set_parsed
+
+
 def plugin_set_number(root):
     """
     Function returns number of plugins selected in policy used during scan.
     :param root: root element of scan file tree
     :return: number of plugins selected in policy
     """
-    plugin_set_list = plugin_set(root)
-    if plugin_set_list is not None:
-        plugin_set_len = len(plugin_set_list)
+    plugin_set_parsed = NessusScan(root).plugin_set
+    if plugin_set_parsed is not None:
+        plugin_set_len = len(plugin_set_parsed)
     else:
         plugin_set_len = None
     return plugin_set_len
 
 
+def plugins_preferences(root):
+    """
+    Function returns all plugins preferences from policy used during scan. Preferences are read once per root element
+    and cached as long as root element exists.
+    :param root: root element of scan file tree
+    :return: read-only dictionary with full preference name as key and selected value as value
+    """
+    preferences = NessusScan(root).plugins_preferences
+    return preferences
+
+
 def plugin_preference_value(root, full_preference_name):
     """
     Function returns value for given full preference name of plugin.
@@ -179,15 +554,7 @@ def plugin_preference_value(root, full_preference_name):
     :param full_preference_name: full preference name of plugin
     :return: preference value or None
     """
-    preference = root.find(
-        "Policy/Preferences/PluginsPreferences/item/[fullName='"
-        + full_preference_name
-        + "']/selectedValue"
-    )
-    if preference is not None:
-        preference_value = preference.text
-    else:
-        preference_value = None
+    preference_value = plugins_preferences(root).get(full_preference_name)
     return preference_value
 
 
@@ -256,13 +623,9 @@ def list_of_target_hosts_raw(root):
     :param root: root element of scan file tree
     :return: list of targets
     """
-    target_hosts = root.find(
-        "Policy/Preferences/ServerPreferences/preference/[name='TARGET']/value"
-    )
+    target_hosts = NessusScan(root).target_hosts_raw
     if target_hosts is not None:
-        target_hosts = target_hosts.text
-        target_hosts_splitted = target_hosts.split(",")
-        target_hosts_final_list = [element.lower() for element in target_hosts_splitted]
+        target_hosts_final_list = list(target_hosts)
     else:
         target_hosts_final_list = None
     return target_hosts_final_list
@@ -276,35 +639,9 @@ def list_of_target_hosts(root):
     :param root: root element of scan file tree
     :return: list of targets
     """
-    target_hosts = root.find(
-        "Policy/Preferences/ServerPreferences/preference/[name='TARGET']/value"
-    )
-    target_hosts_final_list = []
-    if target_hosts is not None:
-        target_hosts = target_hosts.text
-        target_hosts_splitted = target_hosts.split(",")
-        target_hosts_splitted_lower = [
-            element.lower() for element in target_hosts_splitted
-        ]
-        # if nessus file comes from Tenable.sc remove '[ip]' from target
-        target_hosts_splitted_lower_clear = [
-            element.split("[", 1)[0] for element in target_hosts_splitted_lower
-        ]
-        # if nessus file comes from Tenable.sc convert IP ranges in target into separate IP addresses
-        for target in target_hosts_splitted_lower_clear:
-            if re.match(
-                "\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}-\d{1,3}.\d{1,3}.\d{1,3}.\d{1,3}",
-                target,
-            ):
-                address_range = utilities.ip_range_split(target)
-                for address in address_range:
-                    target_hosts_final_list.append(str(address))
-            elif re.match("\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}/\d{1,2}", target):
-                address_range = utilities.ip_range_split(target)
-                for address in address_range:
-                    target_hosts_final_list.append(str(address))
-            else:
-                target_hosts_final_list.append(target)
+    scan = NessusScan(root)
+    if scan.targets is not None:
+        target_hosts_final_list = list(scan.iter_target_hosts())
     else:
         target_hosts_final_list = None
     return target_hosts_final_list
@@ -316,19 +653,9 @@ def list_of_target_hosts_sc_fqdn_ip(root):
     :param root: root element of scan file tree
     :return: dictionary of fqdn and ip
     """
-    target_list = []
-    target_hosts = root.find(
-        "Policy/Preferences/ServerPreferences/preference/[name='TARGET']/value"
-    )
+    target_hosts = NessusScan(root).target_hosts_sc_fqdn_ip
     if target_hosts is not None:
-        target_hosts = target_hosts.text
-        target_hosts_splitted = target_hosts.split(",")
-        for target in target_hosts_splitted:
-            target_splitted = target[:-1].split("[")
-            if len(target_splitted) == 2:
-                target_list.append(
-                    {"target_fqdn": target_splitted[0], "target_ip": target_splitted[1]}
-                )
+        target_list = [dict(target) for target in target_hosts]
     else:
         target_list = None
     return target_list
@@ -340,7 +667,7 @@ def report_hosts(root):
     :param root: root element of scan file tree
     :return: list report hosts
     """
-    hosts = root.find("Report").findall("ReportHost")
+    hosts = list(NessusScan(root).report_hosts)
     return hosts
 
 
@@ -350,10 +677,7 @@ def list_of_scanned_hosts(root):
     :param root: root element of scan file tree
     :return: list of names of scanned hosts
     """
-    report_hosts_names = list()
-    for report_host in report_hosts(root):
-        report_host_name = report_host.get("name")
-        report_hosts_names.append(report_host_name)
+    report_hosts_names = list(NessusScan(root).scanned_hosts)
     return report_hosts_names
 
 
@@ -363,10 +687,9 @@ def list_of_not_scanned_hosts(root):
     :param root: root element of scan file tree
     :return: list of not scanned hosts or empty list
     """
-    target_hosts = list_of_target_hosts(root)
-    scanned_hosts = list_of_scanned_hosts(root)
-    if target_hosts:
-        not_scanned_hosts = list(set(target_hosts) - set(scanned_hosts))
+    scan = NessusScan(root)
+    if scan.number_of_target_hosts:
+        not_scanned_hosts = list(scan.iter_not_scanned_hosts())
     else:
         not_scanned_hosts = None
     return not_scanned_hosts
@@ -378,11 +701,7 @@ def number_of_target_hosts(root):
     :param root: root element of scan file tree
     :return: number of target hosts
     """
-    target_hosts = list_of_target_hosts(root)
-    if target_hosts is not None:
-        number_of_targets = len(target_hosts)
-    else:
-        number_of_targets = None
+    number_of_targets = NessusScan(root).number_of_target_hosts
     return number_of_targets
 
 
@@ -392,10 +711,10 @@ def number_of_target_hosts_without_duplicates(root):
     :param root: root element of scan file tree
     :return: number of actual target hosts
     """
-    target_hosts = list_of_target_hosts(root)
+    scan = NessusScan(root)
 
-    if target_hosts:
-        actual_number_of_targets = len(set(target_hosts))
+    if scan.number_of_target_hosts:
+        actual_number_of_targets = scan.number_of_target_hosts_without_duplicates
     else:
         actual_number_of_targets = None
 
@@ -408,7 +727,7 @@ def number_of_scanned_hosts(root):
     :param root: root element of scan file tree
     :return: number of scanned hosts
     """
-    number = len(list_of_scanned_hosts(root))
+    number = len(NessusScan(root).scanned_hosts)
     return number
 
 
@@ -418,9 +737,9 @@ def number_of_not_scanned_hosts(root):
     :param root: root element of scan file tree
     :return: number of not scanned hosts
     """
-    not_scanned_hosts = list_of_not_scanned_hosts(root)
-    if not_scanned_hosts:
-        number_of_not_scanned_hosts = len(not_scanned_hosts)
+    scan = NessusScan(root)
+    if scan.number_of_target_hosts and scan.number_of_not_scanned_hosts:
+        number_of_not_scanned_hosts = scan.number_of_not_scanned_hosts
     else:
         number_of_not_scanned_hosts = None
     return number_of_not_scanned_hosts
@@ -430,24 +749,17 @@ def number_of_scanned_hosts_with_credentialed_checks_yes(root):
     """
     Function returns number of scanned hosts with credentialed checks yes.
     :param root: root element of scan file tree
-    :return: number of scanned hosts with credentialed checks yes
+    :return: number of scanned hosts with credentialed checks yes, None if Plugin ID 19506 output is not available
+        for any of scanned hosts
     """
     number_of_report_hosts_with_credentialed_checks = 0
 
-    for report_host in report_hosts(root):
-        pido_19506 = plugin.plugin_output(root, report_host, "19506")
-        if (
-            "no output recorded" in pido_19506
-            or "check Audit Trail" in pido_19506
-            or "not enabled." in pido_19506
-            or "info about used plugins not available" in pido_19506
-        ):
+    for host_facts in NessusScan(root).hosts_facts:
+        if host_facts["credentialed_checks"] is None:
             number_of_report_hosts_with_credentialed_checks = None
-        else:
-            for line in pido_19506.split("\n"):
-                if re.findall("Credentialed checks :", line):
-                    if re.findall("yes", line):
-                        number_of_report_hosts_with_credentialed_checks += 1
+            break
+        if host_facts["credentialed_checks"]:
+            number_of_report_hosts_with_credentialed_checks += 1
 
     return number_of_report_hosts_with_credentialed_checks
 
@@ -458,25 +770,30 @@ def number_of_scanned_dbs_with_credentialed_checks_yes(root):
     :param root: root element of scan file tree
     :return: number of scanned dbs with credentialed checks yes
     """
-    number_of_scanned_dbs_with_credentialed_checks = 0
-
-    for report_host in report_hosts(root):
+    number_of_scanned_dbs_with_credentialed_checks = sum(
+        host_facts["credentialed_checks_db"]
+        for host_facts in NessusScan(root).hosts_facts
+    )
 
-        # "91825: Oracle DB Login Possible"
-        pido_91825 = plugin.plugin_output(root, report_host, "91825")
-        if re.findall(
-            "Credentialed checks have been enabled for Oracle RDBMS server", pido_91825
-        ):
-            number_of_scanned_dbs_with_credentialed_checks += 1
+    return number_of_scanned_dbs_with_credentialed_checks
 
-        # "91827: Oracle DB Login Possible"
-        pido_91827 = plugin.plugin_output(root, report_host, "91827")
-        if re.findall(
-            "Credentialed checks have been enabled for MSSQL server", pido_91827
-        ):
-            number_of_scanned_dbs_with_credentialed_checks += 1
 
-    return number_of_scanned_dbs_with_credentialed_checks
+def scan_times(root):
+    """
+    Function returns scan time start, end, elapsed and times for every report host, computed in one pass over report
+    hosts. Result is computed once per root element and cached as long as root element exists, returned dictionary
+    is a copy, so it can be changed by caller.
+    :param root: root element of scan file tree
+    :return: dictionary with keys:
+        'scan_time_start' - date and time when scan has been started or None
+        'scan_time_end' - date and time when scan has been ended or None
+        'scan_time_elapsed' - scan time elapsed in format HH:MM:SS or None
+        'hosts' - list of dictionaries with 'report_host_name', 'host_time_start', 'host_time_end' and
+        'host_time_elapsed' for every report host
+    """
+    times = NessusScan(root).times
+    # copy, so cached times can't be changed by caller
+    return dict(times, hosts=[dict(host_times) for host_times in times["hosts"]])
 
 
 def scan_time_start(root):
@@ -485,44 +802,7 @@ def scan_time_start(root):
     :param root: root element of scan file tree
     :return: date and time when scan has been started
     """
-
-    min_date_start_check = root.find(
-        "Report/ReportHost[1]/HostProperties/tag/[@name='HOST_START']"
-    )
-
-    if min_date_start_check is not None:
-        min_date_start = min_date_start_check.text
-        min_date_start_parsed = datetime.datetime.strptime(
-            min_date_start, "%a %b %d %H:%M:%S %Y"
-        )
-
-        max_date_end = root.find(
-            "Report/ReportHost[1]/HostProperties/tag/[@name='HOST_END']"
-        ).text
-        max_date_end_parsed = datetime.datetime.strptime(
-            max_date_end, "%a %b %d %H:%M:%S %Y"
-        )
-
-        for reportHost in root.find("Report").findall("ReportHost"):
-            host_end_time_find = reportHost[0].find("tag/[@name='HOST_END']")
-            if host_end_time_find is not None:
-                host_end_time = host_end_time_find.text
-            host_start_time = reportHost[0].find("tag/[@name='HOST_START']").text
-
-            host_end_time_parsed = datetime.datetime.strptime(
-                host_end_time, "%a %b %d %H:%M:%S %Y"
-            )
-            host_start_time_parsed = datetime.datetime.strptime(
-                host_start_time, "%a %b %d %H:%M:%S %Y"
-            )
-
-            if min_date_start_parsed > host_start_time_parsed:
-                min_date_start_parsed = host_start_time_parsed
-
-            if max_date_end_parsed < host_end_time_parsed:
-                max_date_end_parsed = host_end_time_parsed
-    else:
-        min_date_start_parsed = None
+    min_date_start_parsed = NessusScan(root).times["scan_time_start"]
     return min_date_start_parsed
 
 
@@ -532,44 +812,7 @@ def scan_time_end(root):
     :param root: root element of scan file tree
     :return: date and time when scan has been ended
     """
-
-    min_date_start_check = root.find(
-        "Report/ReportHost[1]/HostProperties/tag/[@name='HOST_START']"
-    )
-
-    if min_date_start_check is not None:
-        min_date_start = min_date_start_check.text
-        min_date_start_parsed = datetime.datetime.strptime(
-            min_date_start, "%a %b %d %H:%M:%S %Y"
-        )
-
-        max_date_end = root.find(
-            "Report/ReportHost[1]/HostProperties/tag/[@name='HOST_END']"
-        ).text
-        max_date_end_parsed = datetime.datetime.strptime(
-            max_date_end, "%a %b %d %H:%M:%S %Y"
-        )
-
-        for reportHost in root.find("Report").findall("ReportHost"):
-            host_end_time_find = reportHost[0].find("tag/[@name='HOST_END']")
-            if host_end_time_find is not None:
-                host_end_time = host_end_time_find.text
-            host_start_time = reportHost[0].find("tag/[@name='HOST_START']").text
-
-            host_end_time_parsed = datetime.datetime.strptime(
-                host_end_time, "%a %b %d %H:%M:%S %Y"
-            )
-            host_start_time_parsed = datetime.datetime.strptime(
-                host_start_time, "%a %b %d %H:%M:%S %Y"
-            )
-
-            if min_date_start_parsed > host_start_time_parsed:
-                min_date_start_parsed = host_start_time_parsed
-
-            if max_date_end_parsed < host_end_time_parsed:
-                max_date_end_parsed = host_end_time_parsed
-    else:
-        max_date_end_parsed = None
+    max_date_end_parsed = NessusScan(root).times["scan_time_end"]
     return max_date_end_parsed
 
 
@@ -579,45 +822,5 @@ def scan_time_elapsed(root):
     :param root: root element of scan file tree
     :return: scan time elapsed in format HH:MM:SS
     """
-
-    min_date_start_check = root.find(
-        "Report/ReportHost[1]/HostProperties/tag/[@name='HOST_START']"
-    )
-
-    if min_date_start_check is not None:
-        min_date_start = min_date_start_check.text
-        min_date_start_parsed = datetime.datetime.strptime(
-            min_date_start, "%a %b %d %H:%M:%S %Y"
-        )
-        max_date_end = root.find(
-            "Report/ReportHost[1]/HostProperties/tag/[@name='HOST_END']"
-        ).text
-        max_date_end_parsed = datetime.datetime.strptime(
-            max_date_end, "%a %b %d %H:%M:%S %Y"
-        )
-
-        for reportHost in root.find("Report").findall("ReportHost"):
-            host_end_time_find = reportHost[0].find("tag/[@name='HOST_END']")
-            if host_end_time_find is not None:
-                host_end_time = host_end_time_find.text
-            host_start_time = reportHost[0].find("tag/[@name='HOST_START']").text
-
-            host_end_time_parsed = datetime.datetime.strptime(
-                host_end_time, "%a %b %d %H:%M:%S %Y"
-            )
-            host_start_time_parsed = datetime.datetime.strptime(
-                host_start_time, "%a %b %d %H:%M:%S %Y"
-            )
-
-            if min_date_start_parsed > host_start_time_parsed:
-                min_date_start_parsed = host_start_time_parsed
-
-            if max_date_end_parsed < host_end_time_parsed:
-                max_date_end_parsed = host_end_time_parsed
-
-        whole_scan_duration = max_date_end_parsed - min_date_start_parsed
-        whole_scan_duration_parsed = str(whole_scan_duration)
-
-    else:
-        whole_scan_duration_parsed = None
+    whole_scan_duration_parsed = NessusScan(root).times["scan_time_elapsed"]
     return whole_scan_duration_parsed
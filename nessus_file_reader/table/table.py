@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+nessus file reader (NFR) by LimberDuck (pronounced *ˈlɪm.bɚ dʌk*) is a python module
+created to quickly parse nessus files containing the results of scans
+performed by using Nessus by (C) Tenable, Inc.
+Copyright (C) 2019 Damian Krawczyk
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import array
+import math
+import jmespath
+import jmespath.visitor
+from nessus_file_reader.plugin import plugin
+
+# columns of rows returned for plugin severity, in order of nfr scan --plugin-severity output
+PLUGIN_SEVERITY_COLUMNS = [
+    "File name",
+    "Report host name",
+    "PID",
+    "S",
+    "SL",
+    "RF",
+    "CVSSv2",
+    "CVSSv2L",
+    "CVSSv3",
+    "CVSSv3L",
+    "CVSSv4",
+    "CVSSv4L",
+    "VPR",
+    "VPRL",
+    "EPSS",
+    "EPSS%",
+]
+
+# columns of ScanTable with their kind: 'int' and 'float' columns are typed arrays, 'str' columns are dictionary
+# encoded, i.e. every distinct value is kept once and rows keep only its code
+COLUMNS = {
+    "File name": "str",
+    "Report host name": "str",
+    "PID": "int",
+    "S": "int",
+    "SL": "str",
+    "RF": "str",
+    "CVSSv2": "float",
+    "CVSSv2L": "str",
+    "CVSSv3": "float",
+    "CVSSv3L": "str",
+    "CVSSv4": "float",
+    "CVSSv4L": "str",
+    "VPR": "float",
+    "VPRL": "str",
+    "EPSS": "float",
+    "EPSS%": "str",
+    "Port": "int",
+    "Protocol": "str",
+    "Plugin name": "str",
+}
+
+# value kept in int columns for missing or not numeric value
+_INT_MISSING = -(2**63)
+
+_ARRAY_TYPE_CODES = {"int": "q", "float": "d", "str": "I"}
+_NUMPY_TYPES = {"int": "int64", "float": "float64", "str": "uint32"}
+
+
+def _report_item_column(report_item_name, label=None):
+    """
+    Function returns function which returns value of given report item name, or its label, for plugin severity row.
+    :param report_item_name: exact report item name e.g. cvss3_base_score
+    :param label: function converting value to label e.g. plugin.cvssv3_score_to_severity
+    :return: function called with nessus file name, report host name and report item
+    """
+
+    def column_value(nessus_scan_file, report_host_name, report_item):
+        value = plugin.report_item_value(report_item, report_item_name)
+        if label is not None:
+            return label(value)
+        return value
+
+    return column_value
+
+
+# functions returning value of plugin severity column for nessus file name, report host name and report item
+_PLUGIN_SEVERITY_VALUES = {
+    "File name": lambda nessus_scan_file, report_host_name, report_item: nessus_scan_file,
+    "Report host name": lambda nessus_scan_file, report_host_name, report_item: report_host_name,
+    "PID": _report_item_column("pluginID"),
+    "S": _report_item_column("severity"),
+    "SL": _report_item_column("severity", plugin.severity_number_to_label),
+    "RF": _report_item_column("risk_factor"),
+    "CVSSv2": _report_item_column("cvss_base_score"),
+    "CVSSv2L": _report_item_column("cvss_base_score", plugin.cvssv2_score_to_severity),
+    "CVSSv3": _report_item_column("cvss3_base_score"),
+    "CVSSv3L": _report_item_column("cvss3_base_score", plugin.cvssv3_score_to_severity),
+    "CVSSv4": _report_item_column("cvss4_base_score"),
+    "CVSSv4L": _report_item_column("cvss4_base_score", plugin.cvssv4_score_to_severity),
+    "VPR": _report_item_column("vpr_score"),
+    "VPRL": _report_item_column("vpr_score", plugin.vpr_score_to_severity),
+    "EPSS": _report_item_column("epss_score"),
+    "EPSS%": _report_item_column("epss_score", plugin.epss_score_decimal_to_percent),
+}
+
+# JMESPath nodes which can be evaluated on row with referenced fields only
+_PUSHDOWN_NODE_TYPES = {
+    "field",
+    "literal",
+    "comparator",
+    "and_expression",
+    "or_expression",
+    "not_expression",
+    "function_expression",
+}
+
+
+def _filter_condition(parsed):
+    """
+    Function returns condition of filter which is applied first to list of rows by given parsed JMESPath expression,
+    e.g. S=='4' for [?S=='4'].PID or [?S=='4'] | [0].
+    :param parsed: parsed JMESPath expression
+    :return: parsed condition or None if expression doesn't start with filter of list of rows
+    """
+    if parsed["type"] == "pipe":
+        return _filter_condition(parsed["children"][0])
+    if (
+        parsed["type"] == "filter_projection"
+        and parsed["children"][0]["type"] == "identity"
+    ):
+        return parsed["children"][2]
+    return None
+
+
+def _condition_fields(condition):
+    """
+    Function returns names of fields referenced by given parsed condition.
+    :param condition: parsed JMESPath condition
+    :return: set of field names or None if condition needs whole row, e.g. uses @
+    """
+    if condition["type"] not in _PUSHDOWN_NODE_TYPES:
+        return None
+    fields = set()
+    if condition["type"] == "field":
+        fields.add(condition["value"])
+    for child in condition["children"]:
+        child_fields = _condition_fields(child)
+        if child_fields is None:
+            return None
+        fields |= child_fields
+    return fields
+
+
+def plugin_severity_record(
+    nessus_scan_file, report_host_name, report_item, columns=None
+):
+    """
+    Function returns plugin severity row of given report item with given columns only, other values are not read
+    from report item at all.
+    :param nessus_scan_file: given nessus file name
+    :param report_host_name: name of report host of given report item
+    :param report_item: report item
+    :param columns: list of column names, PLUGIN_SEVERITY_COLUMNS by default
+    :return: dictionary with column names and string values
+    """
+    if columns is None:
+        columns = PLUGIN_SEVERITY_COLUMNS
+    return {
+        column: _PLUGIN_SEVERITY_VALUES[column](
+            nessus_scan_file, report_host_name, report_item
+        )
+        for column in columns
+    }
+
+
+def plugin_severity_predicate(filter_expression):
+    """
+    Function returns predicate which tells if plugin severity row of report item passes filter of given JMESPath
+    expression, e.g. [?S=='4'], [?S=='4' && RF=='High'].{h:"Report host name",p:PID} or [?VPR != null] | [0].
+    Predicate reads from report item only columns referenced by filter, so rows which don't pass filter are dropped
+    before other columns are read. Rows passing predicate still have to be searched with given expression, which
+    gives the same result as for all rows.
+    :param filter_expression: JMESPath expression
+    :return: function called with nessus file name, report host name and report item or None if expression
+        is not supported and all rows have to be searched with expression
+    """
+    condition = _filter_condition(jmespath.compile(filter_expression).parsed)
+    if condition is None:
+        return None
+    fields = _condition_fields(condition)
+    if fields is None:
+        return None
+    # fields which are not columns, e.g. null in [?VPR != null], are missing in every row
+    columns = [column for column in PLUGIN_SEVERITY_COLUMNS if column in fields]
+    interpreter = jmespath.visitor.TreeInterpreter()
+
+    def predicate(nessus_scan_file, report_host_name, report_item):
+        value = interpreter.visit(
+            condition,
+            plugin_severity_record(
+                nessus_scan_file, report_host_name, report_item, columns
+            ),
+        )
+        # JMESPath false values
+        return not (
+            value == "" or value == [] or value == {} or value is None or value is False
+        )
+
+    return predicate
+
+
+def plugin_severity_filter_is_row_wise(filter_expression):
+    """
+    Function tells if given JMESPath expression only selects or reshapes rows one by one, e.g. [?S=='4'],
+    [?S=='4'].{h:"Report host name",p:PID} or [*].PID, so it gives the same rows applied to every part of rows
+    separately as applied to all rows. Expressions working on list of rows as whole, e.g. sort_by(@, &S)[:10],
+    length(@) or [?S=='4'] | [0], have to be applied to all rows.
+    :param filter_expression: JMESPath expression
+    :return: True if expression is applied to every row separately, otherwise False
+    """
+    parsed = jmespath.compile(filter_expression).parsed
+    if parsed["type"] not in ("filter_projection", "projection"):
+        return False
+    rows = parsed["children"][0]
+    if rows["type"] == "flatten":
+        rows = rows["children"][0]
+    return rows["type"] == "identity"
+
+
+class _DictionaryColumn:
+    """
+    Dictionary encoded column, every distinct value is kept once in values and rows keep its code.
+    Code 0 is reserved for None.
+    """
+
+    def __init__(self):
+        self.codes = array.array(_ARRAY_TYPE_CODES["str"])
+        self.values = [None]
+        self.value_codes = {None: 0}
+
+    def code(self, value):
+        value_code = self.value_codes.get(value)
+        if value_code is None:
+            value_code = self.value_codes[value] = len(self.values)
+            self.values.append(value)
+        return value_code
+
+    def extend(self, column):
+        """
+        Function appends all rows of given column to this column.
+        :param column: _DictionaryColumn
+        """
+        codes = [self.code(value) for value in column.values]
+        self.codes.extend(
+            array.array(
+                _ARRAY_TYPE_CODES["str"], (codes[code] for code in column.codes)
+            )
+        )
+
+
+class ScanTable:
+    """
+    Columnar table of report items of one or more nessus files. Numeric columns e.g. PID, S, Port, CVSS, VPR and EPSS
+    scores are kept in typed arrays and text columns e.g. report host name, risk factor and plugin name are dictionary
+    encoded, so one row takes about hundred bytes instead of dictionary with 16 strings. Values are returned
+    as strings, the same as read from nessus file, so rows and records can be used like rows built from report items.
+    """
+
+    def __init__(self):
+        self._columns = {}
+        for column, kind in COLUMNS.items():
+            if kind == "str":
+                self._columns[column] = _DictionaryColumn()
+            else:
+                self._columns[column] = array.array(_ARRAY_TYPE_CODES[kind])
+        # text of float value of every row as read from nessus file, e.g. '10.0' and not '10', dictionary encoded,
+        # because equal numbers can be written differently, e.g. '7' and '7.0'
+        self._float_texts = {
+            column: _DictionaryColumn()
+            for column, kind in COLUMNS.items()
+            if kind == "float"
+        }
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, row):
+        """
+        Function appends row to table.
+        :param row: dictionary with string values for columns from COLUMNS, missing columns are set to None
+        """
+        for column, kind in COLUMNS.items():
+            value = row.get(column)
+            if kind == "str":
+                column_data = self._columns[column]
+                column_data.codes.append(column_data.code(value))
+            elif kind == "int":
+                try:
+                    self._columns[column].append(int(value))
+                except (TypeError, ValueError):
+                    self._columns[column].append(_INT_MISSING)
+            else:
+                texts = self._float_texts[column]
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    number = math.nan
+                    texts.codes.append(0)
+                else:
+                    texts.codes.append(texts.code(value))
+                self._columns[column].append(number)
+        self._length += 1
+
+    def append_report_item(self, nessus_scan_file, report_host_name, report_item):
+        """
+        Function appends row with plugin severity data of given report item to table.
+        :param nessus_scan_file: given nessus file name
+        :param report_host_name: name of report host of given report item
+        :param report_item: report item
+        """
+        severity = plugin.report_item_value(report_item, "severity")
+        cvssv2_base_score = plugin.report_item_value(report_item, "cvss_base_score")
+        cvssv3_base_score = plugin.report_item_value(report_item, "cvss3_base_score")
+        cvssv4_base_score = plugin.report_item_value(report_item, "cvss4_base_score")
+        vpr_score = plugin.report_item_value(report_item, "vpr_score")
+        epss_score = plugin.report_item_value(report_item, "epss_score")
+        self.append(
+            {
+                "File name": nessus_scan_file,
+                "Report host name": report_host_name,
+                "PID": plugin.report_item_value(report_item, "pluginID"),
+                "S": severity,
+                "SL": plugin.severity_number_to_label(severity),
+                "RF": plugin.report_item_value(report_item, "risk_factor"),
+                "CVSSv2": cvssv2_base_score,
+                "CVSSv2L": plugin.cvssv2_score_to_severity(cvssv2_base_score),
+                "CVSSv3": cvssv3_base_score,
+                "CVSSv3L": plugin.cvssv3_score_to_severity(cvssv3_base_score),
+                "CVSSv4": cvssv4_base_score,
+                "CVSSv4L": plugin.cvssv4_score_to_severity(cvssv4_base_score),
+                "VPR": vpr_score,
+                "VPRL": plugin.vpr_score_to_severity(vpr_score),
+                "EPSS": epss_score,
+                "EPSS%": plugin.epss_score_decimal_to_percent(epss_score),
+                "Port": report_item.get("port"),
+                "Protocol": report_item.get("protocol"),
+                "Plugin name": report_item.get("pluginName"),
+            }
+        )
+
+    def extend(self, table):
+        """
+        Function appends all rows of given table to this table.
+        :param table: ScanTable
+        """
+        for column, kind in COLUMNS.items():
+            self._columns[column].extend(table._columns[column])
+            if kind == "float":
+                self._float_texts[column].extend(table._float_texts[column])
+        self._length += len(table)
+
+    def _value_getter(self, column):
+        """
+        Function returns function which returns value of given column for row number as string, the same as read
+        from nessus file.
+        :param column: column name
+        :return: function
+        """
+        kind = COLUMNS[column]
+        if kind == "str":
+            column_data = self._columns[column]
+            codes = column_data.codes
+            values = column_data.values
+            return lambda index: values[codes[index]]
+        numbers = self._columns[column]
+        if kind == "int":
+            return lambda index: (
+                None if numbers[index] == _INT_MISSING else str(numbers[index])
+            )
+        codes = self._float_texts[column].codes
+        values = self._float_texts[column].values
+        return lambda index: values[codes[index]]
+
+    def rows(self, columns=None, indices=None):
+        """
+        Function yields rows of table as tuples of string values.
+        :param columns: list of column names, PLUGIN_SEVERITY_COLUMNS by default
+        :param indices: row numbers in requested order, all rows by default
+        :return: generator of tuples
+        """
+        if columns is None:
+            columns = PLUGIN_SEVERITY_COLUMNS
+        if indices is None:
+            indices = range(self._length)
+        getters = [self._value_getter(column) for column in columns]
+        for index in indices:
+            yield tuple(getter(index) for getter in getters)
+
+    def records(self, columns=None, indices=None):
+        """
+        Function yields rows of table as dictionaries with string values, e.g. for JMESPath search.
+        :param columns: list of column names, PLUGIN_SEVERITY_COLUMNS by default
+        :param indices: row numbers in requested order, all rows by default
+        :return: generator of dictionaries
+        """
+        if columns is None:
+            columns = PLUGIN_SEVERITY_COLUMNS
+        for row in self.rows(columns, indices):
+            yield dict(zip(columns, row))
+
+    def sorted_indices(self, columns, indices=None):
+        """
+        Function returns row numbers sorted by typed values of given columns. Column name prefixed with '-'
+        means descending order, which is supported for int and float columns only. Rows with missing numeric value
+        are at the end. Sort is stable.
+        :param columns: list of column names e.g. ['Report host name', '-S', 'PID']
+        :param indices: row numbers to sort, all rows by default
+        :return: list of row numbers
+        """
+        if indices is None:
+            indices = range(self._length)
+        key_getters = [self._sort_key_getter(column) for column in columns]
+        return sorted(
+            indices,
+            key=lambda index: tuple(key_getter(index) for key_getter in key_getters),
+        )
+
+    def _sort_key_getter(self, column):
+        """
+        Function returns function which returns sort key of given column for row number.
+        :param column: column name, prefixed with '-' for descending order
+        :return: function
+        """
+        descending = column.startswith("-")
+        column = column.lstrip("-")
+        kind = COLUMNS[column]
+        if kind == "str":
+            if descending:
+                raise ValueError(
+                    f"Descending order is not supported for text column {column}"
+                )
+            codes = self._columns[column].codes
+            values = self._columns[column].values
+            return lambda index: values[codes[index]]
+
+        numbers = self._columns[column]
+        sign = -1 if descending else 1
+        if kind == "int":
+            missing = lambda number: number == _INT_MISSING
+        else:
+            missing = math.isnan
+        # rows with missing value are always at the end
+        return lambda index: (missing(numbers[index]), sign * numbers[index])
+
+    def dictionary(self, column):
+        """
+        Function returns distinct values of given dictionary encoded column, position of value is its code.
+        :param column: name of text column
+        :return: list of values, first one is None
+        """
+        return list(self._columns[column].values)
+
+    def numpy_columns(self, columns=None):
+        """
+        Function returns NumPy arrays sharing memory with columns of table, without copying data. Text columns
+        are returned as arrays of codes, see dictionary(column). Missing values are NaN in float columns and
+        -2**63 in int columns. Table can't be extended while arrays are in use.
+        :param columns: list of column names, all columns by default
+        :return: dictionary with column name and numpy.ndarray
+        """
+        # numpy is imported only here, so it's not loaded by every import of nessus_file_reader
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError(
+                "numpy is required for NumPy view of ScanTable, "
+                "install it with: pip install nessus-file-reader[numpy]"
+            ) from None
+        if columns is None:
+            columns = list(COLUMNS)
+        numpy_columns = {}
+        for column in columns:
+            kind = COLUMNS[column]
+            column_data = self._columns[column]
+            if kind == "str":
+                column_data = column_data.codes
+            if len(column_data):
+                numpy_columns[column] = numpy.frombuffer(
+                    column_data, dtype=_NUMPY_TYPES[kind]
+                )
+            else:
+                numpy_columns[column] = numpy.empty(0, dtype=_NUMPY_TYPES[kind])
+        return numpy_columns
@@ -20,13 +20,119 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import re
+import atexit
+import datetime
 import ipaddress
-from xml.etree.ElementTree import parse
+import weakref
 import os
+import bz2
+import errno
+import tarfile
+import zipfile
+import gzip
+import lzma
+import heapq
+import pickle
+import tempfile
+import threading
+import collections
+import concurrent.futures
 import requests
 from packaging import version
 from nessus_file_reader._version import __version__ as current_version
 from nessus_file_reader import __about__
+from nessus_file_reader import xml_backend
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ElementCache:
+    """
+    Cache of values computed for elements of parsed tree, e.g. root element or report host. Value is kept as long as
+    element exists. Elements parsed by xml_backend with both backends can be weakly referenced. Other elements
+    which cannot be weakly referenced, e.g. created by lxml without xml_backend, are not cached at all, because
+    keeping them in cache would keep whole parsed tree in memory after caller drops it, values for such elements are
+    computed on every call.
+    """
+
+    def __init__(self):
+        self._weak_cache = weakref.WeakKeyDictionary()
+
+    def get(self, element, default=None):
+        try:
+            return self._weak_cache.get(element, default)
+        except TypeError:
+            return default
+
+    def __contains__(self, element):
+        try:
+            return element in self._weak_cache
+        except TypeError:
+            return False
+
+    def __getitem__(self, element):
+        try:
+            return self._weak_cache[element]
+        except TypeError:
+            raise KeyError(element) from None
+
+    def __setitem__(self, element, value):
+        try:
+            self._weak_cache[element] = value
+        except TypeError:
+            pass
+
+    def clear(self):
+        self._weak_cache.clear()
+
+
+# ids of root elements whose report hosts are being yielded by nfr.file.iter_report_hosts, report hosts of such root
+# change with every yielded report host, ids are used, so root elements are not kept alive by the set
+_streamed_root_ids = set()
+
+
+def streamed_root(root):
+    """
+    Function tells if report hosts of given root element are being yielded one by one by nfr.file.iter_report_hosts,
+    so data derived from its report hosts must not be cached.
+    :param root: root element of scan file tree
+    :return: True if report hosts of root element change, otherwise False
+    """
+    return id(root) in _streamed_root_ids
+
+
+def ip_range_interval(ip_range):
+    """
+    Function takes ip range, e.g. 192.168.1.1-192.168.1.10, or network address with mask, e.g. 192.168.1.0/24,
+    and returns interval of its particular IPs as integers, without building list of them.
+    :param ip_range: ip range
+    :return: tuple (first, last) of integers, None if given value is not ip range or range is empty
+    """
+    if re.match(
+        r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}-\d{1,3}.\d{1,3}.\d{1,3}.\d{1,3}", ip_range
+    ):
+        address_part = ip_range.split("-")
+        first = int(ipaddress.IPv4Address(address_part[0]))
+        last = int(ipaddress.IPv4Address(address_part[1]))
+
+    elif re.match(r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}/\d{1,2}", ip_range):
+        ip_network = ipaddress.ip_network(ip_range)
+        first = int(ip_network.network_address)
+        last = int(ip_network.broadcast_address)
+        # network and broadcast addresses are not hosts, unless network has at most 2 addresses
+        if ip_network.num_addresses > 2:
+            first += 1
+            last -= 1
+
+    else:
+        return None
+
+    if first > last:
+        return None
+    return first, last
 
 
 def ip_range_split(ip_range):
@@ -35,27 +141,457 @@ def ip_range_split(ip_range):
     :param ip_range: ip range
     :return: list of IPs
     """
-    ip_addresses = []
-    if re.match(
-        "\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}-\d{1,3}.\d{1,3}.\d{1,3}.\d{1,3}", ip_range
+    interval = ip_range_interval(ip_range)
+    if interval is None:
+        return []
+    return list(ip_intervals_addresses([interval]))
+
+
+def ip_intervals_merge(intervals):
+    """
+    Function merges given intervals of IPs, so every IP occurs in at most one of them.
+    :param intervals: iterable of tuples (first, last) of integers
+    :return: sorted list of disjoint and not adjacent tuples (first, last)
+    """
+    merged = []
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def ip_intervals_subtract(intervals, addresses):
+    """
+    Function removes given IPs from given intervals.
+    :param intervals: sorted list of disjoint tuples (first, last) of integers, e.g. from ip_intervals_merge
+    :param addresses: iterable of IPs as integers
+    :return: sorted list of disjoint tuples (first, last)
+    """
+    remaining = []
+    addresses = iter(sorted(set(addresses)))
+    address = next(addresses, None)
+    for first, last in intervals:
+        while address is not None and address < first:
+            address = next(addresses, None)
+        while address is not None and address <= last:
+            if address > first:
+                remaining.append((first, address - 1))
+            first = address + 1
+            address = next(addresses, None)
+        if first <= last:
+            remaining.append((first, last))
+    return remaining
+
+
+def ip_intervals_size(intervals):
+    """
+    Function returns number of IPs in given intervals.
+    :param intervals: iterable of tuples (first, last) of integers
+    :return: number of IPs, IPs occurring in more than one interval are counted more than once
+    """
+    return sum(last - first + 1 for first, last in intervals)
+
+
+def ip_intervals_addresses(intervals):
+    """
+    Function yields particular IPs of given intervals one by one.
+    :param intervals: iterable of tuples (first, last) of integers
+    :return: generator of IPv4Address
+    """
+    for first, last in intervals:
+        for address in range(first, last + 1):
+            yield ipaddress.IPv4Address(address)
+
+
+def ip_address_integer(address):
+    """
+    Function returns given IPv4 address as integer, if it's written in canonical form.
+    :param address: text, e.g. name of report host
+    :return: integer or None if given text is not IPv4 address in canonical form
+    """
+    try:
+        ip_address = ipaddress.IPv4Address(address)
+    except ValueError:
+        return None
+    if str(ip_address) != address:
+        return None
+    return int(ip_address)
+
+
+_MONTHS = {
+    "Jan": 1,
+    "Feb": 2,
+    "Mar": 3,
+    "Apr": 4,
+    "May": 5,
+    "Jun": 6,
+    "Jul": 7,
+    "Aug": 8,
+    "Sep": 9,
+    "Oct": 10,
+    "Nov": 11,
+    "Dec": 12,
+}
+
+
+def host_time_parse(host_time):
+    """
+    Function converts host time used in HOST_START and HOST_END properties, e.g. 'Mon Jan 01 10:30:00 2024',
+    to datetime. Fixed format "%a %b %d %H:%M:%S %Y" is parsed without generic strptime, which is used only
+    as fallback for unexpected values.
+    :param host_time: host time from nessus file
+    :return: date and time
+    """
+    try:
+        _, month, day, hms, year = host_time.split()
+        hour, minute, second = hms.split(":")
+        return datetime.datetime(
+            int(year), _MONTHS[month], int(day), int(hour), int(minute), int(second)
+        )
+    except (ValueError, KeyError):
+        return datetime.datetime.strptime(host_time, "%a %b %d %H:%M:%S %Y")
+
+
+# magic bytes of supported compression formats
+_COMPRESSION_MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# extensions of nessus files looked for in directories and archives
+NESSUS_FILE_EXTENSIONS = (
+    ".nessus",
+    ".nessus.gz",
+    ".nessus.bz2",
+    ".nessus.xz",
+    ".nessus.zst",
+)
+
+# extensions of archives which may contain nessus files
+ARCHIVE_EXTENSIONS = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+
+# separates archive path and member name in path of nessus file inside archive, e.g. scans.zip::scan.nessus
+ARCHIVE_MEMBER_SEPARATOR = "::"
+
+
+class _NessusFile:
+    """
+    Read-only file object with content of nessus file, which closes all underlying objects, e.g. decompressor,
+    archive member and archive, when it is closed.
+    """
+
+    def __init__(self, stream, resources):
+        self._stream = stream
+        self._resources = resources
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def close(self):
+        for resource in reversed(self._resources):
+            resource.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def archive_member(file):
+    """
+    Function splits path of nessus file inside archive into archive path and member name.
+    :param file: path of nessus file e.g. scans.zip::scan.nessus
+    :return: tuple of archive path and member name or None if file is not inside archive
+    """
+    if ARCHIVE_MEMBER_SEPARATOR in file:
+        archive, member = file.split(ARCHIVE_MEMBER_SEPARATOR, 1)
+        if os.path.isfile(archive):
+            return archive, member
+    return None
+
+
+# members of tar archives found in one pass over archive, archive path: (size, mtime_ns, {member name: (TarInfo,
+# first bytes of member)}), so size and compression of members are known without decompressing archive again
+_tar_archives_members = dict()
+# tar archives kept open after their member is read, archive path: (size, mtime_ns, TarFile), so next member further
+# in compressed archive is read from current position instead of decompressing archive from its start again. Archive
+# is closed when its last nessus file is read, when other archives push it out or at exit of interpreter
+_open_tar_archives = collections.OrderedDict()
+_tar_archives_lock = threading.Lock()
+_OPEN_TAR_ARCHIVES_MAX = 4
+
+
+def _tar_archive_members(archive):
+    """
+    Function returns members of given tar archive, read in one pass over archive and kept as long as archive is not
+    modified.
+    :param archive: path to tar archive
+    :return: dictionary with member name as key and tuple of TarInfo and first 6 bytes of member as value
+    """
+    archive_stat = os.stat(archive)
+    with _tar_archives_lock:
+        archive_members = _tar_archives_members.get(archive)
+    if archive_members is not None and archive_members[:2] == (
+        archive_stat.st_size,
+        archive_stat.st_mtime_ns,
     ):
-        address_part = ip_range.split("-")
-        first_address = ipaddress.IPv4Address(address_part[0])
-        last_address = ipaddress.IPv4Address(address_part[1])
+        return archive_members[2]
+
+    members = dict()
+    with tarfile.open(archive, "r:*") as tar_archive:
+        for info in tar_archive:
+            if info.isfile():
+                # members are read in order, so magic bytes are read without going back in archive
+                with tar_archive.extractfile(info) as member_file:
+                    members[info.name] = (info, member_file.read(6))
+    with _tar_archives_lock:
+        _tar_archives_members[archive] = (
+            archive_stat.st_size,
+            archive_stat.st_mtime_ns,
+            members,
+        )
+    return members
+
+
+def _close_open_tar_archives():
+    """
+    Function closes all tar archives kept open for next members.
+    """
+    with _tar_archives_lock:
+        open_tar_archives = list(_open_tar_archives.values())
+        _open_tar_archives.clear()
+    for _, _, tar_archive in open_tar_archives:
+        tar_archive.close()
+
+
+atexit.register(_close_open_tar_archives)
+
+
+class _OpenTarArchive:
+    """
+    Tar archive which is kept open for next members when it is closed, see _open_tar_archives. Archive is closed
+    for real if there are no nessus files after read member.
+    """
+
+    def __init__(self, archive, archive_stat, tar_archive, keep_open=True):
+        self._archive = archive
+        self._key = (archive_stat.st_size, archive_stat.st_mtime_ns)
+        self.tar_archive = tar_archive
+        self._keep_open = keep_open
+
+    def close(self):
+        if not self._keep_open:
+            self.tar_archive.close()
+            return
+        with _tar_archives_lock:
+            previous = _open_tar_archives.pop(self._archive, None)
+            _open_tar_archives[self._archive] = (*self._key, self.tar_archive)
+            closed = [previous[2]] if previous is not None else []
+            while len(_open_tar_archives) > _OPEN_TAR_ARCHIVES_MAX:
+                closed.append(_open_tar_archives.popitem(last=False)[1][2])
+        for tar_archive in closed:
+            tar_archive.close()
+
+
+def _open_tar_archive(archive, keep_open=True):
+    """
+    Function returns tar archive kept open after its previous member has been read, or opens it.
+    :param archive: path to tar archive
+    :param keep_open: if False archive is closed when returned object is closed, otherwise it's kept open
+    :return: _OpenTarArchive
+    """
+    archive_stat = os.stat(archive)
+    with _tar_archives_lock:
+        open_tar_archive = _open_tar_archives.pop(archive, None)
+    if open_tar_archive is not None:
+        if open_tar_archive[:2] == (archive_stat.st_size, archive_stat.st_mtime_ns):
+            return _OpenTarArchive(
+                archive, archive_stat, open_tar_archive[2], keep_open
+            )
+        open_tar_archive[2].close()
+    return _OpenTarArchive(
+        archive, archive_stat, tarfile.open(archive, "r:*"), keep_open
+    )
+
 
-        while first_address <= last_address:
-            ip_addresses.append(first_address)
-            first_address += 1
+def nessus_archive_members(archive):
+    """
+    Function returns paths of all nessus files inside given zip or tar archive, without extracting them.
+    :param archive: path to zip or tar archive
+    :return: list of paths in form archive::member
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zip_archive:
+            members = [
+                info.filename for info in zip_archive.infolist() if not info.is_dir()
+            ]
+    else:
+        members = list(_tar_archive_members(archive))
+    return [
+        archive + ARCHIVE_MEMBER_SEPARATOR + member
+        for member in members
+        if member.endswith(NESSUS_FILE_EXTENSIONS)
+    ]
 
-    elif re.match("\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}/\d{1,2}", ip_range):
-        ip_network_hosts = ipaddress.ip_network(ip_range).hosts()
-        ip_network_hosts_list = list(ip_network_hosts)
 
-        for ip in ip_network_hosts_list:
-            # print(ip)
-            ip_addresses.append(ip)
+def _open_archive_member(archive, member):
+    """
+    Function opens member of zip or tar archive for reading, without extracting it.
+    :param archive: path to zip or tar archive
+    :param member: member name
+    :return: tuple of member file object and list of objects to close
+    """
+    if zipfile.is_zipfile(archive):
+        zip_archive = zipfile.ZipFile(archive)
+        try:
+            member_file = zip_archive.open(member)
+        except KeyError:
+            zip_archive.close()
+            raise FileNotFoundError(
+                errno.ENOENT,
+                os.strerror(errno.ENOENT),
+                archive + ARCHIVE_MEMBER_SEPARATOR + member,
+            )
+        return member_file, [zip_archive, member_file]
 
-    return ip_addresses
+    members = _tar_archive_members(archive)
+    member_info = members.get(member)
+    if member_info is not None:
+        # archive is kept open only if there are nessus files further in archive
+        last_nessus_member = next(
+            (
+                name
+                for name in reversed(members)
+                if name.endswith(NESSUS_FILE_EXTENSIONS)
+            ),
+            None,
+        )
+        open_tar_archive = _open_tar_archive(
+            archive, keep_open=member != last_nessus_member
+        )
+        member_file = open_tar_archive.tar_archive.extractfile(member_info[0])
+        return member_file, [open_tar_archive, member_file]
+    raise FileNotFoundError(
+        errno.ENOENT,
+        os.strerror(errno.ENOENT),
+        archive + ARCHIVE_MEMBER_SEPARATOR + member,
+    )
+
+
+def nessus_archive_member_size(archive, member):
+    """
+    Function returns size in bytes of given member of zip or tar archive, as stored in archive.
+    :param archive: path to zip or tar archive
+    :param member: member name
+    :return: size in bytes of archive member
+    """
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zip_archive:
+            try:
+                return zip_archive.getinfo(member).file_size
+            except KeyError:
+                pass
+    else:
+        member_info = _tar_archive_members(archive).get(member)
+        if member_info is not None:
+            return member_info[0].size
+    raise FileNotFoundError(
+        errno.ENOENT,
+        os.strerror(errno.ENOENT),
+        archive + ARCHIVE_MEMBER_SEPARATOR + member,
+    )
+
+
+def _compression_from_magic_bytes(magic_bytes):
+    for compression, compression_magic_bytes in _COMPRESSION_MAGIC_BYTES.items():
+        if magic_bytes.startswith(compression_magic_bytes):
+            return compression
+    return None
+
+
+def nessus_scan_file_compression(file):
+    """
+    Function returns compression format of given nessus file detected by magic bytes.
+    :param file: given nessus file, also inside archive e.g. scans.zip::scan.nessus.gz
+    :return: 'gzip', 'bz2', 'xz', 'zstd' or None if file is not compressed
+    """
+    member = archive_member(file)
+    if member is not None and not zipfile.is_zipfile(member[0]):
+        member_info = _tar_archive_members(member[0]).get(member[1])
+        if member_info is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
+        magic_bytes = member_info[1]
+    elif member is not None:
+        member_file, resources = _open_archive_member(*member)
+        with _NessusFile(member_file, resources) as nessus_file:
+            magic_bytes = nessus_file.read(6)
+    else:
+        with open(file, "rb") as nessus_file:
+            magic_bytes = nessus_file.read(6)
+    return _compression_from_magic_bytes(magic_bytes)
+
+
+def open_nessus_file(file):
+    """
+    Function opens given nessus file for reading in binary mode. Compressed files are decompressed on the fly
+    and files inside zip or tar archives are read directly from archive, without writing anything to disk.
+    :param file: given nessus file, plain or compressed with gzip, bz2, xz or zstd, also inside archive
+        e.g. scans.zip::scan.nessus
+    :return: file object
+    """
+    member = archive_member(file)
+    if member is None:
+        compression = nessus_scan_file_compression(file)
+        if compression is None:
+            return open(file, "rb")
+        stream = open(file, "rb")
+        resources = [stream]
+    else:
+        stream, resources = _open_archive_member(*member)
+        # archive members can't be reopened cheaply, so magic bytes are peeked from member stream
+        compression = _compression_from_magic_bytes(stream.peek(6)[:6])
+        if compression is None:
+            return _NessusFile(stream, resources)
+
+    decompressor = _decompressor(file, compression, stream)
+    return _NessusFile(decompressor, resources + [decompressor])
+
+
+def _decompressor(file, compression, stream):
+    """
+    Function returns file object decompressing given stream on the fly.
+    :param file: given nessus file, used in error messages
+    :param compression: 'gzip', 'bz2', 'xz' or 'zstd'
+    :param stream: file object with compressed content
+    :return: file object with decompressed content
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    elif compression == "bz2":
+        return bz2.BZ2File(stream, "rb")
+    elif compression == "xz":
+        return lzma.LZMAFile(stream, "rb")
+    if zstandard is None:
+        raise ImportError(
+            f"zstandard is required to read zstd compressed file {file}, "
+            f"install it with: pip install nessus-file-reader[zstd]"
+        )
+    return zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)
 
 
 def nessus_scan_file_structure(file):
@@ -65,7 +601,8 @@ def nessus_scan_file_structure(file):
 
     """
 
-    nessus_scan_file_parsed = parse(file)
+    with open_nessus_file(file) as nessus_file:
+        nessus_scan_file_parsed = xml_backend.parse(nessus_file)
     root = nessus_scan_file_parsed.getroot()
 
     root_level = len(root)
@@ -390,50 +927,213 @@ def nessus_scan_file_split(input_file_path: str, batch_size: int) -> None:
     """
     Splits a .nessus XML file into multiple files, each containing a specified number of ReportHost entries.
     Preserves the original XML formatting, including entities like &apos; and &quot;.
+    File is read in chunks and bytes are copied directly to output files without decoding, so memory usage
+    does not depend on the size of the file. Compressed files are decompressed on the fly. Parts of file inside
+    archive, e.g. scans.zip::scan.nessus, are saved next to archive.
 
     :param input_file_path: Path to the input .nessus file.
-    :param output_file_prefix: Prefix for the output files.
-    :param batch_size: Number of ReportHost entries per split file.
-    """
-    with open(input_file_path, "r", encoding="utf-8") as file:
-        xml_content = file.read()
-
-    # Extract the Policy section
-    policy_start = xml_content.find("<Policy>")
-    policy_end = xml_content.find("</Policy>") + len("</Policy>")
-    policy_element = xml_content[policy_start:policy_end]
-
-    # Extract the Report section
-    report_start = xml_content.find("<Report ")
-    report_end = xml_content.find("</Report>")
-    report_element = xml_content[report_start:report_end]
-    report_hosts = report_element.split("<ReportHost ")[1:]
-
-    # Extract the Report name
-    report_name_start = report_element.find('name="')
-    report_name_end = report_element.find('"', report_name_start + len('name="'))
-    report_name = report_element[report_name_start : report_name_end + 1]
-    report_name_line = f'<Report {report_name} xmlns:cm="http://www.nessus.org/cm">'
-
-    # Split ReportHost elements into batches
-    for i in range(0, len(report_hosts), batch_size):
-        batch = report_hosts[i : i + batch_size]
-
-        # Construct the new XML content
-        new_xml = xml_content[:report_start]
-        new_xml += report_name_line + "\n"
-        new_xml += "".join("<ReportHost " + host for host in batch)
-        new_xml += "</Report>\n</NessusClientData_v2>\n"
-
-        # Insert the Policy section
-        new_xml = new_xml[:policy_start] + policy_element + new_xml[policy_end:]
-
-        # Write the new XML content to a file
-        output_file_prefix = os.path.splitext(input_file_path)[0]
-        output_file = f"{output_file_prefix}_part{i // batch_size + 1}.nessus"
-        print(output_file)
-        with open(output_file, "w", encoding="utf-8") as out_file:
-            out_file.write(new_xml)
+    :param batch_size: Number of ReportHost entries per split file, at least 1.
+    """
+    if batch_size < 1:
+        raise ValueError(
+            f"Number of ReportHost entries per split file has to be at least 1, not {batch_size}"
+        )
+    chunk_size = 1024 * 1024
+    report_host_marker = b"<ReportHost "
+    report_end_marker = b"</Report>"
+    # bytes kept at the end of buffer, so marker split between chunks is still found
+    marker_overlap = max(len(report_host_marker), len(report_end_marker)) - 1
+
+    output_file_path = input_file_path
+    member = archive_member(input_file_path)
+    if member is not None:
+        output_file_path = os.path.join(
+            os.path.dirname(member[0]), os.path.basename(member[1])
+        )
+    for extension in NESSUS_FILE_EXTENSIONS[::-1]:
+        if output_file_path.endswith(extension):
+            output_file_prefix = output_file_path[: -len(extension)]
+            break
+    else:
+        output_file_prefix = os.path.splitext(output_file_path)[0]
+
+    with open_nessus_file(input_file_path) as xml_content:
+        buffer = b""
+        end_of_file = False
+
+        def read_more():
+            nonlocal buffer, end_of_file
+            chunk = xml_content.read(chunk_size)
+            if chunk:
+                buffer += chunk
+            else:
+                end_of_file = True
+
+        # Everything before the Report section, including the Policy section, is copied as is
+        while buffer.find(b"<Report ") == -1 and not end_of_file:
+            read_more()
+        report_start = buffer.find(b"<Report ")
+        if report_start == -1:
+            return
+        while buffer.find(b">", report_start) == -1 and not end_of_file:
+            read_more()
+        report_start_tag_end = buffer.find(b">", report_start) + 1
+        prologue = buffer[:report_start]
+
+        # Extract the Report name
+        report_name_start = buffer.find(b'name="', report_start, report_start_tag_end)
+        report_name_end = buffer.find(
+            b'"', report_name_start + len(b'name="'), report_start_tag_end
+        )
+        report_name = buffer[report_name_start : report_name_end + 1]
+        report_name_line = (
+            b"<Report " + report_name + b' xmlns:cm="http://www.nessus.org/cm">\n'
+        )
+
+        # Copy ReportHost elements, starting new file every batch_size ReportHost
+        out_file = None
+        report_hosts_number = 0
+        position = report_start_tag_end
+        # True if buffer at position starts with ReportHost which has been already counted
+        report_host_open = False
+        try:
+            while True:
+                report_host_start = buffer.find(
+                    report_host_marker,
+                    position + 1 if report_host_open else position,
+                )
+                report_end = buffer.find(
+                    report_end_marker,
+                    position,
+                    report_host_start if report_host_start != -1 else len(buffer),
+                )
+                if report_end != -1:
+                    if out_file is not None:
+                        out_file.write(buffer[position:report_end])
+                    break
+
+                if report_host_start == -1:
+                    if end_of_file:
+                        break
+                    safe_end = max(len(buffer) - marker_overlap, position)
+                    if out_file is not None:
+                        out_file.write(buffer[position:safe_end])
+                    report_host_open = report_host_open and safe_end == position
+                    buffer = buffer[safe_end:]
+                    position = 0
+                    read_more()
+                    continue
+
+                if out_file is not None:
+                    out_file.write(buffer[position:report_host_start])
+                position = report_host_start
+                report_host_open = True
+
+                if report_hosts_number % batch_size == 0:
+                    if out_file is not None:
+                        out_file.write(b"</Report>\n</NessusClientData_v2>\n")
+                        out_file.close()
+                    output_file = f"{output_file_prefix}_part{report_hosts_number // batch_size + 1}.nessus"
+                    print(output_file)
+                    out_file = open(output_file, "wb")
+                    out_file.write(prologue)
+                    out_file.write(report_name_line)
+                report_hosts_number += 1
+        finally:
+            if out_file is not None:
+                out_file.write(b"</Report>\n</NessusClientData_v2>\n")
+                out_file.close()
+
+
+def ordered_parallel_map(function, items, jobs=1):
+    """
+    Function yields results of given function called for every item, in order of items. If jobs is greater than 1
+    items are processed in pool of processes and at most twice as many items as jobs are in flight at once,
+    so results should be compact, e.g. rows of data, not elements of parsed tree. When generator is closed early,
+    items which are not started yet are not processed.
+    :param function: function to call for every item, must be picklable if jobs is greater than 1
+    :param items: iterable of items
+    :param jobs: number of processes
+    :return: results in order of items
+    """
+    if jobs is None or jobs <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        in_flight = collections.deque()
+        try:
+            for item in items:
+                in_flight.append(executor.submit(function, item))
+                if len(in_flight) >= jobs * 2:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            # if generator is closed early items which are not processed yet are dropped
+            for future in in_flight:
+                future.cancel()
+
+
+def external_sort(items, key=None, run_size=100000):
+    """
+    Function yields given items sorted by given key, keeping at most run_size items in memory. Items are sorted
+    in runs of run_size items, which are saved to temporary files and merged. Sort is stable.
+    :param items: iterable of picklable items
+    :param key: function returning sort key of item
+    :param run_size: number of items sorted in memory at once
+    :return: sorted items
+    """
+    with tempfile.TemporaryDirectory(prefix="nfr-sort-") as directory:
+        runs = []
+        run = []
+        for item in items:
+            run.append(item)
+            if len(run) >= run_size:
+                runs.append(_external_sort_run(directory, len(runs), run, key))
+                run = []
+        if not runs:
+            # everything fits in memory
+            yield from sorted(run, key=key)
+            return
+        if run:
+            runs.append(_external_sort_run(directory, len(runs), run, key))
+        # heapq.merge takes items from earlier runs first for equal keys, so sort stays stable
+        yield from heapq.merge(
+            *[_external_sort_run_items(run) for run in runs], key=key
+        )
+
+
+def _external_sort_run(directory, number, run, key):
+    """
+    Function sorts given run of items and saves it to temporary file.
+    :param directory: temporary directory
+    :param number: run number
+    :param run: list of items
+    :param key: function returning sort key of item
+    :return: path to run file
+    """
+    run_file_path = os.path.join(directory, f"run{number}.pickle")
+    run.sort(key=key)
+    with open(run_file_path, "wb") as run_file:
+        for item in run:
+            pickle.dump(item, run_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return run_file_path
+
+
+def _external_sort_run_items(run_file_path):
+    """
+    Function yields items saved in given run file.
+    :param run_file_path: path to run file
+    :return: items
+    """
+    with open(run_file_path, "rb") as run_file:
+        while True:
+            try:
+                yield pickle.load(run_file)
+            except EOFError:
+                return
 
 
 def check_for_update():
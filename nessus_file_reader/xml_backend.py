@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+nessus file reader (NFR) by LimberDuck (pronounced *ˈlɪm.bɚ dʌk*) is a python module
+created to quickly parse nessus files containing the results of scans
+performed by using Nessus by (C) Tenable, Inc.
+Copyright (C) 2019 Damian Krawczyk
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from xml.etree import ElementTree
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+if lxml_etree is not None:
+
+    class LxmlElement(lxml_etree.ElementBase):
+        """
+        Element of tree parsed with lxml. Unlike default lxml elements it can be weakly referenced, so values
+        computed for root elements and report hosts are cached by utilities.ElementCache as long as element exists,
+        like for xml.etree.ElementTree elements.
+        """
+
+    _lxml_lookup = lxml_etree.ElementDefaultClassLookup(element=LxmlElement)
+
+# 'lxml' if lxml is installed, otherwise 'etree', can be changed with NFR_XML_BACKEND environment variable
+_backend = os.environ.get("NFR_XML_BACKEND") or (
+    "lxml" if lxml_etree is not None else "etree"
+)
+
+
+def available_backends():
+    """
+    Function returns list of XML parser backends available in current environment.
+    :return: list of backend names
+    """
+    backends = ["etree"]
+    if lxml_etree is not None:
+        backends.append("lxml")
+    return backends
+
+
+def backend():
+    """
+    Function returns name of XML parser backend currently used to parse nessus files.
+    :return: 'lxml' or 'etree'
+    """
+    if _backend == "lxml" and lxml_etree is None:
+        return "etree"
+    return _backend
+
+
+def set_backend(name):
+    """
+    Function sets XML parser backend used to parse nessus files.
+    :param name:
+        'lxml' - lxml, if installed
+        'etree' - xml.etree.ElementTree from standard library
+        None - lxml if installed, otherwise xml.etree.ElementTree
+    """
+    global _backend
+    if name is None:
+        name = "lxml" if lxml_etree is not None else "etree"
+    if name not in ("lxml", "etree"):
+        raise ValueError(f"Unknown XML parser backend: {name}")
+    if name == "lxml" and lxml_etree is None:
+        raise ValueError("XML parser backend lxml is not installed")
+    _backend = name
+
+
+def _lxml_parser():
+    parser = lxml_etree.XMLParser(huge_tree=True, resolve_entities=False)
+    parser.set_element_class_lookup(_lxml_lookup)
+    return parser
+
+
+def parse(source):
+    """
+    Function parses given XML file with current backend.
+    :param source: file name or file object
+    :return: element tree
+    """
+    if backend() == "lxml":
+        return lxml_etree.parse(source, parser=_lxml_parser())
+    return ElementTree.parse(source)
+
+
+def iterparse(source, events=("end",)):
+    """
+    Function parses given XML file incrementally with current backend.
+    :param source: file name or file object
+    :param events: events to report
+    :return: iterator of (event, element) pairs
+    """
+    if backend() == "lxml":
+        events_iterator = lxml_etree.iterparse(
+            source, events=events, huge_tree=True, resolve_entities=False
+        )
+        events_iterator.set_element_class_lookup(_lxml_lookup)
+        return events_iterator
+    return ElementTree.iterparse(source, events=events)
+
+
+def fromstring(text):
+    """
+    Function parses given XML content with current backend.
+    :param text: XML content
+    :return: root element
+    """
+    if backend() == "lxml":
+        return lxml_etree.fromstring(text, parser=_lxml_parser())
+    return ElementTree.fromstring(text)
@@ -24,6 +24,12 @@ setuptools.setup(
     url="https://github.com/LimberDuck/nessus-file-reader",
     packages=setuptools.find_packages(),
     install_requires=required,
+    extras_require={
+        "lxml": ["lxml>=5.0.0"],
+        "zstd": ["zstandard>=0.22.0"],
+        "numpy": ["numpy>=1.24.0"],
+        "parquet": ["pyarrow>=14.0.0"],
+    },
     entry_points={"console_scripts": ["nfr = nessus_file_reader.__main__:main"]},
     classifiers=[
         "Programming Language :: Python :: 3.13",
@@ -0,0 +1,170 @@
+import random
+
+import pytest
+
+import nessus_file_reader as nfr
+
+PLUGIN_IDS = list(range(10000, 10060)) + [19506, 10150, 91825, 91827, 11936, 20000]
+
+
+def write_sample_nessus_file(path, number_of_hosts=8, number_of_items=15, seed=1):
+    """
+    Function writes small nessus file with Policy section, targets and report hosts with plugins used by
+    nfr.host and nfr.scan functions, e.g. 19506, 10150, 91825, 11936.
+    """
+    randomizer = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as nessus_file:
+        nessus_file.write(
+            '<?xml version="1.0" ?>\n<NessusClientData_v2>\n'
+            "<Policy><policyName>Adv &apos;scan&apos;</policyName>\n"
+            "<Preferences><ServerPreferences>\n"
+        )
+        preferences = {
+            "max_hosts": "30",
+            "max_checks": "4",
+            "checks_read_timeout": "5",
+            "reverse_lookup": "no",
+            "TARGET": "192.168.1.1-192.168.1.10,10.0.0.0/29,host.example.com,"
+            "Host.SC[10.1.1.1],192.168.1.5",
+            "plugin_set": ";".join(str(p) for p in PLUGIN_IDS if p != 91827) + ";",
+        }
+        for name, value in preferences.items():
+            nessus_file.write(
+                f"<preference><name>{name}</name><value>{value}</value></preference>\n"
+            )
+        nessus_file.write("</ServerPreferences><PluginsPreferences>\n")
+        for full_name, value in [
+            ("SSH settings[entry]:SSH user name :", "root"),
+            ("Database settings[entry]:Database SID :", "ORCL"),
+            ("Login configurations[entry]:SMB account :", "admin"),
+        ]:
+            nessus_file.write(
+                f"<item><pluginName>x</pluginName><fullName>{full_name}</fullName>"
+                f"<selectedValue>{value}</selectedValue></item>\n"
+            )
+        nessus_file.write(
+            "</PluginsPreferences></Preferences></Policy>\n"
+            '<Report name="test scan" xmlns:cm="http://www.nessus.org/cm">\n'
+        )
+        for host in range(number_of_hosts):
+            ip = f"192.168.1.{host + 1}"
+            nessus_file.write(
+                f'<ReportHost name="{ip}"><HostProperties>\n'
+                f'<tag name="HOST_END">Mon Jan 0{1 + host % 5} 1{host % 10}:30:00 2024</tag>\n'
+                f'<tag name="host-ip">{ip}</tag><tag name="hostname">Host{host}.example.com</tag>'
+                f'<tag name="host-fqdn">host{host}.example.com</tag>\n'
+                '<tag name="operating-system">["Linux Kernel 5"]</tag><tag name="login-used">root</tag>\n'
+                f'<tag name="HOST_START">Mon Jan 0{1 + host % 5} 0{host % 10}:15:0{host % 10} 2024</tag>\n'
+                "</HostProperties>\n"
+            )
+            for item in range(number_of_items):
+                plugin_id = randomizer.choice(PLUGIN_IDS[:60])
+                severity = randomizer.choice([0, 0, 1, 2, 3, 4])
+                risk_factor = ["None", "Low", "Medium", "High", "Critical"][severity]
+                nessus_file.write(
+                    f'<ReportItem port="{randomizer.choice([0, 22, 443])}" svc_name="x" protocol="tcp" '
+                    f'severity="{severity}" pluginID="{plugin_id}" pluginName="Plugin &amp; {plugin_id}" '
+                    f'pluginFamily="General">\n<risk_factor>{risk_factor}</risk_factor>'
+                )
+                if severity:
+                    nessus_file.write(
+                        f"<cvss_base_score>{severity * 2}.5</cvss_base_score>"
+                        f"<cvss3_base_score>{severity * 2}.1</cvss3_base_score>"
+                        f"<vpr_score>{severity}.7</vpr_score><epss_score>0.0{severity}</epss_score>"
+                        f"<cve>CVE-2020-{plugin_id}</cve><cve>CVE-2021-{plugin_id}</cve>"
+                    )
+                if item % 7 == 0:
+                    nessus_file.write(
+                        f"<plugin_output>out &quot;{item}&quot;</plugin_output>"
+                    )
+                if item % 11 == 0:
+                    nessus_file.write(
+                        "<compliance>true</compliance><cm:compliance-result>PASSED</cm:compliance-result>"
+                    )
+                nessus_file.write("</ReportItem>\n")
+            # the same score written differently in different hosts
+            score = "7" if host % 2 else "7.0"
+            nessus_file.write(
+                '<ReportItem port="80" svc_name="www" protocol="tcp" severity="3" pluginID="20000" '
+                'pluginName="Web" pluginFamily="General"><risk_factor>High</risk_factor>'
+                f"<cvss3_base_score>{score}</cvss3_base_score></ReportItem>\n"
+            )
+            credentialed = "yes" if host % 2 else "no"
+            nessus_file.write(
+                '<ReportItem port="0" svc_name="general" protocol="tcp" severity="0" pluginID="19506" '
+                'pluginName="Nessus Scan Information" pluginFamily="Settings"><risk_factor>None</risk_factor>'
+                "<plugin_output>Information about this scan : \n\nNessus version : 10.0\n"
+                f"Scanner IP : 10.9.9.{host}\nCredentialed checks : {credentialed}\n"
+                "Plugin feed version : 2024\nScan Start Date : 2024/1/1 0:00 UTC\n"
+                "</plugin_output></ReportItem>\n"
+            )
+            if host % 3 == 0:
+                nessus_file.write(
+                    '<ReportItem port="137" svc_name="netbios-ns" protocol="udp" severity="0" pluginID="10150" '
+                    'pluginName="Windows NetBIOS" pluginFamily="Windows"><risk_factor>None</risk_factor>'
+                    "<plugin_output>The following 2 NetBIOS names have been gathered :\n\n"
+                    f"  HOST{host}          = Computer name\n  WORKGROUP        = Workgroup / Domain name\n"
+                    "</plugin_output></ReportItem>\n"
+                )
+            if host % 4 == 0:
+                nessus_file.write(
+                    '<ReportItem port="1521" svc_name="oracle" protocol="tcp" severity="0" pluginID="91825" '
+                    'pluginName="Oracle DB Login Possible" pluginFamily="Databases">'
+                    "<risk_factor>None</risk_factor><plugin_output>Credentialed checks have been enabled "
+                    "for Oracle RDBMS server running on port 1521.</plugin_output></ReportItem>\n"
+                )
+            if host % 2 == 0:
+                nessus_file.write(
+                    '<ReportItem port="0" svc_name="general" protocol="tcp" severity="0" pluginID="11936" '
+                    'pluginName="OS Identification" pluginFamily="General"><risk_factor>None</risk_factor>'
+                    "<plugin_output>\nRemote operating system : Linux Kernel 5\nConfidence level : 95\n"
+                    "Method : SSH\n</plugin_output></ReportItem>\n"
+                )
+            nessus_file.write("</ReportHost>\n")
+        nessus_file.write("</Report>\n</NessusClientData_v2>\n")
+    return path
+
+
+@pytest.fixture(scope="session")
+def sample_nessus_file(tmp_path_factory):
+    return str(
+        write_sample_nessus_file(tmp_path_factory.mktemp("sample") / "sample.nessus")
+    )
+
+
+def _set_backend(name):
+    if name == "lxml":
+        pytest.importorskip("lxml")
+    previous_backend = nfr.xml_backend.backend()
+    nfr.xml_backend.set_backend(name)
+    return previous_backend
+
+
+@pytest.fixture(params=["etree", "lxml"])
+def xml_backend(request):
+    """
+    Fixture runs the test with every XML parser backend and restores previous one afterwards.
+    """
+    previous_backend = _set_backend(request.param)
+    yield request.param
+    nfr.xml_backend.set_backend(previous_backend)
+
+
+@pytest.fixture
+def etree_backend():
+    """
+    Fixture sets xml.etree.ElementTree backend for the test and restores previous one afterwards.
+    """
+    previous_backend = _set_backend("etree")
+    yield "etree"
+    nfr.xml_backend.set_backend(previous_backend)
+
+
+@pytest.fixture
+def lxml_backend():
+    """
+    Fixture sets lxml backend for the test, if lxml is installed, and restores previous one afterwards.
+    """
+    previous_backend = _set_backend("lxml")
+    yield "lxml"
+    nfr.xml_backend.set_backend(previous_backend)
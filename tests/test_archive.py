@@ -0,0 +1,157 @@
+import gzip
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import nessus_file_reader as nfr
+from nessus_file_reader import utilities
+
+MEMBERS = ["scan.nessus", "scans/second.nessus.gz", "notes.txt"]
+
+
+def _write_members(directory, sample_nessus_file):
+    with open(sample_nessus_file, "rb") as nessus_file:
+        content = nessus_file.read()
+    paths = {}
+    for member, member_content in zip(
+        MEMBERS, [content, gzip.compress(content), b"notes"]
+    ):
+        path = directory / member.replace("/", "_")
+        path.write_bytes(member_content)
+        paths[member] = path
+    return content, paths
+
+
+@pytest.fixture(params=["zip", "tar", "tar.gz", "tar.xz"])
+def archive(request, tmp_path, sample_nessus_file):
+    content, paths = _write_members(tmp_path, sample_nessus_file)
+    archive_path = tmp_path / f"scans.{request.param}"
+    if request.param == "zip":
+        with zipfile.ZipFile(archive_path, "w") as zip_archive:
+            for member, path in paths.items():
+                zip_archive.write(path, member)
+    else:
+        mode = "w" if request.param == "tar" else "w:" + request.param[4:]
+        with tarfile.open(archive_path, mode) as tar_archive:
+            for member, path in paths.items():
+                tar_archive.add(path, member)
+    return str(archive_path), content
+
+
+def test_archive_members(archive):
+    archive_path, _ = archive
+    assert utilities.nessus_archive_members(archive_path) == [
+        archive_path + "::scan.nessus",
+        archive_path + "::scans/second.nessus.gz",
+    ]
+
+
+def test_archive_members_are_read_like_plain_file(archive, sample_nessus_file):
+    archive_path, content = archive
+    plain_root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    members = utilities.nessus_archive_members(archive_path)
+    # backwards as well, so archive kept open has to go back to the start
+    for nessus_scan_file in members + members[::-1]:
+        with utilities.open_nessus_file(nessus_scan_file) as nessus_file:
+            assert nessus_file.read() == content
+        root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+        assert nfr.scan.list_of_scanned_hosts(root) == (
+            nfr.scan.list_of_scanned_hosts(plain_root)
+        )
+        assert nfr.file.nessus_scan_file_size_uncompressed(nessus_scan_file) == len(
+            content
+        )
+
+    assert nfr.file.nessus_scan_file_compression(members[0]) is None
+    assert nfr.file.nessus_scan_file_compression(members[1]) == "gzip"
+    assert nfr.file.nessus_scan_file_size(members[0]) == len(content)
+    assert nfr.file.nessus_scan_file_size(members[1]) == len(gzip.compress(content))
+
+
+def test_missing_archive_member(archive):
+    archive_path, _ = archive
+    with pytest.raises(FileNotFoundError):
+        utilities.open_nessus_file(archive_path + "::missing.nessus")
+    with pytest.raises(FileNotFoundError):
+        nfr.file.nessus_scan_file_size(archive_path + "::missing.nessus")
+
+
+def test_compressed_tar_archive_is_read_once(tmp_path, sample_nessus_file, monkeypatch):
+    content, paths = _write_members(tmp_path, sample_nessus_file)
+    archive_path = str(tmp_path / "scans.tar.gz")
+    with tarfile.open(archive_path, "w:gz") as tar_archive:
+        for number in range(5):
+            tar_archive.add(paths["scan.nessus"], f"scan{number}.nessus")
+
+    tar_open = tarfile.open
+    opened = []
+
+    def counting_tar_open(*args, **kwargs):
+        opened.append(args)
+        return tar_open(*args, **kwargs)
+
+    monkeypatch.setattr(tarfile, "open", counting_tar_open)
+    for nessus_scan_file in utilities.nessus_archive_members(archive_path):
+        nfr.file.nessus_scan_file_size(nessus_scan_file)
+        nfr.file.nessus_scan_file_compression(nessus_scan_file)
+        with utilities.open_nessus_file(nessus_scan_file) as nessus_file:
+            assert nessus_file.read() == content
+    # one pass to list members and one to read them
+    assert len(opened) == 2
+
+
+def test_modified_tar_archive_is_listed_again(tmp_path, sample_nessus_file):
+    _, paths = _write_members(tmp_path, sample_nessus_file)
+    archive_path = str(tmp_path / "scans.tar")
+    with tarfile.open(archive_path, "w") as tar_archive:
+        tar_archive.add(paths["scan.nessus"], "scan.nessus")
+    assert len(utilities.nessus_archive_members(archive_path)) == 1
+
+    with tarfile.open(archive_path, "w") as tar_archive:
+        tar_archive.add(paths["scan.nessus"], "scan.nessus")
+        tar_archive.add(paths["scan.nessus"], "other.nessus")
+    os.utime(archive_path, ns=(0, 0))
+    assert len(utilities.nessus_archive_members(archive_path)) == 2
+    root = nfr.file.nessus_scan_file_root_element(archive_path + "::other.nessus")
+    assert nfr.scan.number_of_scanned_hosts(root) == 8
+
+
+def test_archives_are_expanded_by_cli(tmp_path, sample_nessus_file):
+    from nessus_file_reader.__main__ import list_of_source_files
+
+    _, paths = _write_members(tmp_path, sample_nessus_file)
+    (tmp_path / "scans").mkdir()
+    archive_path = str(tmp_path / "scans" / "scans.zip")
+    with zipfile.ZipFile(archive_path, "w") as zip_archive:
+        zip_archive.write(paths["scan.nessus"], "scan.nessus")
+    assert list_of_source_files(str(tmp_path / "scans")) == [
+        archive_path + "::scan.nessus"
+    ]
+    assert list_of_source_files(archive_path) == [archive_path + "::scan.nessus"]
+
+
+def test_tar_archive_is_closed_after_last_nessus_file(tmp_path, sample_nessus_file):
+    _, paths = _write_members(tmp_path, sample_nessus_file)
+    archive_path = str(tmp_path / "scans.tar.gz")
+    with tarfile.open(archive_path, "w:gz") as tar_archive:
+        for member, path in paths.items():
+            tar_archive.add(path, member)
+
+    members = utilities.nessus_archive_members(archive_path)
+    with utilities.open_nessus_file(members[0]) as nessus_file:
+        nessus_file.read()
+    # archive is kept open for next nessus file
+    assert archive_path in utilities._open_tar_archives
+    with utilities.open_nessus_file(members[1]) as nessus_file:
+        nessus_file.read()
+    assert archive_path not in utilities._open_tar_archives
+
+    with utilities.open_nessus_file(members[0]) as nessus_file:
+        nessus_file.read()
+    _, _, tar_archive = utilities._open_tar_archives[archive_path]
+    # archives still open are closed at exit
+    utilities._close_open_tar_archives()
+    assert archive_path not in utilities._open_tar_archives
+    assert tar_archive.closed
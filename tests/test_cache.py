@@ -0,0 +1,204 @@
+import os
+
+import pytest
+
+import nessus_file_reader as nfr
+from conftest import write_sample_nessus_file
+
+SCAN_FUNCTIONS = [
+    "report_name",
+    "policy_name",
+    "scan_file_source",
+    "plugin_set_number",
+    "policy_db_sid",
+    "list_of_scanned_hosts",
+    "list_of_not_scanned_hosts",
+    "number_of_target_hosts",
+    "number_of_scanned_hosts_with_credentialed_checks_yes",
+    "number_of_scanned_dbs_with_credentialed_checks_yes",
+    "scan_time_start",
+    "scan_time_end",
+    "scan_time_elapsed",
+]
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("NFR_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def _entries(cache_directory):
+    return sorted(os.listdir(cache_directory / "entries"))
+
+
+def _scan_values(root):
+    values = {name: getattr(nfr.scan, name)(root) for name in SCAN_FUNCTIONS}
+    for report_host in nfr.scan.report_hosts(root):
+        report_host_name = nfr.host.report_host_name(report_host)
+        values[report_host_name] = {
+            "scanner_ip": nfr.host.scanner_ip(root, report_host),
+            "credentialed_checks": nfr.host.credentialed_checks(root, report_host),
+            "netbios_network_name": nfr.host.netbios_network_name(root, report_host),
+            "records": [
+                nfr.plugin.plugin_output_record(root, report_host, plugin_id)
+                for plugin_id in sorted(nfr.plugin.PLUGIN_OUTPUT_PARSERS)
+            ],
+            "report_items": [
+                nfr.table.plugin_severity_record("", report_host_name, report_item)
+                for report_item in nfr.host.report_items(report_host)
+            ],
+        }
+    return values
+
+
+def test_cached_root_element_parity(sample_nessus_file, cache_directory):
+    expected = _scan_values(nfr.file.nessus_scan_file_root_element(sample_nessus_file))
+    assert _scan_values(nfr.cache.cached_root_element(sample_nessus_file)) == expected
+    assert len(_entries(cache_directory)) == 1
+    # second call reads compact copy from cache
+    assert _scan_values(nfr.cache.cached_root_element(sample_nessus_file)) == expected
+    assert nfr.cache.cache_stats()["entries"] == 1
+
+
+def test_entry_of_other_format_version_is_not_used(
+    sample_nessus_file, cache_directory, monkeypatch
+):
+    with monkeypatch.context() as context:
+        context.setattr(
+            nfr.cache, "CACHE_FORMAT_VERSION", nfr.cache.CACHE_FORMAT_VERSION - 1
+        )
+        nfr.cache.cached_root_element(sample_nessus_file)
+    (old_entry,) = _entries(cache_directory)
+    with open(cache_directory / "entries" / old_entry, "w") as entry_file:
+        entry_file.write("<NessusClientData_v2><Report /></NessusClientData_v2>")
+
+    root = nfr.cache.cached_root_element(sample_nessus_file)
+    assert nfr.scan.number_of_scanned_hosts(root) == 8
+    assert len(_entries(cache_directory)) == 2
+
+
+def test_entry_is_not_used_when_plugin_output_parser_is_registered(
+    sample_nessus_file, cache_directory, monkeypatch
+):
+    nfr.cache.cached_root_element(sample_nessus_file)
+    monkeypatch.setitem(nfr.plugin.PLUGIN_OUTPUT_PARSERS, "10000", lambda *_: {})
+    root = nfr.cache.cached_root_element(sample_nessus_file)
+    assert len(_entries(cache_directory)) == 2
+    uncached_root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    assert [
+        nfr.plugin.plugin_output(root, report_host, "10000")
+        for report_host in nfr.scan.report_hosts(root)
+    ] == [
+        nfr.plugin.plugin_output(uncached_root, report_host, "10000")
+        for report_host in nfr.scan.report_hosts(uncached_root)
+    ]
+
+
+def test_not_cached_file_is_read_once(sample_nessus_file, cache_directory, monkeypatch):
+    opened_files = []
+    open_nessus_file = nfr.utilities.open_nessus_file
+
+    def counting_open_nessus_file(file):
+        opened_files.append(file)
+        return open_nessus_file(file)
+
+    monkeypatch.setattr(nfr.utilities, "open_nessus_file", counting_open_nessus_file)
+    root = nfr.cache.cached_root_element(sample_nessus_file)
+    assert nfr.scan.number_of_scanned_hosts(root) == 8
+    assert opened_files == [sample_nessus_file]
+    # path record matches, entry is read without reading nessus file
+    nfr.cache.cached_root_element(sample_nessus_file)
+    assert opened_files == [sample_nessus_file]
+
+
+def test_path_records_are_evicted_with_entries(tmp_path, cache_directory):
+    nessus_files = []
+    for seed in range(3):
+        nessus_file = tmp_path / f"scan_{seed}.nessus"
+        write_sample_nessus_file(nessus_file, seed=seed)
+        nessus_files.append(str(nessus_file))
+    nfr.cache.cached_root_element(nessus_files[0])
+    max_size = nfr.cache.cache_stats()["size"] * 3 // 2
+    for nessus_file in nessus_files[1:]:
+        nfr.cache.cached_root_element(nessus_file, max_size=max_size)
+    # only last entry fits in cache
+    stats = nfr.cache.cache_stats()
+    assert stats["entries"] == 1
+    assert stats["paths"] == 1
+
+
+@pytest.fixture
+def root_elements():
+    nfr.cache.root_elements_clear()
+    yield
+    nfr.cache.set_root_elements_max_size(nfr.cache.ROOT_ELEMENTS_MAX_SIZE)
+    nfr.cache.root_elements_clear()
+
+
+def test_load_root_element_hit_and_miss(sample_nessus_file, root_elements):
+    root = nfr.cache.load_root_element(sample_nessus_file)
+    assert nfr.cache.load_root_element(sample_nessus_file) is root
+    stats = nfr.cache.root_elements_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["size"] == nfr.cache.root_element_size_estimate(root)
+    assert _scan_values(root) == _scan_values(
+        nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    )
+
+
+def test_load_root_element_of_modified_file(
+    tmp_path, sample_nessus_file, root_elements
+):
+    file = tmp_path / "scan.nessus"
+    file.write_bytes(open(sample_nessus_file, "rb").read())
+    root = nfr.cache.load_root_element(str(file))
+    content = file.read_bytes().replace(b'<Report name="', b'<Report name="changed ', 1)
+    file.write_bytes(content)
+    os.utime(file, ns=(0, 0))
+    modified_root = nfr.cache.load_root_element(str(file))
+    assert modified_root is not root
+    assert nfr.scan.report_name(modified_root).startswith("changed ")
+    stats = nfr.cache.root_elements_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (0, 2, 1)
+    assert stats["size"] == nfr.cache.root_element_size_estimate(modified_root)
+
+
+def test_load_root_element_eviction(tmp_path, sample_nessus_file, root_elements):
+    files = []
+    for name in ("a.nessus", "b.nessus"):
+        file = tmp_path / name
+        file.write_bytes(open(sample_nessus_file, "rb").read())
+        files.append(str(file))
+    root_size = nfr.cache.root_element_size_estimate(
+        nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    )
+    nfr.cache.set_root_elements_max_size(root_size)
+    first_root = nfr.cache.load_root_element(files[0])
+    nfr.cache.load_root_element(files[1])
+    stats = nfr.cache.root_elements_stats()
+    assert (stats["entries"], stats["evictions"]) == (1, 1)
+    assert stats["max_size"] == root_size
+    # least recently used root element has been evicted
+    assert nfr.cache.load_root_element(files[0]) is not first_root
+
+    nfr.cache.set_root_elements_max_size(0)
+    stats = nfr.cache.root_elements_stats()
+    assert (stats["entries"], stats["size"]) == (0, 0)
+    nfr.cache.load_root_element(files[0])
+    assert nfr.cache.root_elements_stats()["entries"] == 0
+
+
+def test_root_elements_clear(sample_nessus_file, root_elements):
+    nfr.cache.load_root_element(sample_nessus_file)
+    nfr.cache.load_root_element(sample_nessus_file)
+    nfr.cache.root_elements_clear()
+    stats = nfr.cache.root_elements_stats()
+    assert stats == {
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "size": 0,
+        "entries": 0,
+        "max_size": nfr.cache.ROOT_ELEMENTS_MAX_SIZE,
+    }
@@ -0,0 +1,343 @@
+import csv
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+
+import jmespath
+import pytest
+
+import nessus_file_reader as nfr
+from nessus_file_reader._version import __version__
+from conftest import write_sample_nessus_file
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_nfr(*arguments):
+    """
+    Function runs nfr CLI the same way as nfr console script does and returns its standard output without nfr banner.
+    """
+    output, _ = run_nfr_with_banner(*arguments)
+    if output.startswith("nessus file reader (NFR)"):
+        output = output.split("\n", 1)[1]
+    return output
+
+
+def run_nfr_with_banner(*arguments):
+    """
+    Function runs nfr CLI the same way as nfr console script does and returns its standard output and standard error.
+    """
+    environment = dict(os.environ, PYTHONPATH=PACKAGE_DIRECTORY)
+    completed = subprocess.run(
+        [sys.executable, "-m", "nessus_file_reader", *arguments],
+        capture_output=True,
+        text=True,
+        env=environment,
+        check=True,
+    )
+    return completed.stdout, completed.stderr
+
+
+@pytest.mark.parametrize(
+    "arguments, banner_in_stderr",
+    [
+        (["scan", "--plugin-severity"], False),
+        (["scan", "--plugin-severity", "--output", "csv"], True),
+        (["scan", "--plugin-severity", "--output=jsonl"], True),
+        (["scan", "--plugin-severity", "--output", "table"], False),
+        (["scan", "--scan-summary"], False),
+    ],
+)
+def test_banner_goes_to_standard_error_for_data_output(
+    sample_nessus_file, arguments, banner_in_stderr
+):
+    output, errors = run_nfr_with_banner(*arguments, sample_nessus_file)
+    banner = f"nessus file reader (NFR) by LimberDuck {__version__}\n"
+    if banner_in_stderr:
+        assert errors.startswith(banner)
+        assert banner not in output
+    else:
+        assert output.startswith(banner)
+        assert banner not in errors
+
+
+def test_banner_goes_to_standard_error_for_output_file(sample_nessus_file, tmp_path):
+    output_file = tmp_path / "rows.csv"
+    output, errors = run_nfr_with_banner(
+        "scan",
+        "--plugin-severity",
+        "--output",
+        "csv",
+        "--output-file",
+        str(output_file),
+        sample_nessus_file,
+    )
+    assert output == ""
+    assert errors.startswith("nessus file reader (NFR)")
+    assert output_file.read_text(encoding="utf-8").startswith("File name,")
+
+
+def test_jsonl_output_contains_only_rows(sample_nessus_file):
+    output = run_nfr(
+        "scan", "--plugin-severity", "--output", "jsonl", sample_nessus_file
+    )
+    records = [json.loads(line) for line in output.splitlines()]
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    assert len(records) == sum(
+        len(nfr.host.report_items(report_host))
+        for report_host in nfr.scan.report_hosts(root)
+    )
+
+
+def test_csv_output_contains_only_rows(sample_nessus_file):
+    output = run_nfr("scan", "--plugin-severity", "--output", "csv", sample_nessus_file)
+    rows = list(csv.DictReader(io.StringIO(output)))
+    assert list(rows[0]) == nfr.table.PLUGIN_SEVERITY_COLUMNS
+    assert {row["File name"] for row in rows} == {sample_nessus_file}
+
+
+def _host_tables(nessus_scan_file):
+    for report_host in nfr.file.iter_report_hosts(nessus_scan_file):
+        scan_table = nfr.table.ScanTable()
+        report_host_name = nfr.host.report_host_name(report_host)
+        for report_item in nfr.host.report_items(report_host):
+            scan_table.append_report_item(
+                nessus_scan_file, report_host_name, report_item
+            )
+        yield scan_table
+
+
+@pytest.mark.parametrize(
+    "filter_expression",
+    [
+        "[?S=='4']",
+        "[?PID=='20000'].{h:\"Report host name\",v:CVSSv3}",
+        "sort_by(@, &PID)[:10]",
+        "length(@)",
+        "[?S=='4'] | [0]",
+        "[?S=='0'][:3]",
+    ],
+)
+def test_plugin_severity_records_filter_parity(sample_nessus_file, filter_expression):
+    from nessus_file_reader.__main__ import plugin_severity_records
+
+    all_records = [
+        record
+        for scan_table in _host_tables(sample_nessus_file)
+        for record in scan_table.records()
+    ]
+    expected = jmespath.search(filter_expression, all_records)
+    if not isinstance(expected, list):
+        expected = [expected]
+    assert (
+        list(
+            plugin_severity_records(_host_tables(sample_nessus_file), filter_expression)
+        )
+        == expected
+    )
+
+
+def test_jsonl_output_with_whole_list_filter(sample_nessus_file):
+    output = run_nfr(
+        "scan",
+        "--plugin-severity",
+        "--output",
+        "jsonl",
+        "--filter",
+        "sort_by(@, &PID)[-3:]",
+        sample_nessus_file,
+    )
+    all_records = [
+        record
+        for scan_table in _host_tables(sample_nessus_file)
+        for record in scan_table.records()
+    ]
+    assert [json.loads(line) for line in output.splitlines()] == jmespath.search(
+        "sort_by(@, &PID)[-3:]", all_records
+    )
+
+
+def test_jobs_output_is_the_same(tmp_path):
+    for number in range(3):
+        write_sample_nessus_file(
+            tmp_path / f"scan{number}.nessus", number_of_hosts=4 + number, seed=number
+        )
+    arguments = ["scan", "--scan-summary", "--plugin-severity", str(tmp_path)]
+    output = run_nfr(*arguments)
+    assert "scan2.nessus" in output
+    assert run_nfr(*arguments, "--jobs", "3") == output
+
+
+def test_parallel_hosts_output_is_the_same(sample_nessus_file):
+    arguments = ["scan", "--scan-summary", "--plugin-severity", sample_nessus_file]
+    assert run_nfr(*arguments, "--parallel-hosts", "--jobs", "2") == run_nfr(*arguments)
+
+
+def test_file_index(tmp_path):
+    nessus_scan_file = str(write_sample_nessus_file(tmp_path / "sample.nessus"))
+    output = run_nfr("file", "--index", nessus_scan_file)
+    assert output.split() == [nessus_scan_file + ".nfrindex", "8"]
+    assert nfr.file.load_host(nessus_scan_file, "192.168.1.8").get("name") == (
+        "192.168.1.8"
+    )
+
+
+def test_directory_with_compressed_files(tmp_path, sample_nessus_file):
+    from nessus_file_reader.__main__ import list_of_source_files
+
+    with open(sample_nessus_file, "rb") as nessus_file:
+        content = nessus_file.read()
+    (tmp_path / "scans").mkdir()
+    (tmp_path / "scans" / "plain.nessus").write_bytes(content)
+    (tmp_path / "scans" / "compressed.nessus.gz").write_bytes(gzip.compress(content))
+    (tmp_path / "scans" / "notes.txt").write_bytes(b"notes")
+    assert sorted(list_of_source_files(str(tmp_path))) == [
+        str(tmp_path / "scans" / "compressed.nessus.gz"),
+        str(tmp_path / "scans" / "plain.nessus"),
+    ]
+    output = run_nfr("file", "--size", str(tmp_path / "scans" / "compressed.nessus.gz"))
+    assert "uncompressed" in output
+
+
+def _all_records(nessus_scan_file):
+    return [
+        record
+        for scan_table in _host_tables(nessus_scan_file)
+        for record in scan_table.records()
+    ]
+
+
+@pytest.mark.parametrize("column", ["S", "CVSSv3", "VPR", "EPSS"])
+def test_plugin_severity_top_is_the_same_as_sorted(sample_nessus_file, column):
+    from nessus_file_reader.__main__ import (
+        plugin_severity_top,
+        plugin_severity_value_key,
+    )
+
+    records = _all_records(sample_nessus_file)
+    expected = sorted(records, key=plugin_severity_value_key(column), reverse=True)[:7]
+    assert plugin_severity_top(iter(records), 7, column) == expected
+    assert plugin_severity_top(iter(records), len(records) + 1, column) == sorted(
+        records, key=plugin_severity_value_key(column), reverse=True
+    )
+
+
+def test_plugin_severity_limit_closes_records():
+    from nessus_file_reader.__main__ import plugin_severity_limit
+
+    read = []
+    closed = []
+
+    def records():
+        try:
+            for number in range(100):
+                read.append(number)
+                yield {"PID": str(number)}
+        finally:
+            closed.append(True)
+
+    assert list(plugin_severity_limit(records(), 3)) == [
+        {"PID": "0"},
+        {"PID": "1"},
+        {"PID": "2"},
+    ]
+    assert read == [0, 1, 2]
+    assert closed == [True]
+
+
+def test_jsonl_output_with_top(sample_nessus_file):
+    from nessus_file_reader.__main__ import plugin_severity_value_key
+
+    output = run_nfr(
+        "scan",
+        "--plugin-severity",
+        "--output",
+        "jsonl",
+        "--top",
+        "5",
+        "--by",
+        "CVSSv3",
+        sample_nessus_file,
+    )
+    assert [json.loads(line) for line in output.splitlines()] == sorted(
+        _all_records(sample_nessus_file),
+        key=plugin_severity_value_key("CVSSv3"),
+        reverse=True,
+    )[:5]
+
+
+def test_jsonl_output_with_limit(sample_nessus_file):
+    output = run_nfr(
+        "scan",
+        "--plugin-severity",
+        "--output",
+        "jsonl",
+        "--limit",
+        "4",
+        "--filter",
+        "[?S!='0']",
+        sample_nessus_file,
+    )
+    assert [json.loads(line) for line in output.splitlines()] == [
+        record for record in _all_records(sample_nessus_file) if record["S"] != "0"
+    ][:4]
+
+
+def test_top_and_limit_together_are_refused(sample_nessus_file):
+    with pytest.raises(subprocess.CalledProcessError):
+        run_nfr(
+            "scan",
+            "--plugin-severity",
+            "--top",
+            "1",
+            "--limit",
+            "1",
+            sample_nessus_file,
+        )
+
+
+def test_table_output_with_projection(sample_nessus_file):
+    # projected rows without sort columns are printed in order of report items
+    records = [
+        record for record in _all_records(sample_nessus_file) if record["S"] == "4"
+    ]
+    output = run_nfr(
+        "scan", "--plugin-severity", "--filter", "[?S=='4'].PID", sample_nessus_file
+    )
+    assert output.split() == [record["PID"] for record in records]
+
+    output = run_nfr(
+        "scan",
+        "--plugin-severity",
+        "--filter",
+        "[?S=='4'].{p:PID,e:EPSS}",
+        sample_nessus_file,
+    )
+    lines = output.splitlines()
+    assert lines[0].split() == ["p", "e"]
+    assert [line.split()[0] for line in lines[2:]] == [
+        record["PID"] for record in records
+    ]
+
+
+def test_table_output_without_matching_rows(sample_nessus_file):
+    for arguments in [[], ["--limit", "3"]]:
+        output = run_nfr(
+            "scan",
+            "--plugin-severity",
+            "--filter",
+            "[?S=='9'].PID",
+            *arguments,
+            sample_nessus_file,
+        )
+        assert output.splitlines() == ["No results"]
+
+
+def test_file_split_needs_at_least_one_report_host(tmp_path):
+    nessus_scan_file = str(write_sample_nessus_file(tmp_path / "sample.nessus"))
+    with pytest.raises(subprocess.CalledProcessError):
+        run_nfr("file", "--split", "0", nessus_scan_file)
+    assert os.listdir(tmp_path) == ["sample.nessus"]
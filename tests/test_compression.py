@@ -0,0 +1,75 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+import nessus_file_reader as nfr
+from nessus_file_reader import utilities
+
+
+def _zstd_compress(content):
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(content)
+
+
+COMPRESSIONS = {
+    "gzip": (".gz", gzip.compress),
+    "bz2": (".bz2", bz2.compress),
+    "xz": (".xz", lzma.compress),
+    "zstd": (".zst", _zstd_compress),
+}
+
+
+@pytest.fixture
+def sample_content(sample_nessus_file):
+    with open(sample_nessus_file, "rb") as nessus_file:
+        return nessus_file.read()
+
+
+@pytest.mark.parametrize("compression", sorted(COMPRESSIONS))
+def test_compressed_file_is_read_like_plain_file(
+    tmp_path, sample_nessus_file, sample_content, compression
+):
+    extension, compress = COMPRESSIONS[compression]
+    compressed_content = compress(sample_content)
+    # compression is detected by magic bytes, not by extension
+    for name in ["sample.nessus" + extension, "sample.nessus"]:
+        nessus_scan_file = str(tmp_path / name)
+        with open(nessus_scan_file, "wb") as compressed_file:
+            compressed_file.write(compressed_content)
+
+        assert nfr.file.nessus_scan_file_compression(nessus_scan_file) == compression
+        with utilities.open_nessus_file(nessus_scan_file) as nessus_file:
+            assert nessus_file.read() == sample_content
+        assert nfr.file.nessus_scan_file_size(nessus_scan_file) == len(
+            compressed_content
+        )
+        assert nfr.file.nessus_scan_file_size_uncompressed(nessus_scan_file) == len(
+            sample_content
+        )
+        root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+        assert nfr.scan.list_of_scanned_hosts(root) == [
+            f"192.168.1.{host}" for host in range(1, 9)
+        ]
+        assert [
+            report_host.get("name")
+            for report_host in nfr.file.iter_report_hosts(nessus_scan_file)
+        ] == nfr.scan.list_of_scanned_hosts(root)
+        policy_root = nfr.file.nessus_scan_file_policy_root_element(nessus_scan_file)
+        assert nfr.scan.policy_name(policy_root) == "Adv 'scan'"
+
+
+def test_plain_file_is_not_compressed(sample_nessus_file, sample_content):
+    assert nfr.file.nessus_scan_file_compression(sample_nessus_file) is None
+    assert nfr.file.nessus_scan_file_size_uncompressed(sample_nessus_file) == len(
+        sample_content
+    )
+
+
+def test_zstd_without_zstandard_names_extra(tmp_path, sample_content, monkeypatch):
+    nessus_scan_file = tmp_path / "sample.nessus.zst"
+    nessus_scan_file.write_bytes(_zstd_compress(sample_content))
+    monkeypatch.setattr(utilities, "zstandard", None)
+    with pytest.raises(ImportError, match=r"nessus-file-reader\[zstd\]"):
+        utilities.open_nessus_file(str(nessus_scan_file))
@@ -0,0 +1,74 @@
+import collections
+import gc
+import weakref
+
+import nessus_file_reader as nfr
+from nessus_file_reader import utilities
+
+
+def _use_caches(root):
+    nfr.scan.number_of_target_hosts(root)
+    nfr.scan.scan_time_elapsed(root)
+    nfr.scan.policy_max_hosts(root)
+    nfr.scan.plugin_set(root)
+    nfr.scan.number_of_scanned_hosts_with_credentialed_checks_yes(root)
+    for report_host in nfr.scan.report_hosts(root):
+        nfr.host.risk_factor_histogram(report_host)
+        nfr.host.severity_histogram(report_host)
+        nfr.host.scanner_ip(root, report_host)
+        nfr.host.credentialed_checks(root, report_host)
+        nfr.host.netbios_network_name(root, report_host)
+        nfr.plugin.plugin_output(root, report_host, "19506")
+        nfr.plugin.plugin_output(root, report_host, "99999")
+
+
+def test_element_cache_keeps_value_while_element_exists(
+    sample_nessus_file, etree_backend
+):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    cache = utilities.ElementCache()
+    cache[root] = "value"
+    assert root in cache
+    assert cache.get(root) == "value"
+    assert cache[root] == "value"
+
+
+def test_dropped_root_is_freed(sample_nessus_file, xml_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    _use_caches(root)
+    root_reference = weakref.ref(root)
+    report_host_reference = weakref.ref(nfr.scan.report_hosts(root)[0])
+    del root
+    gc.collect()
+    assert root_reference() is None
+    assert report_host_reference() is None
+
+
+def test_cached_values_are_computed_once(sample_nessus_file, xml_backend, monkeypatch):
+    stores = collections.Counter()
+    set_item = utilities.ElementCache.__setitem__
+
+    def counting_set_item(cache, element, value):
+        stores[id(cache), id(element)] += 1
+        set_item(cache, element, value)
+
+    monkeypatch.setattr(utilities.ElementCache, "__setitem__", counting_set_item)
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    _use_caches(root)
+    scan_properties = nfr.scan.NessusScan(root)._properties
+    _use_caches(root)
+    # scan properties, plugin id indexes, plugin output records and both histograms
+    assert len({cache for cache, element in stores}) == 5
+    assert set(stores.values()) == {1}
+    assert nfr.scan.NessusScan(root)._properties is scan_properties
+
+
+def test_element_cache_does_not_keep_elements_which_cannot_be_weakly_referenced():
+    class Element:
+        __slots__ = ()
+
+    element = Element()
+    cache = utilities.ElementCache()
+    cache[element] = "value"
+    assert element not in cache
+    assert cache.get(element) is None
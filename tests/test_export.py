@@ -0,0 +1,182 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import nessus_file_reader as nfr
+from conftest import write_sample_nessus_file
+
+
+def _modules_loaded_by_import():
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, nessus_file_reader; print(' '.join(sorted(sys.modules)))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.split())
+
+
+def test_import_does_not_load_pyarrow():
+    assert "pyarrow" not in _modules_loaded_by_import()
+
+
+def test_export_parquet_without_pyarrow_names_extra(
+    sample_nessus_file, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match=r"nessus-file-reader\[parquet\]"):
+        nfr.export.export_parquet([sample_nessus_file], str(tmp_path / "parquet"))
+
+
+def test_export_parquet(sample_nessus_file, tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    rows = nfr.export.export_parquet(
+        [sample_nessus_file], str(tmp_path), row_group_size=20
+    )
+
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    report_hosts = nfr.scan.report_hosts(root)
+    assert rows["hosts"] == len(report_hosts)
+    assert rows["findings"] == sum(
+        len(nfr.host.report_items(report_host)) for report_host in report_hosts
+    )
+
+    findings = pyarrow_parquet.ParquetFile(tmp_path / "findings.parquet")
+    assert findings.metadata.num_rows == rows["findings"]
+    assert findings.metadata.num_row_groups > 1
+    hosts = pyarrow_parquet.read_table(tmp_path / "hosts.parquet").to_pylist()
+    assert [host["report_host_name"] for host in hosts] == [
+        nfr.host.report_host_name(report_host) for report_host in report_hosts
+    ]
+
+
+def test_export_sqlite(sample_nessus_file, tmp_path):
+    database = str(tmp_path / "scans.db")
+    rows = nfr.export.export_sqlite([sample_nessus_file], database, batch_size=50)
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    report_hosts = nfr.scan.report_hosts(root)
+    report_items = [
+        report_item
+        for report_host in report_hosts
+        for report_item in nfr.host.report_items(report_host)
+    ]
+    assert rows["files"] == 1
+    assert rows["hosts"] == len(report_hosts)
+    assert rows["report_items"] == len(report_items)
+    assert rows["plugins"] == len(
+        {report_item.get("pluginID") for report_item in report_items}
+    )
+    assert rows["cves"] == sum(
+        len(report_item.findall("cve")) for report_item in report_items
+    )
+
+    columns, result = nfr.export.query_sqlite(
+        database,
+        "SELECT h.report_host_name, COUNT(*) FROM report_items r "
+        "JOIN hosts h ON h.id = r.host_id WHERE r.severity >= ? "
+        "GROUP BY h.report_host_name ORDER BY h.report_host_name",
+        (3,),
+    )
+    assert columns == ["report_host_name", "COUNT(*)"]
+    assert result == [
+        (
+            nfr.host.report_host_name(report_host),
+            sum(
+                1
+                for report_item in nfr.host.report_items(report_host)
+                if int(report_item.get("severity")) >= 3
+            ),
+        )
+        for report_host in sorted(report_hosts, key=nfr.host.report_host_name)
+    ]
+
+
+def test_export_sqlite_again_by_relative_path(
+    sample_nessus_file, tmp_path, monkeypatch
+):
+    database = str(tmp_path / "scans.db")
+    first_rows = nfr.export.export_sqlite([sample_nessus_file], database)
+    monkeypatch.chdir(os.path.dirname(sample_nessus_file))
+    nfr.export.export_sqlite([os.path.basename(sample_nessus_file)], database)
+
+    _, files = nfr.export.query_sqlite(database, "SELECT path FROM files")
+    assert files == [(os.path.abspath(sample_nessus_file),)]
+    for table in ["hosts", "host_properties", "report_items", "cves"]:
+        _, ((count,),) = nfr.export.query_sqlite(
+            database, f"SELECT COUNT(*) FROM {table}"
+        )
+        assert count == first_rows[table]
+
+
+def test_export_sqlite_skips_report_items_without_plugin_id(tmp_path):
+    nessus_scan_file = write_sample_nessus_file(tmp_path / "sample.nessus")
+    content = nessus_scan_file.read_text(encoding="utf-8")
+    nessus_scan_file.write_text(
+        content.replace('pluginID="20000" ', "", 2), encoding="utf-8"
+    )
+    database = str(tmp_path / "scans.db")
+    rows = nfr.export.export_sqlite([str(nessus_scan_file)], database)
+
+    root = nfr.file.nessus_scan_file_root_element(str(nessus_scan_file))
+    report_items = [
+        report_item
+        for report_host in nfr.scan.report_hosts(root)
+        for report_item in nfr.host.report_items(report_host)
+    ]
+    assert rows["report_items"] == len(report_items) - 2
+    _, result = nfr.export.query_sqlite(
+        database,
+        "SELECT COUNT(*) FROM report_items r LEFT JOIN plugins p "
+        "ON p.plugin_id = r.plugin_id WHERE p.plugin_id IS NULL",
+    )
+    assert result == [(0,)]
+    _, result = nfr.export.query_sqlite(
+        database, "SELECT COUNT(*) FROM report_items WHERE plugin_id = 20000"
+    )
+    assert result == [(6,)]
+
+
+def test_export_sqlite_to_existing_database(sample_nessus_file, tmp_path):
+    database = str(tmp_path / "scans.db")
+    first_rows = nfr.export.export_sqlite([sample_nessus_file], database)
+    other_nessus_file = write_sample_nessus_file(tmp_path / "other.nessus", seed=2)
+    rows = nfr.export.export_sqlite(
+        [sample_nessus_file, str(other_nessus_file), sample_nessus_file],
+        database,
+        batch_size=7,
+    )
+    assert rows["files"] == 2
+
+    for table in ["hosts", "host_properties", "report_items", "cves"]:
+        _, ((count,),) = nfr.export.query_sqlite(
+            database, f"SELECT COUNT(*) FROM {table}"
+        )
+        assert count == rows[table]
+    # rows inserted in batches reference rows of their own file
+    _, result = nfr.export.query_sqlite(
+        database,
+        "SELECT f.path, COUNT(DISTINCT h.id), COUNT(DISTINCT r.id), COUNT(c.cve) "
+        "FROM files f JOIN hosts h ON h.file_id = f.id "
+        "JOIN report_items r ON r.host_id = h.id "
+        "LEFT JOIN cves c ON c.report_item_id = r.id GROUP BY f.path",
+    )
+    assert (
+        sample_nessus_file,
+        first_rows["hosts"],
+        first_rows["report_items"],
+        first_rows["cves"],
+    ) in result
+    _, indexes = nfr.export.query_sqlite(
+        database, "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )
+    assert {name for (name,) in indexes} >= {
+        "hosts_file_id",
+        "report_items_host_id",
+        "cves_cve",
+    }
@@ -0,0 +1,283 @@
+import gzip
+import os
+
+import pytest
+
+import nessus_file_reader as nfr
+from conftest import write_sample_nessus_file
+
+
+def report_host_content(report_host):
+    """
+    Function returns everything nfr reads from report host, so report hosts parsed in different ways can be compared.
+    """
+    return (
+        report_host.get("name"),
+        [(tag.get("name"), tag.text) for tag in report_host[0]],
+        [
+            (
+                dict(report_item.attrib),
+                [(child.tag, child.text) for child in report_item],
+            )
+            for report_item in nfr.host.report_items(report_host)
+        ],
+    )
+
+
+@pytest.fixture
+def sample_report_hosts(sample_nessus_file):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    return [
+        report_host_content(report_host) for report_host in nfr.scan.report_hosts(root)
+    ]
+
+
+def test_iter_report_hosts(sample_nessus_file, sample_report_hosts, xml_backend):
+    yielded = []
+    report_hosts = []
+    for report_host in nfr.file.iter_report_hosts(sample_nessus_file):
+        yielded.append(report_host_content(report_host))
+        report_hosts.append(report_host)
+    assert yielded == sample_report_hosts
+    # report hosts are cleared as soon as next one is requested
+    assert all(len(report_host) == 0 for report_host in report_hosts)
+
+
+def test_iter_report_hosts_with_root(sample_nessus_file, xml_backend):
+    full_root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    expected = [
+        (
+            nfr.plugin.plugin_output(full_root, report_host, "19506"),
+            nfr.host.scanner_ip(full_root, report_host),
+        )
+        for report_host in nfr.scan.report_hosts(full_root)
+    ]
+    yielded = []
+    for root, report_host in nfr.file.iter_report_hosts(
+        sample_nessus_file, with_root=True
+    ):
+        assert nfr.scan.policy_name(root) == "Adv 'scan'"
+        yielded.append(
+            (
+                nfr.plugin.plugin_output(root, report_host, "19506"),
+                nfr.host.scanner_ip(root, report_host),
+            )
+        )
+        # report hosts yielded before are removed from root, next ones may be already read ahead
+        assert root.find("Report")[0] is report_host
+    assert yielded == expected
+
+
+def split_reference(content, batch_size):
+    """
+    Function returns parts of nessus file content the way nessus_scan_file_split built them when it read whole file.
+    """
+    content = content.decode("utf-8")
+    report_start = content.find("<Report ")
+    report_element = content[report_start : content.find("</Report>")]
+    report_hosts = report_element.split("<ReportHost ")[1:]
+    report_name_start = report_element.find('name="')
+    report_name_end = report_element.find('"', report_name_start + len('name="'))
+    report_name = report_element[report_name_start : report_name_end + 1]
+    report_name_line = f'<Report {report_name} xmlns:cm="http://www.nessus.org/cm">'
+    parts = []
+    for i in range(0, len(report_hosts), batch_size):
+        parts.append(
+            (
+                content[:report_start]
+                + report_name_line
+                + "\n"
+                + "".join(
+                    "<ReportHost " + report_host
+                    for report_host in report_hosts[i : i + batch_size]
+                )
+                + "</Report>\n</NessusClientData_v2>\n"
+            ).encode("utf-8")
+        )
+    return parts
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_nessus_scan_file_split(tmp_path, compression, capsys):
+    # file bigger than chunk read at once, so report hosts are split between chunks
+    nessus_scan_file = write_sample_nessus_file(
+        tmp_path / "big.nessus", number_of_hosts=120, number_of_items=40
+    )
+    content = nessus_scan_file.read_bytes()
+    assert len(content) > 1024 * 1024
+    if compression == "gzip":
+        nessus_scan_file = tmp_path / "big.nessus.gz"
+        nessus_scan_file.write_bytes(gzip.compress(content))
+
+    nfr.utilities.nessus_scan_file_split(str(nessus_scan_file), 7)
+    expected = split_reference(content, 7)
+    assert len(expected) == 18
+    assert capsys.readouterr().out.split() == [
+        str(tmp_path / f"big_part{number}.nessus")
+        for number in range(1, len(expected) + 1)
+    ]
+    for number, part in enumerate(expected, 1):
+        assert (tmp_path / f"big_part{number}.nessus").read_bytes() == part
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_nessus_scan_file_split_with_wrong_batch_size(tmp_path, batch_size):
+    nessus_scan_file = write_sample_nessus_file(tmp_path / "sample.nessus")
+    with pytest.raises(ValueError):
+        nfr.utilities.nessus_scan_file_split(str(nessus_scan_file), batch_size)
+    assert os.listdir(tmp_path) == ["sample.nessus"]
+
+
+def test_report_hosts_byte_ranges(sample_nessus_file):
+    with open(sample_nessus_file, "rb") as nessus_file:
+        content = nessus_file.read()
+    byte_ranges = nfr.file.report_hosts_byte_ranges(sample_nessus_file)
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    # namespace of compliance results is declared in Report start tag
+    assert [
+        report_host_content(
+            nfr.xml_backend.fromstring(
+                b'<Report xmlns:cm="http://www.nessus.org/cm">'
+                + content[start:end]
+                + b"</Report>"
+            )[0]
+        )
+        for start, end in byte_ranges
+    ] == [
+        report_host_content(report_host) for report_host in nfr.scan.report_hosts(root)
+    ]
+
+
+def test_report_hosts_byte_ranges_of_compressed_file(tmp_path, sample_nessus_file):
+    compressed_file = tmp_path / "sample.nessus.gz"
+    with open(sample_nessus_file, "rb") as nessus_file:
+        compressed_file.write_bytes(gzip.compress(nessus_file.read()))
+    with pytest.raises(ValueError):
+        nfr.file.report_hosts_byte_ranges(str(compressed_file))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5000, 32 * 1024 * 1024])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parallel_map_report_hosts(sample_nessus_file, chunk_size, jobs):
+    results = list(
+        nfr.file.parallel_map_report_hosts(
+            sample_nessus_file, nfr.scan.list_of_scanned_hosts, jobs, chunk_size
+        )
+    )
+    if chunk_size == 1:
+        assert len(results) == 8
+    elif chunk_size == 32 * 1024 * 1024:
+        assert len(results) == 1
+    assert [name for result in results for name in result] == [
+        f"192.168.1.{host}" for host in range(1, 9)
+    ]
+    # every chunk has whole Policy section
+    assert list(
+        nfr.file.parallel_map_report_hosts(
+            sample_nessus_file, nfr.scan.plugin_set_number, jobs, chunk_size
+        )
+    ) == [65] * len(results)
+
+
+def test_parallel_map_report_hosts_without_report_hosts(tmp_path):
+    nessus_scan_file = write_sample_nessus_file(
+        tmp_path / "empty.nessus", number_of_hosts=0
+    )
+    assert list(
+        nfr.file.parallel_map_report_hosts(str(nessus_scan_file), nfr.scan.policy_name)
+    ) == ["Adv 'scan'"]
+
+
+@pytest.fixture
+def nessus_scan_file_copy(tmp_path, sample_nessus_file):
+    nessus_scan_file = tmp_path / "sample.nessus"
+    with open(sample_nessus_file, "rb") as nessus_file:
+        nessus_scan_file.write_bytes(nessus_file.read())
+    return str(nessus_scan_file)
+
+
+def test_report_hosts_index(nessus_scan_file_copy, monkeypatch):
+    index = nfr.file.report_hosts_index(nessus_scan_file_copy)
+    assert [entry[2:] for entry in index["report_hosts"]] == [
+        [f"192.168.1.{host + 1}", f"192.168.1.{host + 1}", f"host{host}.example.com"]
+        for host in range(8)
+    ]
+    assert [tuple(entry[:2]) for entry in index["report_hosts"]] == (
+        nfr.file.report_hosts_byte_ranges(nessus_scan_file_copy)
+    )
+    assert os.path.isfile(nfr.file.report_hosts_index_file(nessus_scan_file_copy))
+
+    def build_not_expected(file):
+        raise AssertionError("index should be read from sidecar file")
+
+    with monkeypatch.context() as context:
+        context.setattr(nfr.file, "_report_hosts_index_build", build_not_expected)
+        assert nfr.file.report_hosts_index(nessus_scan_file_copy) == index
+
+    # index of modified file is built again
+    write_sample_nessus_file(nessus_scan_file_copy, number_of_hosts=3)
+    os.utime(nessus_scan_file_copy, ns=(0, 0))
+    assert len(nfr.file.report_hosts_index(nessus_scan_file_copy)["report_hosts"]) == 3
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("192.168.1.3", "192.168.1.3"),
+        ("HOST4.example.com", "192.168.1.5"),
+        ("192.168.1.9", None),
+    ],
+)
+def test_load_host(nessus_scan_file_copy, xml_backend, name, expected):
+    root = nfr.file.nessus_scan_file_root_element(nessus_scan_file_copy)
+    expected_report_hosts = {
+        report_host.get("name"): report_host_content(report_host)
+        for report_host in nfr.scan.report_hosts(root)
+    }
+    compressed_file = nessus_scan_file_copy + ".gz"
+    with open(nessus_scan_file_copy, "rb") as nessus_file:
+        with open(compressed_file, "wb") as compressed_content:
+            compressed_content.write(gzip.compress(nessus_file.read()))
+
+    for nessus_scan_file in [nessus_scan_file_copy, compressed_file]:
+        report_host = nfr.file.load_host(nessus_scan_file, name)
+        if expected is None:
+            assert report_host is None
+        else:
+            assert report_host_content(report_host) == expected_report_hosts[expected]
+    assert not os.path.exists(nfr.file.report_hosts_index_file(compressed_file))
+
+
+POLICY_FUNCTIONS = [
+    "policy_name",
+    "scan_file_source",
+    "policy_max_hosts",
+    "policy_max_checks",
+    "policy_checks_read_timeout",
+    "reverse_lookup",
+    "plugin_set_number",
+    "policy_db_sid",
+    "policy_db_port",
+    "policy_login_specified",
+    "list_of_target_hosts_raw",
+]
+
+
+def test_nessus_scan_file_policy_root_element(sample_nessus_file, xml_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    policy_root = nfr.file.nessus_scan_file_policy_root_element(sample_nessus_file)
+    assert [child.tag for child in policy_root] == ["Policy"]
+    for name in POLICY_FUNCTIONS:
+        assert getattr(nfr.scan, name)(policy_root) == getattr(nfr.scan, name)(root)
+
+
+def test_policy_root_element_is_read_up_to_end_of_policy(tmp_path, xml_backend):
+    nessus_scan_file = write_sample_nessus_file(tmp_path / "sample.nessus")
+    content = nessus_scan_file.read_bytes()
+    # report hosts are not read, so damaged Report section doesn't matter
+    nessus_scan_file.write_bytes(
+        content[: content.find(b"<ReportHost ") + 100] + b"<<damaged"
+    )
+    policy_root = nfr.file.nessus_scan_file_policy_root_element(str(nessus_scan_file))
+    assert nfr.scan.policy_name(policy_root) == "Adv 'scan'"
+    assert nfr.scan.plugin_set_number(policy_root) == 65
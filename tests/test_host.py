@@ -0,0 +1,58 @@
+import collections
+
+import nessus_file_reader as nfr
+
+RISK_FACTORS = ["Critical", "High", "Medium", "Low", "None"]
+
+
+def test_histograms_parity(sample_nessus_file, xml_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    for report_host in nfr.scan.report_hosts(root):
+        report_items = report_host.findall("ReportItem")
+        risk_factors = collections.Counter(
+            report_item.find("risk_factor").text for report_item in report_items
+        )
+        severities = collections.Counter(
+            int(report_item.get("severity")) for report_item in report_items
+        )
+        assert nfr.host.risk_factor_histogram(report_host) == {
+            risk_factor: risk_factors[risk_factor] for risk_factor in RISK_FACTORS
+        }
+        assert nfr.host.severity_histogram(report_host) == {
+            severity: severities[severity] for severity in [4, 3, 2, 1, 0]
+        }
+        for risk_factor in RISK_FACTORS + ["Unknown"]:
+            assert nfr.host.number_of_plugins_per_risk_factor(
+                report_host, risk_factor
+            ) == risk_factors.get(risk_factor, 0)
+
+
+def test_histograms_are_copies(sample_nessus_file, etree_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    report_host = nfr.scan.report_hosts(root)[0]
+    expected = nfr.host.risk_factor_histogram(report_host)
+    nfr.host.risk_factor_histogram(report_host)["High"] = -1
+    nfr.host.severity_histogram(report_host).clear()
+    assert nfr.host.risk_factor_histogram(report_host) == expected
+    assert sum(nfr.host.severity_histogram(report_host).values()) == len(
+        nfr.host.report_items(report_host)
+    )
+
+
+def test_histogram_with_other_risk_factor(xml_backend):
+    report_host = nfr.xml_backend.fromstring(
+        b'<ReportHost name="h"><HostProperties />'
+        b'<ReportItem severity="0"><risk_factor>Unknown</risk_factor></ReportItem>'
+        b'<ReportItem severity="2"><risk_factor>Medium</risk_factor></ReportItem>'
+        b'<ReportItem severity="2" /></ReportHost>'
+    )
+    assert nfr.host.risk_factor_histogram(report_host) == {
+        "Critical": 0,
+        "High": 0,
+        "Medium": 1,
+        "Low": 0,
+        "None": 0,
+        "Unknown": 1,
+    }
+    assert nfr.host.severity_histogram(report_host) == {4: 0, 3: 0, 2: 2, 1: 0, 0: 1}
+    assert nfr.host.number_of_plugins_per_risk_factor(report_host, "Unknown") == 1
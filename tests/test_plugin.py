@@ -0,0 +1,202 @@
+import types
+
+import pytest
+
+import nessus_file_reader as nfr
+from conftest import PLUGIN_IDS
+
+# plugin ids which occur in report, are enabled but don't occur in report, and are not enabled in policy
+CHECKED_PLUGIN_IDS = [str(plugin_id) for plugin_id in PLUGIN_IDS] + ["99999"]
+
+
+def plugin_outputs_reference(root, report_host, plugin_id):
+    """
+    Function returns list of outputs of given plugin the way plugin_output and plugin_outputs found them by
+    checking every report item of report host.
+    """
+    plugin_id = str(plugin_id)
+    outputs = []
+    for report_item in report_host.findall("ReportItem"):
+        if report_item.get("pluginID") == plugin_id:
+            plugin_output_item = report_item.find("plugin_output")
+            if plugin_output_item is None:
+                outputs.append(f"{plugin_id} - no output recorded")
+            else:
+                outputs.append(plugin_output_item.text)
+    if not outputs:
+        plugin_set = nfr.scan.plugin_set(root)
+        if plugin_set is None:
+            outputs = [f"{plugin_id} - info about used plugins not available"]
+        elif plugin_id not in plugin_set:
+            outputs = [f"{plugin_id} - not enabled"]
+        else:
+            outputs = [f"{plugin_id} - check Audit Trail"]
+    return outputs
+
+
+def _roots(nessus_scan_file):
+    root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+    root_without_plugin_set = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+    server_preferences = root_without_plugin_set.find(
+        "Policy/Preferences/ServerPreferences"
+    )
+    for preference in server_preferences.findall("preference"):
+        if preference.findtext("name") == "plugin_set":
+            server_preferences.remove(preference)
+    return [root, root_without_plugin_set]
+
+
+def test_plugin_output_parity(sample_nessus_file, xml_backend):
+    for root in _roots(sample_nessus_file):
+        for report_host in nfr.scan.report_hosts(root):
+            for plugin_id in CHECKED_PLUGIN_IDS:
+                outputs = plugin_outputs_reference(root, report_host, plugin_id)
+                assert (
+                    nfr.plugin.plugin_output(root, report_host, plugin_id)
+                    == outputs[-1]
+                )
+                assert nfr.plugin.plugin_outputs(
+                    root, report_host, int(plugin_id)
+                ) == "\n".join(outputs)
+
+
+def test_report_items_per_plugin_id(sample_nessus_file, xml_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    for report_host in nfr.scan.report_hosts(root):
+        report_items_index = nfr.plugin.report_items_per_plugin_id(report_host)
+        assert sum(len(items) for items in report_items_index.values()) == len(
+            report_host.findall("ReportItem")
+        )
+        for plugin_id, report_items in report_items_index.items():
+            assert report_items == [
+                report_item
+                for report_item in report_host.findall("ReportItem")
+                if report_item.get("pluginID") == plugin_id
+            ]
+
+
+def _records(root, report_host):
+    return {
+        plugin_id: nfr.plugin.plugin_output_record(root, report_host, plugin_id)
+        for plugin_id in ["19506", "10150", "91825", "91827", "11936"]
+    }
+
+
+def test_plugin_output_records(sample_nessus_file, xml_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    for report_host in nfr.scan.report_hosts(root):
+        # report host 192.168.1.{host + 1} is written for host number of sample file
+        host = int(nfr.host.report_host_name(report_host).split(".")[-1]) - 1
+        records = _records(root, report_host)
+        for record in records.values():
+            assert isinstance(record, types.MappingProxyType)
+
+        credentialed = "yes" if host % 2 else "no"
+        assert records["19506"]["status"] == "output"
+        assert records["19506"]["scanner_ip"] == f"10.9.9.{host}"
+        assert records["19506"]["credentialed_checks"] == credentialed
+        assert records["19506"]["credentialed_checks_yes"] is (credentialed == "yes")
+        assert records["19506"]["fields"]["Nessus version"] == "10.0"
+
+        if host % 3 == 0:
+            assert records["10150"]["status"] == "output"
+            assert records["10150"]["names"] == (
+                (f"HOST{host}", "Computer name"),
+                ("WORKGROUP", "Workgroup / Domain name"),
+            )
+            assert records["10150"]["netbios_computer_name"] == f"host{host}"
+            assert records["10150"]["netbios_domain_name"] == "workgroup"
+        else:
+            assert records["10150"]["status"] == "check Audit Trail"
+            assert records["10150"]["names"] == ()
+
+        if host % 4 == 0:
+            assert records["91825"]["status"] == "output"
+            assert records["91825"]["credentialed_checks"] == "yes"
+            assert records["91825"]["credentialed_checks_enabled"] is True
+        else:
+            assert records["91825"]["status"] == "check Audit Trail"
+            # texts checked by parser don't occur in statuses of plugin_output, as before
+            assert records["91825"]["credentialed_checks"] is None
+        # 91827 is not enabled in policy
+        assert records["91827"]["status"] == "not enabled"
+        assert records["91827"]["credentialed_checks"] is None
+        assert records["91827"]["credentialed_checks_enabled"] is False
+
+        if host % 2 == 0:
+            assert records["11936"]["remote_operating_system"] == "Linux Kernel 5"
+            assert records["11936"]["confidence_level"] == 95
+            assert records["11936"]["method"] == "SSH"
+        else:
+            assert records["11936"]["status"] == "check Audit Trail"
+            assert records["11936"]["remote_operating_system"] is None
+            assert records["11936"]["confidence_level"] is None
+
+        assert _records(root, report_host) == records
+
+
+def test_plugin_output_record_is_parsed_once(sample_nessus_file, etree_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    report_host = nfr.scan.report_hosts(root)[0]
+    records = _records(root, report_host)
+    assert all(
+        _records(root, report_host)[plugin_id] is record
+        for plugin_id, record in records.items()
+    )
+
+
+def test_plugin_output_record_is_read_only(sample_nessus_file):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    record = nfr.plugin.plugin_output_record(
+        root, nfr.scan.report_hosts(root)[0], 19506
+    )
+    with pytest.raises(TypeError):
+        record["scanner_ip"] = "10.0.0.1"
+    with pytest.raises(TypeError):
+        record["fields"]["Scanner IP"] = "10.0.0.1"
+
+
+def test_plugin_output_record_without_parser(sample_nessus_file):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    with pytest.raises(ValueError, match="10000"):
+        nfr.plugin.plugin_output_record(root, nfr.scan.report_hosts(root)[0], 10000)
+
+
+def test_plugin_output_parser_registers_parser(sample_nessus_file, monkeypatch):
+    # parser is removed from PLUGIN_OUTPUT_PARSERS after test
+    monkeypatch.setitem(nfr.plugin.PLUGIN_OUTPUT_PARSERS, "20000", None)
+
+    @nfr.plugin.plugin_output_parser(20000)
+    def web(plugin_output_content, plugin_id):
+        return {"output": plugin_output_content, "plugin_id": plugin_id}
+
+    assert nfr.plugin.PLUGIN_OUTPUT_PARSERS["20000"] is web
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    report_host = nfr.scan.report_hosts(root)[0]
+    assert dict(nfr.plugin.plugin_output_record(root, report_host, 20000)) == {
+        "status": "no output recorded",
+        "output": "20000 - no output recorded",
+        "plugin_id": "20000",
+    }
+
+
+def test_plugin_set_is_used_only_for_plugins_not_found(
+    sample_nessus_file, xml_backend, monkeypatch
+):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    report_host = nfr.scan.report_hosts(root)[0]
+    expected = nfr.plugin.plugin_output(root, report_host, "19506")
+    plugin_set = nfr.scan.plugin_set_frozenset(root)
+    # plugin set is parsed once per root element
+    assert nfr.scan.plugin_set_frozenset(root) is plugin_set
+
+    def plugin_set_not_expected(root):
+        raise AssertionError("plugin set should not be used for plugin found in report")
+
+    with monkeypatch.context() as context:
+        context.setattr(nfr.scan, "plugin_set_frozenset", plugin_set_not_expected)
+        assert nfr.plugin.plugin_output(root, report_host, "19506") == expected
+        assert nfr.plugin.plugin_outputs(root, report_host, "19506") == expected
+    assert nfr.plugin.plugin_output(root, report_host, "99999") == (
+        "99999 - not enabled"
+    )
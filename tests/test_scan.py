@@ -0,0 +1,293 @@
+import datetime
+import ipaddress
+
+import pytest
+
+import nessus_file_reader as nfr
+from conftest import PLUGIN_IDS, write_sample_nessus_file
+
+# values returned by functions of nfr.scan before they became wrappers of NessusScan
+EXPECTED_SCAN_VALUES = {
+    "report_name": "test scan",
+    "policy_name": "Adv 'scan'",
+    "scan_file_source": "Nessus",
+    "policy_max_hosts": "30",
+    "policy_max_checks": "4",
+    "policy_checks_read_timeout": "5",
+    "reverse_lookup": "no",
+    "plugin_set_number": 65,
+    "policy_db_sid": "ORCL",
+    "policy_db_port": None,
+    "policy_login_specified": "admin",
+    "list_of_target_hosts_raw": [
+        "192.168.1.1-192.168.1.10",
+        "10.0.0.0/29",
+        "host.example.com",
+        "host.sc[10.1.1.1]",
+        "192.168.1.5",
+    ],
+    "list_of_target_hosts": [f"192.168.1.{host}" for host in range(1, 11)]
+    + [f"10.0.0.{host}" for host in range(1, 7)]
+    + ["host.example.com", "host.sc", "192.168.1.5"],
+    "list_of_target_hosts_sc_fqdn_ip": [
+        {"target_fqdn": "Host.SC", "target_ip": "10.1.1.1"}
+    ],
+    "list_of_scanned_hosts": [f"192.168.1.{host}" for host in range(1, 9)],
+    "number_of_target_hosts": 19,
+    "number_of_target_hosts_without_duplicates": 18,
+    "number_of_scanned_hosts": 8,
+    "number_of_not_scanned_hosts": 10,
+    "number_of_scanned_hosts_with_credentialed_checks_yes": 4,
+    "number_of_scanned_dbs_with_credentialed_checks_yes": 2,
+    "scan_time_start": datetime.datetime(2024, 1, 1, 0, 15),
+    "scan_time_end": datetime.datetime(2024, 1, 5, 14, 30),
+    "scan_time_elapsed": "4 days, 14:15:00",
+}
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_SCAN_VALUES))
+def test_scan_functions_parity(sample_nessus_file, xml_backend, name):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    value = getattr(nfr.scan, name)(root)
+    assert value == EXPECTED_SCAN_VALUES[name]
+    # the same value is returned from cached data
+    assert getattr(nfr.scan, name)(root) == value
+
+
+def test_list_of_not_scanned_hosts_is_ordered(sample_nessus_file):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    assert nfr.scan.list_of_not_scanned_hosts(root) == [
+        "10.0.0.1",
+        "10.0.0.2",
+        "10.0.0.3",
+        "10.0.0.4",
+        "10.0.0.5",
+        "10.0.0.6",
+        "192.168.1.9",
+        "192.168.1.10",
+        "host.example.com",
+        "host.sc",
+    ]
+
+
+def test_credentialed_checks_yes_without_plugin_19506(tmp_path):
+    nessus_scan_file = write_sample_nessus_file(tmp_path / "sample.nessus")
+    # first host has no Plugin ID 19506, it is followed by host with credentialed checks
+    content = nessus_scan_file.read_text(encoding="utf-8")
+    nessus_scan_file.write_text(
+        content.replace('pluginID="19506"', 'pluginID="19507"', 1), encoding="utf-8"
+    )
+    root = nfr.file.nessus_scan_file_root_element(str(nessus_scan_file))
+    assert nfr.scan.number_of_scanned_hosts_with_credentialed_checks_yes(root) is None
+    assert [
+        host_facts["credentialed_checks"]
+        for host_facts in nfr.scan.NessusScan(root).hosts_facts
+    ] == [None, True, False, True, False, True, False, True]
+
+
+def test_scan_times_returns_copy(sample_nessus_file, etree_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    scan_times = nfr.scan.scan_times(root)
+    assert [host_times["report_host_name"] for host_times in scan_times["hosts"]] == (
+        EXPECTED_SCAN_VALUES["list_of_scanned_hosts"]
+    )
+    scan_times["scan_time_start"] = None
+    scan_times["hosts"][0]["host_time_start"] = None
+    scan_times["hosts"].clear()
+
+    scan_times = nfr.scan.scan_times(root)
+    assert scan_times["scan_time_start"] == EXPECTED_SCAN_VALUES["scan_time_start"]
+    assert len(scan_times["hosts"]) == 8
+    assert scan_times["hosts"][0]["host_time_start"] is not None
+    assert nfr.scan.scan_time_start(root) == EXPECTED_SCAN_VALUES["scan_time_start"]
+
+
+def test_report_hosts_of_streamed_root_are_not_cached(sample_nessus_file, xml_backend):
+    nessus_scan = None
+    for root, report_host in nfr.file.iter_report_hosts(
+        sample_nessus_file, with_root=True
+    ):
+        if nessus_scan is None:
+            nessus_scan = nfr.scan.NessusScan(root)
+        # report hosts already removed are not returned, report host being yielded is
+        report_hosts = root.find("Report").findall("ReportHost")
+        report_hosts_names = [
+            nfr.host.report_host_name(report_host) for report_host in report_hosts
+        ]
+        assert report_host in report_hosts
+        assert nfr.scan.report_hosts(root) == report_hosts
+        assert nfr.scan.list_of_scanned_hosts(root) == report_hosts_names
+        assert list(nessus_scan.scanned_hosts) == report_hosts_names
+        assert nfr.scan.number_of_not_scanned_hosts(root) == 18 - len(
+            report_hosts_names
+        )
+        assert [
+            host_times["report_host_name"]
+            for host_times in nfr.scan.scan_times(root)["hosts"]
+        ] == report_hosts_names
+        assert [
+            host_facts["report_host_name"] for host_facts in nessus_scan.hosts_facts
+        ] == report_hosts_names
+        # data not derived from report hosts is still cached
+        assert nfr.scan.number_of_target_hosts(root) == 19
+    assert not nfr.utilities._streamed_root_ids
+
+
+def test_streamed_root_is_unmarked_when_iteration_is_closed(sample_nessus_file):
+    report_hosts = nfr.file.iter_report_hosts(sample_nessus_file, with_root=True)
+    root, _ = next(report_hosts)
+    assert nfr.utilities.streamed_root(root)
+    report_hosts.close()
+    assert not nfr.utilities.streamed_root(root)
+
+
+def _remove_server_preference(root, name):
+    server_preferences = root.find("Policy/Preferences/ServerPreferences")
+    for preference in server_preferences.findall("preference"):
+        if preference.findtext("name") == name:
+            server_preferences.remove(preference)
+
+
+def test_plugin_set(sample_nessus_file, etree_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    expected = [str(plugin_id) for plugin_id in PLUGIN_IDS if plugin_id != 91827]
+    plugin_set = nfr.scan.plugin_set(root)
+    assert plugin_set == expected
+    # list returned to caller doesn't change plugin set parsed once per root
+    plugin_set.clear()
+    assert nfr.scan.plugin_set(root) == expected
+    assert nfr.scan.plugin_set_frozenset(root) == frozenset(expected)
+    assert nfr.scan.plugin_set_number(root) == len(expected)
+
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    _remove_server_preference(root, "plugin_set")
+    assert nfr.scan.plugin_set(root) is None
+    assert nfr.scan.plugin_set_frozenset(root) is None
+    assert nfr.scan.plugin_set_number(root) is None
+
+
+def test_preferences(sample_nessus_file, xml_backend):
+    with open(sample_nessus_file, "rb") as nessus_file:
+        content = nessus_file.read()
+    # preferences occurring more than once
+    content = content.replace(
+        b"</ServerPreferences>",
+        b"<preference><name>max_hosts</name><value>40</value></preference></ServerPreferences>",
+    ).replace(
+        b"</PluginsPreferences>",
+        b"<item><fullName>SSH settings[entry]:SSH user name :</fullName>"
+        b"<selectedValue>admin</selectedValue></item></PluginsPreferences>",
+    )
+    root = nfr.xml_backend.fromstring(content)
+
+    for preference in root.iter("preference"):
+        name = preference.findtext("name")
+        # value of last occurrence
+        expected = [
+            other.findtext("value")
+            for other in root.iter("preference")
+            if other.findtext("name") == name
+        ][-1]
+        assert nfr.scan.server_preference_value(root, name) == expected
+    assert nfr.scan.policy_max_hosts(root) == "40"
+    assert nfr.scan.server_preference_value(root, "missing") is None
+
+    for item in root.iter("item"):
+        full_name = item.findtext("fullName")
+        # value of first occurrence
+        expected = root.find(
+            f"Policy/Preferences/PluginsPreferences/item/[fullName='{full_name}']/selectedValue"
+        ).text
+        assert nfr.scan.plugin_preference_value(root, full_name) == expected
+    assert (
+        nfr.scan.plugin_preference_value(root, "SSH settings[entry]:SSH user name :")
+        == "root"
+    )
+    assert nfr.scan.plugin_preference_value(root, "missing") is None
+
+    with pytest.raises(TypeError):
+        nfr.scan.server_preferences(root)["max_hosts"] = "1"
+    with pytest.raises(TypeError):
+        nfr.scan.plugins_preferences(root)["missing"] = "1"
+
+
+def test_preferences_without_policy(xml_backend):
+    root = nfr.xml_backend.fromstring(
+        b'<NessusClientData_v2><Report name="x" /></NessusClientData_v2>'
+    )
+    assert nfr.scan.server_preference_value(root, "max_hosts") is None
+    assert nfr.scan.plugin_preference_value(root, "missing") is None
+    assert nfr.scan.policy_name(root) is None
+
+
+def _host_time(report_host, name):
+    for tag in report_host[0].findall("tag"):
+        if tag.get("name") == name:
+            return datetime.datetime.strptime(tag.text, "%a %b %d %H:%M:%S %Y")
+    return None
+
+
+def test_scan_times(sample_nessus_file, xml_backend):
+    with open(sample_nessus_file, "rb") as nessus_file:
+        content = nessus_file.read()
+    # last report host has not been finished
+    last_host_end = content.rfind(b'<tag name="HOST_END">')
+    content = (
+        content[:last_host_end]
+        + content[content.find(b"</tag>", last_host_end) + len(b"</tag>") :]
+    )
+    root = nfr.xml_backend.fromstring(content)
+    report_hosts = nfr.scan.report_hosts(root)
+
+    scan_times = nfr.scan.scan_times(root)
+    starts = [_host_time(report_host, "HOST_START") for report_host in report_hosts]
+    ends = [_host_time(report_host, "HOST_END") for report_host in report_hosts]
+    assert ends[-1] is None
+    assert scan_times["scan_time_start"] == min(starts)
+    assert scan_times["scan_time_end"] == max(ends[:-1])
+    assert scan_times["scan_time_elapsed"] == str(max(ends[:-1]) - min(starts))
+    assert scan_times["hosts"] == [
+        {
+            "report_host_name": nfr.host.report_host_name(report_host),
+            "host_time_start": start,
+            "host_time_end": end,
+            "host_time_elapsed": str(end - start) if end is not None else None,
+        }
+        for report_host, start, end in zip(report_hosts, starts, ends)
+    ]
+    for report_host, host_times in zip(report_hosts, scan_times["hosts"]):
+        assert nfr.host.host_time_start(report_host) == host_times["host_time_start"]
+        assert nfr.host.host_time_end(report_host) == host_times["host_time_end"]
+        assert (
+            nfr.host.host_time_elapsed(report_host) == host_times["host_time_elapsed"]
+        )
+    assert nfr.scan.scan_time_start(root) == scan_times["scan_time_start"]
+    assert nfr.scan.scan_time_end(root) == scan_times["scan_time_end"]
+    assert nfr.scan.scan_time_elapsed(root) == scan_times["scan_time_elapsed"]
+
+
+def test_iter_target_hosts(sample_nessus_file, xml_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    scan = nfr.scan.NessusScan(root)
+    assert list(scan.iter_target_hosts()) == nfr.scan.list_of_target_hosts(root)
+    assert scan.target_hostnames == {"host.example.com", "host.sc"}
+    assert scan.target_intervals == (
+        (
+            int(ipaddress.IPv4Address("10.0.0.1")),
+            int(ipaddress.IPv4Address("10.0.0.6")),
+        ),
+        (
+            int(ipaddress.IPv4Address("192.168.1.1")),
+            int(ipaddress.IPv4Address("192.168.1.10")),
+        ),
+    )
+
+
+def test_iter_target_hosts_without_targets(sample_nessus_file, etree_backend):
+    root = nfr.file.nessus_scan_file_root_element(sample_nessus_file)
+    _remove_server_preference(root, "TARGET")
+    scan = nfr.scan.NessusScan(root)
+    assert list(scan.iter_target_hosts()) == []
+    assert nfr.scan.list_of_target_hosts(root) is None
+    assert nfr.scan.number_of_target_hosts(root) is None
+    assert scan.target_intervals == ()
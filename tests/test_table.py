@@ -0,0 +1,180 @@
+import subprocess
+import sys
+
+import jmespath
+import pytest
+
+import nessus_file_reader as nfr
+
+
+def _sample_table(nessus_scan_file):
+    scan_table = nfr.table.ScanTable()
+    for report_host in nfr.file.iter_report_hosts(nessus_scan_file):
+        report_host_name = nfr.host.report_host_name(report_host)
+        for report_item in nfr.host.report_items(report_host):
+            scan_table.append_report_item(
+                nessus_scan_file, report_host_name, report_item
+            )
+    return scan_table
+
+
+def test_import_does_not_load_numpy():
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, nessus_file_reader; print('numpy' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "False"
+
+
+def test_numpy_columns(sample_nessus_file):
+    numpy = pytest.importorskip("numpy")
+    scan_table = _sample_table(sample_nessus_file)
+    columns = scan_table.numpy_columns(["S", "CVSSv3", "Report host name"])
+    assert columns["S"].tolist() == [
+        int(record["S"]) for record in scan_table.records()
+    ]
+    assert numpy.isnan(columns["CVSSv3"]).sum() == sum(
+        1 for record in scan_table.records() if record["CVSSv3"] is None
+    )
+    names = scan_table.dictionary("Report host name")
+    assert [names[code] for code in columns["Report host name"]] == [
+        record["Report host name"] for record in scan_table.records()
+    ]
+    assert nfr.table.ScanTable().numpy_columns(["S"])["S"].size == 0
+
+
+def test_numpy_columns_without_numpy_names_extra(sample_nessus_file, monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    with pytest.raises(ImportError, match=r"nessus-file-reader\[numpy\]"):
+        nfr.table.ScanTable().numpy_columns()
+
+
+def _plugin_severity_rows(nessus_scan_file):
+    """
+    Function returns plugin severity rows built straight from report items, the way nfr scan --plugin-severity
+    built them before ScanTable.
+    """
+    rows = []
+    root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+    for report_host in nfr.scan.report_hosts(root):
+        for report_item in nfr.host.report_items(report_host):
+            value = lambda name: nfr.plugin.report_item_value(report_item, name)
+            severity = value("severity")
+            rows.append(
+                {
+                    "File name": nessus_scan_file,
+                    "Report host name": nfr.host.report_host_name(report_host),
+                    "PID": value("pluginID"),
+                    "S": severity,
+                    "SL": nfr.plugin.severity_number_to_label(severity),
+                    "RF": value("risk_factor"),
+                    "CVSSv2": value("cvss_base_score"),
+                    "CVSSv2L": nfr.plugin.cvssv2_score_to_severity(
+                        value("cvss_base_score")
+                    ),
+                    "CVSSv3": value("cvss3_base_score"),
+                    "CVSSv3L": nfr.plugin.cvssv3_score_to_severity(
+                        value("cvss3_base_score")
+                    ),
+                    "CVSSv4": value("cvss4_base_score"),
+                    "CVSSv4L": nfr.plugin.cvssv4_score_to_severity(
+                        value("cvss4_base_score")
+                    ),
+                    "VPR": value("vpr_score"),
+                    "VPRL": nfr.plugin.vpr_score_to_severity(value("vpr_score")),
+                    "EPSS": value("epss_score"),
+                    "EPSS%": nfr.plugin.epss_score_decimal_to_percent(
+                        value("epss_score")
+                    ),
+                }
+            )
+    return rows
+
+
+def test_records_are_the_same_as_rows_built_from_report_items(sample_nessus_file):
+    scan_table = _sample_table(sample_nessus_file)
+    assert list(scan_table.records()) == _plugin_severity_rows(sample_nessus_file)
+
+
+def test_float_values_keep_text_of_every_row(sample_nessus_file):
+    scan_table = _sample_table(sample_nessus_file)
+    cvssv3 = [
+        record["CVSSv3"] for record in scan_table.records() if record["PID"] == "20000"
+    ]
+    # equal scores written differently in nessus file are returned as written
+    assert set(cvssv3) == {"7", "7.0"}
+
+    merged_table = nfr.table.ScanTable()
+    merged_table.extend(scan_table)
+    merged_table.extend(scan_table)
+    assert list(merged_table.records()) == list(scan_table.records()) * 2
+
+
+def test_sorted_indices(sample_nessus_file):
+    scan_table = _sample_table(sample_nessus_file)
+    records = list(scan_table.records())
+    indices = scan_table.sorted_indices(["Report host name", "-S", "PID"])
+    assert [records[index] for index in indices] == sorted(
+        records, key=lambda x: (x["Report host name"], -int(x["S"]), int(x["PID"]))
+    )
+
+
+@pytest.mark.parametrize(
+    "filter_expression, row_wise",
+    [
+        ("[?S=='4']", True),
+        ("[?S=='4'].{h:\"Report host name\",p:PID}", True),
+        ("[*].PID", True),
+        ("[].PID", True),
+        ("sort_by(@, &PID)[:10]", False),
+        ("length(@)", False),
+        ("[?S=='4'] | [0]", False),
+        ("[:3]", False),
+        ("@", False),
+    ],
+)
+def test_plugin_severity_filter_is_row_wise(filter_expression, row_wise):
+    assert nfr.table.plugin_severity_filter_is_row_wise(filter_expression) is row_wise
+
+
+@pytest.mark.parametrize(
+    "filter_expression",
+    [
+        "[?S=='4']",
+        "[?S=='4' && RF=='Critical'].{h:\"Report host name\",p:PID}",
+        "[?VPR != null] | [0]",
+        "[?!(S=='0') || contains(PID, '99')].PID",
+        "[?CVSSv3L=='High'] | length(@)",
+        "[?S=='1' && missing_column==null]",
+    ],
+)
+def test_plugin_severity_predicate_parity(sample_nessus_file, filter_expression):
+    scan_table = _sample_table(sample_nessus_file)
+    records = list(scan_table.records())
+    predicate = nfr.table.plugin_severity_predicate(filter_expression)
+    assert predicate is not None
+    passed = [
+        nfr.table.plugin_severity_record(sample_nessus_file, report_host_name, item)
+        for report_host in nfr.file.iter_report_hosts(sample_nessus_file)
+        for report_host_name in [nfr.host.report_host_name(report_host)]
+        for item in nfr.host.report_items(report_host)
+        if predicate(sample_nessus_file, report_host_name, item)
+    ]
+    assert len(passed) < len(records)
+    assert jmespath.search(filter_expression, passed) == jmespath.search(
+        filter_expression, records
+    )
+
+
+@pytest.mark.parametrize(
+    "filter_expression",
+    ["sort_by(@, &PID)[:10]", "[*].PID", "[?@.S=='4']", "length(@)", "[0]"],
+)
+def test_plugin_severity_predicate_of_not_supported_expression(filter_expression):
+    assert nfr.table.plugin_severity_predicate(filter_expression) is None
@@ -0,0 +1,154 @@
+import datetime
+import ipaddress
+import random
+
+import pytest
+
+import nessus_file_reader as nfr
+from nessus_file_reader import utilities
+
+
+def test_host_time_parse_parity():
+    randomizer = random.Random(1)
+    start = datetime.datetime(1999, 1, 1)
+    for _ in range(2000):
+        value = start + datetime.timedelta(seconds=randomizer.randrange(10**9))
+        for host_time in [
+            value.strftime("%a %b %d %H:%M:%S %Y"),
+            # day of month without leading zero
+            value.strftime("%a %b ")
+            + f"{value.day:2d}"
+            + value.strftime(" %H:%M:%S %Y"),
+        ]:
+            assert utilities.host_time_parse(host_time) == datetime.datetime.strptime(
+                host_time, "%a %b %d %H:%M:%S %Y"
+            )
+
+
+@pytest.mark.parametrize(
+    "host_time", ["", "Mon Foo 01 10:30:00 2024", "Mon Jan 32 10:30:00 2024", "x"]
+)
+def test_host_time_parse_invalid(host_time):
+    with pytest.raises(ValueError):
+        utilities.host_time_parse(host_time)
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_ordered_parallel_map(jobs):
+    items = list(range(-50, 50))
+    assert list(utilities.ordered_parallel_map(abs, items, jobs)) == [
+        abs(item) for item in items
+    ]
+
+
+def test_ordered_parallel_map_closed_early():
+    pulled = []
+
+    def items():
+        for item in range(1000):
+            pulled.append(item)
+            yield -item
+
+    results = utilities.ordered_parallel_map(abs, items(), jobs=2)
+    assert next(results) == 0
+    results.close()
+    # items are taken from iterable only when there is room for them in flight
+    assert len(pulled) <= 2 * 2 + 1
+
+
+def _ipaddress_hosts(ip_range):
+    """
+    Function returns IPs of given ip range the way ip_range_split resolved them before intervals.
+    """
+    if "-" in ip_range:
+        first, last = (ipaddress.IPv4Address(part) for part in ip_range.split("-"))
+        return [
+            ipaddress.IPv4Address(address)
+            for address in range(int(first), int(last) + 1)
+        ]
+    return list(ipaddress.ip_network(ip_range).hosts())
+
+
+@pytest.mark.parametrize(
+    "ip_range",
+    [
+        "192.168.1.1-192.168.1.10",
+        "10.0.0.255-10.0.1.2",
+        "10.0.0.5-10.0.0.5",
+        "10.0.0.0/29",
+        "10.0.0.0/24",
+        "10.0.0.4/31",
+        "10.0.0.7/32",
+        "172.16.0.0/20",
+    ],
+)
+def test_ip_range_split_parity(ip_range):
+    expected = _ipaddress_hosts(ip_range)
+    assert utilities.ip_range_split(ip_range) == expected
+    assert utilities.ip_range_interval(ip_range) == (
+        int(expected[0]),
+        int(expected[-1]),
+    )
+
+
+@pytest.mark.parametrize(
+    "ip_range", ["host.example.com", "10.0.0.9-10.0.0.1", "192.168.1.5"]
+)
+def test_ip_range_interval_of_not_range(ip_range):
+    assert utilities.ip_range_interval(ip_range) is None
+    assert utilities.ip_range_split(ip_range) == []
+
+
+def test_ip_intervals_parity():
+    randomizer = random.Random(1)
+    for _ in range(200):
+        intervals = []
+        for _ in range(randomizer.randrange(6)):
+            first = randomizer.randrange(50)
+            intervals.append((first, first + randomizer.randrange(10)))
+        addresses = [
+            address for first, last in intervals for address in range(first, last + 1)
+        ]
+        merged = utilities.ip_intervals_merge(intervals)
+        assert utilities.ip_intervals_size(intervals) == len(addresses)
+        assert [int(a) for a in utilities.ip_intervals_addresses(merged)] == sorted(
+            set(addresses)
+        )
+        # merged intervals are disjoint and not adjacent
+        assert all(
+            previous[1] + 1 < following[0]
+            for previous, following in zip(merged, merged[1:])
+        )
+
+        removed = randomizer.sample(range(60), 20)
+        remaining = utilities.ip_intervals_subtract(merged, removed)
+        assert [int(a) for a in utilities.ip_intervals_addresses(remaining)] == sorted(
+            set(addresses) - set(removed)
+        )
+
+
+@pytest.mark.parametrize(
+    "address, integer",
+    [
+        ("192.168.1.5", int(ipaddress.IPv4Address("192.168.1.5"))),
+        ("0.0.0.0", 0),
+        ("192.168.001.5", None),
+        ("host.example.com", None),
+        ("10.0.0.0/29", None),
+        ("::1", None),
+    ],
+)
+def test_ip_address_integer(address, integer):
+    assert utilities.ip_address_integer(address) == integer
+
+
+@pytest.mark.parametrize("run_size", [1, 7, 100, 1000])
+def test_external_sort_is_the_same_as_sorted(run_size):
+    randomizer = random.Random(1)
+    items = [{"S": randomizer.randrange(5), "n": number} for number in range(300)]
+    key = lambda item: item["S"]
+    # equal keys keep order of given items
+    assert list(utilities.external_sort(iter(items), key, run_size)) == sorted(
+        items, key=key
+    )
+    assert list(utilities.external_sort([], key, run_size)) == []
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import nessus_file_reader as nfr
+from nessus_file_reader import xml_backend
+
+
+def _backend_values(nessus_scan_file, backend):
+    previous_backend = xml_backend.backend()
+    xml_backend.set_backend(backend)
+    try:
+        root = nfr.file.nessus_scan_file_root_element(nessus_scan_file)
+        values = {
+            "scanned_hosts": nfr.scan.list_of_scanned_hosts(root),
+            "not_scanned_hosts": nfr.scan.list_of_not_scanned_hosts(root),
+            "scan_times": nfr.scan.scan_times(root),
+            "credentialed_checks": nfr.scan.number_of_scanned_hosts_with_credentialed_checks_yes(
+                root
+            ),
+        }
+        for report_host in nfr.scan.report_hosts(root):
+            report_host_name = nfr.host.report_host_name(report_host)
+            values[report_host_name] = (
+                nfr.host.risk_factor_histogram(report_host),
+                nfr.host.detected_os(report_host),
+                nfr.host.netbios_network_name(root, report_host),
+                [
+                    nfr.table.plugin_severity_record(
+                        nessus_scan_file, report_host_name, report_item
+                    )
+                    for report_item in nfr.host.report_items(report_host)
+                ],
+                [
+                    nfr.plugin.compliance_check_item_value(report_item, "result")
+                    for report_item in nfr.host.report_items(report_host)
+                ],
+            )
+        values["iter_report_hosts"] = [
+            report_host.get("name")
+            for report_host in nfr.file.iter_report_hosts(nessus_scan_file)
+        ]
+    finally:
+        xml_backend.set_backend(previous_backend)
+    return values
+
+
+def test_backends_parity(sample_nessus_file):
+    pytest.importorskip("lxml")
+    assert _backend_values(sample_nessus_file, "lxml") == _backend_values(
+        sample_nessus_file, "etree"
+    )
+
+
+def test_set_backend():
+    previous_backend = xml_backend.backend()
+    try:
+        xml_backend.set_backend("etree")
+        assert xml_backend.backend() == "etree"
+        assert (
+            type(xml_backend.fromstring(b"<a />")).__module__ == "xml.etree.ElementTree"
+        )
+        xml_backend.set_backend(None)
+        assert xml_backend.backend() == xml_backend.available_backends()[-1]
+        with pytest.raises(ValueError):
+            xml_backend.set_backend("unknown")
+    finally:
+        xml_backend.set_backend(previous_backend)
+
+
+def test_backend_from_environment():
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from nessus_file_reader import xml_backend; print(xml_backend.backend())",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=dict(os.environ, NFR_XML_BACKEND="etree"),
+    ).stdout
+    assert output.strip() == "etree"